@@ -1,28 +1,65 @@
-import mysql.connector
-from fastapi import FastAPI, HTTPException
+import tempfile
+import time
+from datetime import date, timedelta
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from dotenv import load_dotenv
-import os
-from typing import Optional
+from typing import List, Optional
+
+from utils.ingest_queue import get_ingest_queue, get_ingest_worker
+from utils.link_cache import get_cached_link_metadata, get_link_cache
+from utils.metrics import HTTP_REQUEST_SECONDS, render_metrics
+from storage import TABLES, DuplicateRow, get_repository
+from utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+from utils.response_cache import CachedResponse, cache_key, compute_etag, etag_matches, get_response_cache
+from utils.search import SEARCH_COLUMNS
+from utils.stats import DORMANT_COLUMNS, SUMMARIES
+from utils.transfer import MEDIA_TYPES, TRANSFER_TABLES, MalformedFile, UnsupportedFormat, check_format, export_chunks, \
+    import_records, read_records
 
 app = FastAPI()
 
-load_dotenv()
-
-db = mysql.connector.connect(
-    host="localhost",
-    user=os.environ.get("dbUserName"),
-    password=os.environ.get("dbPassword"),
-    database="content_manager"
-)
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    """
+        Records the time spent answering every request in the metrics, by route
+        template (so /links/{link_title} is a single series) and status code.
+    """
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method,
+                                     route=route.path if route is not None else "unmatched",
+                                     status=status)
+
+# maximum page size of the list endpoints, and rows fetched at a time when streaming
+MAX_PAGE_SIZE = 1000
+MAX_SEARCH_RESULTS = 100
+STREAM_CHUNK_SIZE = 1000
+# imported files are kept in memory up to this size, and spooled to disk beyond it
+IMPORT_SPOOL_SIZE = 8 * 1024 * 1024
 
 class Link(BaseModel):
+    id: Optional[int] = Field(default=None, description="The unique ID of the link, assigned when it is added")
     link: str = Field(description="The link pointing to the resource")
     title: str = Field(description="The title associated to the resource")
     date: str = Field(description="The date on which the resource was added to the database")
     type: Optional[str] = Field(default=None, description="Indicated the type of resource (article, video, podcast ...)")
     category: Optional[str] = Field(default=None, description="The category of content (math, technology, programming, art, ...)")
 
+class NewLink(BaseModel):
+    link: str = Field(description="The link pointing to the resource")
+    title: Optional[str] = Field(default=None, description="The title of the resource, resolved in the background if missing")
+    date: Optional[str] = Field(default=None, description="The date on which the resource was added (today if missing)")
+    type: Optional[str] = Field(default=None, description="Indicated the type of resource (article, video, podcast ...)")
+    category: Optional[str] = Field(default=None, description="The category of content (math, technology, programming, art, ...)")
+
 class Publisher(BaseModel):
     id: Optional[int] = Field(description="The unique ID that identifies the publisher")
     name: str = Field(description="The name of the publisher")
@@ -31,48 +68,284 @@ class Publisher(BaseModel):
     category: Optional[str] = Field(description="The category of content published (math, technology, programming, art, ...)")
     type: Optional[str] = Field(default=None, description="Indicated the type of content published (article, video, podcast ...)")
     hash: Optional[str] = Field(description="The hexadecimal digest of the publisher's RSS feed")
+    etag: Optional[str] = Field(default=None, description="The ETag returned the last time the RSS feed was downloaded")
+    last_modified: Optional[str] = Field(default=None, description="The Last-Modified header returned the last time the RSS feed was downloaded")
 
 class Entry(BaseModel):
+    id: Optional[int] = Field(default=None, description="The unique ID of the entry, assigned when it is added")
     title: str = Field(description="The title of the resouce published by the publisher")
     link: str = Field(description="The title of the resource published by the publisher")
     publisher: int = Field(description="The unique ID of the publisher that published this entry")
     date: Optional[str] = Field(description="The date on which the entry was published")
 
+class BulkResult(BaseModel):
+    inserted: int = Field(description="The number of rows that were inserted")
+    skipped: int = Field(description="The number of rows that were skipped because they were already in the table")
+
+class BulkUpdateResult(BaseModel):
+    updated: int = Field(description="The number of rows matched by the changes")
+
+class LinkChanges(BaseModel):
+    date: Optional[str] = Field(default=None, description="The new date of the links")
+    type: Optional[str] = Field(default=None, description="The new type of the links")
+    category: Optional[str] = Field(default=None, description="The new category of the links")
+
+class LinkPatch(LinkChanges):
+    title: str = Field(description="The title of the links to change")
+
+class LinkFilters(BaseModel):
+    date_from: Optional[date] = Field(default=None, description="Only change the links added on or after this date")
+    date_to: Optional[date] = Field(default=None, description="Only change the links added on or before this date")
+    type: Optional[str] = Field(default=None, description="Only change the links of this type")
+    category: Optional[str] = Field(default=None, description="Only change the links of this category")
+
+class LinksBulkPatch(BaseModel):
+    items: List[LinkPatch] = Field(default=[], description="Changes of the links with the given titles")
+    where: Optional[LinkFilters] = Field(default=None, description="The links the changes are applied to")
+    changes: Optional[LinkChanges] = Field(default=None, description="The changes applied to the links matching where")
+
+class PublisherChanges(BaseModel):
+    rss: Optional[str] = Field(default=None, description="The new RSS feed of the publishers")
+    type: Optional[str] = Field(default=None, description="The new type of the publishers")
+    category: Optional[str] = Field(default=None, description="The new category of the publishers")
+    hash: Optional[str] = Field(default=None, description="The new hash of the publishers' RSS feed")
+
+class PublisherPatch(PublisherChanges):
+    id: int = Field(description="The unique ID of the publisher to change")
+
+class PublisherFilters(BaseModel):
+    type: Optional[str] = Field(default=None, description="Only change the publishers of this type")
+    category: Optional[str] = Field(default=None, description="Only change the publishers of this category")
+
+class PublishersBulkPatch(BaseModel):
+    items: List[PublisherPatch] = Field(default=[], description="Changes of the publishers with the given ids")
+    where: Optional[PublisherFilters] = Field(default=None, description="The publishers the changes are applied to")
+    changes: Optional[PublisherChanges] = Field(default=None, description="The changes applied to the publishers matching where")
+
+class ImportResult(BaseModel):
+    read: int = Field(description="The number of rows read from the file")
+    inserted: int = Field(description="The number of rows that were inserted")
+    skipped: int = Field(description="The number of rows that were skipped because they were already in the table")
+    invalid: int = Field(description="The number of rows that were skipped because a required column was missing")
+    seconds: float = Field(description="The time the import took")
+    rows_per_second: float = Field(description="The number of rows read per second")
+
+class QueuedLink(BaseModel):
+    job: int = Field(description="The id of the job saving the link")
+    status: str = Field(description="The status of the job (queued, resolving, done or failed)")
+
+class Job(BaseModel):
+    id: int = Field(description="The id of the job")
+    link: str = Field(description="The link being saved")
+    status: str = Field(description="queued, resolving (its title is being fetched), done, skipped (the link was already saved) or failed")
+    title: Optional[str] = Field(description="The title the link was saved with, once done")
+    error: Optional[str] = Field(description="Why the last attempt to save the link failed")
+    attempts: int = Field(description="The number of times saving the link was attempted")
+    created_at: float = Field(description="When the link was queued (unix time)")
+    updated_at: float = Field(description="When the status last changed (unix time)")
+
+class EntryFingerprints(BaseModel):
+    publisher: int = Field(description="The unique ID of the publisher the entries belong to")
+    fingerprints: List[str] = Field(description="The fingerprints (MD5 hex digest of the link) of the entries")
+
+def _cached_response(key: str, tags: tuple, request: Optional[Request], response: Optional[Response], compute):
+    """
+        Serves a GET response from the response cache, computing it with compute (which
+        returns the body and the headers to send with it) and storing it on a miss.
+        The response is sent with its ETag, and a 304 is returned instead when the
+        request's If-None-Match header matches it. The writes to the tables the response
+        was read from (its tags) invalidate it.
+    """
+    cache = get_response_cache()
+    cached = cache.get(key)
+    status = "HIT"
+    if cached is None:
+        status = "MISS"
+        snapshot = cache.snapshot(tags)
+        body, headers = compute()
+        cached = CachedResponse(body, compute_etag(body), headers)
+        cache.set(key, cached, tags, snapshot)
+    if request is not None and etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers={"ETag": cached.etag, "X-Cache": status, **cached.headers})
+    if response is not None:
+        response.headers.update({"ETag": cached.etag, "X-Cache": status, **cached.headers})
+    return cached.body
+
+def _list_rows(table: str, filters: dict, limit: Optional[int], after: Optional[str], format: str,
+               response: Optional[Response], request: Optional[Request] = None, tags: Optional[tuple] = None):
+    """
+        Shared implementation of the list endpoints. Without a limit every matching row
+        is returned. With a limit a single page is returned and, if more rows follow,
+        the cursor of the next page is sent in the X-Next-Cursor header. With
+        format=ndjson the rows are streamed (STREAM_CHUNK_SIZE at a time) instead of being
+        returned as a JSON array. JSON responses go through the response cache, tagged
+        with the table (or tags).
+    """
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=422, detail="format must be either json or ndjson")
+    repository = get_repository()
+    columns, keys = TABLES[table].columns, TABLES[table].keys
+    if after is not None:
+        try:
+            decode_cursor(after, len(keys))
+        except InvalidCursor as error:
+            raise HTTPException(status_code=400, detail=str(error))
+    if format == "ndjson":
+        return StreamingResponse(export_chunks(repository.stream_rows(table, filters, after, limit, STREAM_CHUNK_SIZE),
+                                               columns, "ndjson"),
+                                 media_type=MEDIA_TYPES["ndjson"])
+
+    def fetch_page():
+        # the extra row is only needed to know whether there is a next page
+        rows = repository.select_page(table, filters, after, None if limit is None else limit + 1)
+        headers = {}
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            headers["X-Next-Cursor"] = encode_cursor([last[columns.index(key)] for key in keys])
+        return [dict(zip(columns, row)) for row in rows], headers
+
+    key = cache_key(table, {"filters": filters, "after": after, "limit": limit})
+    return _cached_response(key, tags or (table, ), request, response, fetch_page)
+
 # Interact with the LINKS table
 @app.get("/links")
-def get_links():
+def get_links(request: Request = None, response: Response = None, limit: Optional[int] = None, after: Optional[str] = None,
+              date_from: Optional[date] = None, date_to: Optional[date] = None,
+              type: Optional[str] = None, category: Optional[str] = None, format: str = "json"):
     """
         ## Get links in table
-        This function retrieves all the tuples in the LINKS table
+        This function retrieves the tuples in the LINKS table, optionally filtered.
+        Rows are ordered by id; pass limit to get them one page at a time
+        (the cursor of the next page is in the X-Next-Cursor response header and goes
+        into the after parameter), and format=ndjson to stream them.
+
+        Parameters
+        --------------
+            limit: Optional[int]
+                Maximum number of rows returned
+            after: Optional[str]
+                Cursor of the page to return
+            date_from, date_to: Optional[date]
+                Only return the links added between these two dates (included)
+            type: Optional[str]
+                Only return the links of this type
+            category: Optional[str]
+                Only return the links of this category
+            format: str
+                json (default) or ndjson
 
         Returns
         --------------
             items: list[dict]
                 List of dictionaries, where each dictionary represents a row of the table
     """
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM links")
-    items = [{'link': row[0], 'title': row[1], 'date': row[2], "type":row[3], "category":row[4]} 
-             for row in cursor.fetchall()]
-    return items
+    filters = {"date_from": date_from, "date_to": date_to, "type": type, "category": category}
+    return _list_rows("links", filters, limit, after, format, response, request)
 
 @app.post("/links", status_code=201)
-def create_link(item: Link):
+def create_link(item: NewLink, response: Response = None):
     """
         ## Create link 
-        This function creates a new row in the LINKS tables
+        This function creates a new row in the LINKS tables. When the title is missing
+        the link is queued instead and the response (202 Accepted) is sent at once:
+        the title is fetched and the link is saved in the background, and the status
+        of the job is returned by GET /jobs/{job_id}. A link already in the table (once
+        canonicalized, see utils.urls.canonicalize_url) is answered with 409 Conflict.
 
         Paramateres
         --------------
-            item: Link
-                Link object containing the information we want to add to the table
+            item: NewLink
+                The link (and optionally its title, date, type and category) we want
+                to add to the table
     """
-    cursor = db.cursor()
-    cursor.execute("INSERT INTO links VALUES (%s, %s, %s, %s, %s)", 
-                   (item.link, item.title, item.date, item.type, item.category))
-    db.commit()
+    if item.title is None:
+        job = get_ingest_queue().enqueue(item.link, item.type, item.category)
+        worker = get_ingest_worker()
+        worker.start()
+        worker.wake()
+        if response is not None:
+            response.status_code = 202
+            response.headers["Location"] = f"/jobs/{job}"
+        return QueuedLink(job=job, status="queued")
+    try:
+        get_repository().insert("links", {**item.dict(), "date": item.date or str(date.today())})
+    except DuplicateRow as error:
+        raise HTTPException(status_code=409, detail=str(error))
+    get_response_cache().invalidate("links")
     return {"message": "Item inserted successfully"}
 
+def _bulk_insert(table: str, rows: List[dict]) -> BulkResult:
+    """
+        Inserts the rows in a single transaction, skipping the ones already in the table,
+        and counts the rows that were actually inserted. The cached responses of the
+        table are invalidated if any row was inserted.
+    """
+    inserted = get_repository().insert_many(table, rows)
+    if inserted:
+        get_response_cache().invalidate(table)
+    return BulkResult(inserted=inserted, skipped=len(rows) - inserted)
+
+@app.post("/links/bulk", status_code=201, response_model=BulkResult)
+def create_links(items: List[Link]):
+    """
+        ## Create links in bulk
+        This function inserts many rows in the LINKS table in a single transaction.
+        Rows whose link is already in the table (once canonicalized) are skipped.
+
+        Parameters
+        --------------
+            items: list[Link]
+                Link objects containing the information we want to add to the table
+
+        Returns
+        --------------
+            (BulkResult) The number of rows inserted and skipped
+    """
+    return _bulk_insert("links", [item.dict(exclude={"id"}) for item in items])
+
+def _bulk_update(table: str, column: str, patch) -> BulkUpdateResult:
+    """
+        Applies a bulk PATCH in a single transaction: first the changes to every row
+        matching the where filters, then the change of each item to the rows it
+        identifies. Only the fields present in a change are modified (a field set to
+        null is cleared). The cached responses of the table are invalidated if any row
+        was matched.
+    """
+    if (patch.where is None) != (patch.changes is None):
+        raise HTTPException(status_code=422, detail="where and changes must be given together")
+    filters = patch.where.dict(exclude_none=True) if patch.where is not None else {}
+    if patch.where is not None and not filters:
+        raise HTTPException(status_code=422, detail="where needs at least one filter")
+    changes = [(getattr(item, column), item.dict(exclude={column}, exclude_unset=True)) for item in patch.items]
+    fields = patch.changes.dict(exclude_unset=True) if patch.changes is not None else None
+    updated = get_repository().update_many(table, column, changes, filters, fields)
+    if updated:
+        get_response_cache().invalidate(table)
+    return BulkUpdateResult(updated=updated)
+
+@app.patch("/links/bulk", response_model=BulkUpdateResult)
+def update_links(patch: LinksBulkPatch):
+    """
+        ## Update links in bulk
+        This function changes many rows of the LINKS table in a single transaction:
+        the links matching a filter (e.g. set the category of every link of type
+        podcast), and the links with the titles of the items.
+
+        Parameters
+        --------------
+            patch: LinksBulkPatch
+                items: the changes of the links with the given titles
+                where, changes: the changes applied to every link matching the filters
+
+        Returns
+        --------------
+            (BulkUpdateResult) The number of rows matched by the changes
+    """
+    return _bulk_update("links", "title", patch)
+
 @app.get("/links/{link_title}")
 def get_links_by_title(link_title: str):
     """
@@ -89,17 +362,10 @@ def get_links_by_title(link_title: str):
         --------------
             (dict) A dictionary containing the fetched row
     """
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM links WHERE title = %s",
-                   (link_title,))
-    row = cursor.fetchone()
+    row = get_repository().get("links", "title", link_title)
     if row is None:
         raise HTTPException(status_code=404, detail="Item not found")
-    return {"link": row[0], 
-            "title": row[1],
-            "date": row[2],
-            "type": row[3],
-            "category": row[4]}
+    return dict(zip(TABLES["links"].columns, row))
 
 @app.put("/links/{old_item_name}")
 def update_link(old_item_name: str, newItem: Link):
@@ -115,23 +381,13 @@ def update_link(old_item_name: str, newItem: Link):
             newItem: Link
                 Link object containing the updated information
     """
-    cursor = db.cursor()
-    cursor.execute("SELECT link, title FROM links WHERE title = %s", (old_item_name, ))
-    row = cursor.fetchone()
-    if row is None:
-        raise HTTPException(status_code=404, detail="Item not found")
     # i cant change name if its the primary key i am using to identify a link.
     # do i have to change primary key ? (for now i only allow to change date, type, category)
-    if newItem.date is not None:
-        cursor.execute("UPDATE links SET date = %s WHERE title = %s", 
-                       (newItem.date, old_item_name))
-    if newItem.type is not None:
-        cursor.execute("UPDATE links SET type = %s WHERE title = %s", 
-                       (newItem.type, old_item_name))
-    if newItem.category is not None:
-        cursor.execute("UPDATE links SET category = %s WHERE title = %s", 
-                       (newItem.category, old_item_name))
-    db.commit()
+    fields = {name: value for name, value in newItem.dict(include={"date", "type", "category"}).items()
+              if value is not None}
+    if not get_repository().update("links", "title", old_item_name, fields):
+        raise HTTPException(status_code=404, detail="Item not found")
+    get_response_cache().invalidate("links")
     return {"message": "Item updated successfully"}
 
 @app.delete("/links/{link_title}")
@@ -146,32 +402,39 @@ def delete_link(link_title: str):
             link_title: str
                 Title attribute of the row we want to delete
     """
-    cursor = db.cursor()
-    cursor.execute("SLEECT * FROM links WHERE title = %s", (link_title, ))
-    row = cursor.fetchone()
-    if row is None:
+    if not get_repository().delete("links", "title", link_title):
         raise HTTPException(status_code=404, detail="Item not found")
-    cursor.execute("DELETE FROM links WHERE title = %s", (link_title, ))
-    db.commit()
+    get_response_cache().invalidate("links")
     return {"message": "Item deleted successfully"}
 
 # Interact with PUBLISERS table
 @app.get("/publishers")
-def get_publishers():
+def get_publishers(request: Request = None, response: Response = None, limit: Optional[int] = None, after: Optional[str] = None,
+                   type: Optional[str] = None, category: Optional[str] = None, format: str = "json"):
     """
         ## Get publishers in table
-        This function retrieves all the tuples in the PUBLISHERS table
+        This function retrieves the tuples in the PUBLISHERS table, optionally filtered.
+        Rows are ordered by id; pagination and streaming work as in get_links.
+
+        Parameters
+        --------------
+            limit: Optional[int]
+                Maximum number of rows returned
+            after: Optional[str]
+                Cursor of the page to return
+            type: Optional[str]
+                Only return the publishers of this type
+            category: Optional[str]
+                Only return the publishers of this category
+            format: str
+                json (default) or ndjson
 
         Returns
         --------------
             items: list[dict]
                 List of dictionaries, where each dictionary represents a row of the table
     """
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM publishers")
-    items = [{"id": row[0], "name": row[1], "website": row[2], "rss": row[3], "type":row[4], "category":row[5], "hash":row[6]} 
-             for row in cursor.fetchall()]
-    return items
+    return _list_rows("publishers", {"type": type, "category": category}, limit, after, format, response, request)
 
 @app.post("/publishers", status_code=201)
 def create_publisher(publisher: Publisher):
@@ -184,11 +447,8 @@ def create_publisher(publisher: Publisher):
             publisher: Publisher
                 Publisher object containing the information we want to add to the table
     """
-    cursor = db.cursor()
-    cursor.execute("INSERT INTO publishers(name, website, rss, type, category, hash) VALUES (%s, %s, %s, %s, %s, %s)", 
-                   (publisher.name, publisher.website, publisher.rss, 
-                    publisher.type, publisher.category, publisher.hash))
-    db.commit()
+    get_repository().insert("publishers", publisher.dict(exclude={"id"}))
+    get_response_cache().invalidate("publishers")
     return {"message": "Item inserted successfully"}
 
 @app.put("/publishers/{publisher_name}")
@@ -206,27 +466,33 @@ def update_publisher(publisher_name: str, new_publisher: Publisher):
                 Publisher object containing the updated information
     """
     # should I reimplement it using publisher id?
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM publishers WHERE name = %s", (publisher_name, ))
-    row = cursor.fetchone()
-    if row is None:
-        raise HTTPException(status_code=404, detail={"Item not found"})
     # does it make sense to allow to modify rss?
-    if new_publisher.rss is not None:
-        cursor.execute("UPDATE publishers SET rss = %s WHERE name = %s",
-                       (new_publisher.rss, publisher_name))
-    if new_publisher.type is not None:
-        cursor.execute("UPDATE publishers SET type = %s WHERE name = %s",
-                       (new_publisher.type, publisher_name))
-    if new_publisher.category is not None:
-        cursor.execute("UPDATE publishers SET category = %s WHERE name = %s",
-                       (new_publisher.category, publisher_name))
-    if new_publisher.hash is not None:
-        cursor.execute("UPDATE publishers SET hash = %s WHERE name = %s",
-                       (new_publisher.hash, publisher_name))
-    db.commit()
+    fields = {name: value for name, value in new_publisher.dict(include={"rss", "type", "category", "hash"}).items()
+              if value is not None}
+    if not get_repository().update("publishers", "name", publisher_name, fields):
+        raise HTTPException(status_code=404, detail="Item not found")
+    get_response_cache().invalidate("publishers")
     return {"message": "Item updated successfully"}
 
+@app.patch("/publishers/bulk", response_model=BulkUpdateResult)
+def update_publishers(patch: PublishersBulkPatch):
+    """
+        ## Update publishers in bulk
+        This function changes many rows of the PUBLISHERS table in a single transaction:
+        the publishers matching a filter, and the publishers with the ids of the items.
+
+        Parameters
+        --------------
+            patch: PublishersBulkPatch
+                items: the changes of the publishers with the given ids
+                where, changes: the changes applied to every publisher matching the filters
+
+        Returns
+        --------------
+            (BulkUpdateResult) The number of rows matched by the changes
+    """
+    return _bulk_update("publishers", "id", patch)
+
 @app.delete("/publishers/{publisher_name}")
 def delete_publisher(publisher_name: str):
     """
@@ -239,17 +505,13 @@ def delete_publisher(publisher_name: str):
             name: str
                 Name attribute of the row we want to delete
     """
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM publishers WHERE name = %s", (publisher_name, ))
-    row = cursor.fetchone()
-    if row is None:
+    if not get_repository().delete("publishers", "name", publisher_name):
         raise HTTPException(status_code=404, detail="Item not found")
-    cursor.execute("DELETE FROM publishers WHERE name = %s", (publisher_name, ))
-    db.commit()
+    get_response_cache().invalidate("publishers")
     return {"message": "Item deleted successfully"}
 
 @app.get("/publishers/hash")
-def get_hashes_from_db():
+def get_hashes_from_db(request: Request = None, response: Response = None):
     """
         ## Get the publisher hashes
         This function retrieves all the hashes associated to the publishers' rss feeds
@@ -258,19 +520,21 @@ def get_hashes_from_db():
         --------------
             items: list[dict]
                 A list of dictionaries, where each dictionary contains a publisher's id, name, 
-                rss feed link and hash associated with the rss feed.
+                rss feed link, hash associated with the rss feed and the validators
+                (etag, last_modified) to send when downloading the feed again.
     """
-    cursor = db.cursor()
-    cursor.execute("SELECT id, name, rss, hash FROM publishers")
-    items = [{"id": row[0], "name": row[1], "rss":row[2], "hash": row[3]}
-             for row in cursor.fetchall()]
-    return items
+    def fetch_hashes():
+        return get_repository().publisher_feeds(), {}
+
+    return _cached_response("publishers/hash", ("publishers", ), request, response, fetch_hashes)
 
 @app.put("/publishers/{publisher_name}/hash")
-def update_publisher_hash(publisher_id: int, new_hash: str):
+def update_publisher_hash(publisher_id: int, new_hash: str, etag: Optional[str] = None,
+                          last_modified: Optional[str] = None):
     """
         ## Update publisher hashes
-        This function updates the publisher's hash with the new one passes as argument.
+        This function updates the publisher's hash with the new one passes as argument,
+        together with the validators of the feed download the hash was computed from.
 
         Parameters
         --------------
@@ -278,52 +542,128 @@ def update_publisher_hash(publisher_id: int, new_hash: str):
                 The unique id that identifies the publisher
             new_hash: str
                 Update hash associated with the publisher's rss feed
+            etag: Optional[str]
+                ETag returned by the server for the rss feed
+            last_modified: Optional[str]
+                Last-Modified header returned by the server for the rss feed
     """
-    cursor = db.cursor()
-    cursor.execute("SELECT id, hash FROM publishers WHERE id = %s", (publisher_id, ))
-    row = cursor.fetchone()
-    if row is None:
-        raise HTTPException(status_code=404, detail={"There is no entry in the database with this name"})
-    cursor.execute("UPDATE publishers SET hash = %s WHERE id = %s",
-                   (new_hash, publisher_id))
-    db.commit()
+    if not get_repository().update("publishers", "id", publisher_id,
+                                   {"hash": new_hash, "etag": etag, "last_modified": last_modified}):
+        raise HTTPException(status_code=404, detail="There is no entry in the database with this name")
+    get_response_cache().invalidate("publishers")
     return {"message": "Hash updated correctly"}
 
 # Interacts with the Entry table
 @app.get("/entries")
-def get_entries():
+def get_entries(request: Request = None, response: Response = None, limit: Optional[int] = None, after: Optional[str] = None,
+                date_from: Optional[date] = None, date_to: Optional[date] = None,
+                publisher: Optional[int] = None, type: Optional[str] = None,
+                category: Optional[str] = None, format: str = "json"):
     """
         ## Get entries in table
-        This function retrieves all the tuples in the ENTRY table
+        This function retrieves the tuples in the ENTRY table, optionally filtered.
+        Rows are ordered by id; pagination and streaming work as in get_links.
+
+        Parameters
+        --------------
+            limit: Optional[int]
+                Maximum number of rows returned
+            after: Optional[str]
+                Cursor of the page to return
+            date_from, date_to: Optional[date]
+                Only return the entries published between these two dates (included)
+            publisher: Optional[int]
+                Only return the entries of the publisher with this id
+            type: Optional[str]
+                Only return the entries of publishers of this type
+            category: Optional[str]
+                Only return the entries of publishers of this category
+            format: str
+                json (default) or ndjson
 
         Returns
         --------------
             items: list[dict]
                 List of dictionaries, where each dictionary represents a row of the table
     """
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM entry")
-    items = [{"title": row[0], "link": row[1], "publisher": row[2], "date": row[3]}
-             for row in cursor.fetchall()]
-    return items
+    filters = {"date_from": date_from, "date_to": date_to, "publisher": publisher, "type": type,
+               "category": category}
+    # the type and category filters read the PUBLISHERS table too
+    tags = ("entry", "publishers") if type is not None or category is not None else ("entry", )
+    return _list_rows("entry", filters, limit, after, format, response, request, tags)
 
 @app.post("/entries", status_code=201)
 def create_entry(entry: Entry):
     """
         ## Create entry
-        This function creates a new row in the ENTRY tables
+        This function creates a new row in the ENTRY tables. An entry whose link is
+        already in the table (once canonicalized) is answered with 409 Conflict.
 
         Paramateres
         --------------
             entry: Entry
                 Entry object containing the information we want to add to the table
     """
-    cursor = db.cursor()
-    cursor.execute("INSERT INTO entry VALUES (%s, %s, %s, %s)", 
-                   (entry.title, entry.link, entry.publisher, entry.date))
-    db.commit()
+    try:
+        get_repository().insert("entry", entry.dict(exclude={"id"}))
+    except DuplicateRow as error:
+        raise HTTPException(status_code=409, detail=str(error))
+    get_response_cache().invalidate("entry")
     return {"message": "Item inserted successfully"}
 
+@app.post("/entries/bulk", status_code=201, response_model=BulkResult)
+def create_entries(entries: List[Entry]):
+    """
+        ## Create entries in bulk
+        This function inserts many rows in the ENTRY table in a single transaction.
+        Rows whose link is already in the table (once canonicalized) are skipped.
+
+        Parameters
+        --------------
+            entries: list[Entry]
+                Entry objects containing the information we want to add to the table
+
+        Returns
+        --------------
+            (BulkResult) The number of rows inserted and skipped
+    """
+    return _bulk_insert("entry", [entry.dict(exclude={"id"}) for entry in entries])
+
+@app.get("/entries/fingerprints")
+def get_entry_fingerprints(publisher: int):
+    """
+        ## Get entry fingerprints
+        This function retrieves the fingerprints of all the entries of a publisher that
+        have already been seen in its rss feed (even if they were deleted afterwards)
+
+        Parameters
+        --------------
+            publisher: int
+                The unique ID of the publisher
+
+        Returns
+        --------------
+            items: list[str]
+                The fingerprints of the entries already seen
+    """
+    return get_repository().entry_fingerprints(publisher)
+
+@app.post("/entries/fingerprints", status_code=201)
+def add_entry_fingerprints(item: EntryFingerprints):
+    """
+        ## Add entry fingerprints
+        This function records the fingerprints of entries seen in a publisher's rss feed.
+        Fingerprints that are already stored are ignored.
+
+        Parameters
+        --------------
+            item: EntryFingerprints
+                The publisher and the fingerprints of its entries
+    """
+    get_repository().insert_many("entry_fingerprints", [{"publisher": item.publisher, "fingerprint": fingerprint}
+                                                       for fingerprint in item.fingerprints])
+    return {"message": "Fingerprints inserted successfully"}
+
 @app.post("/entries/{entry_link}")
 def update_entry(entry_link: str, new_entry: Entry):
     pass
@@ -340,11 +680,310 @@ def delete_entry(entry_link: str):
             entry_link: str
                 Link attribute of the row we want to delete
     """
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM entry WHERE link = %s", (entry_link, ))
-    row = cursor.fetchone()
-    if row is None:
-        raise HTTPException("There is no entry with this link in the table")
-    cursor.execute("DELETE FROM entry WHERE link = %s", (entry_link))
-    db.commit()
-    return {"message": "Item deleted successfully"}
\ No newline at end of file
+    if not get_repository().delete("entry", "link", entry_link):
+        raise HTTPException(status_code=404, detail="There is no entry with this link in the table")
+    get_response_cache().invalidate("entry")
+    return {"message": "Item deleted successfully"}
+
+# Search across the LINKS and ENTRY tables
+@app.get("/search")
+def search(q: str, publisher: Optional[int] = None, category: Optional[str] = None,
+           date_from: Optional[date] = None, date_to: Optional[date] = None, limit: int = 20):
+    """
+        ## Search links and entries
+        This function searches the titles of the rows of the LINKS and ENTRY tables using
+        their FULLTEXT indexes, and returns the best matches first.
+
+        Parameters
+        --------------
+            q: str
+                The words to search for
+            publisher: Optional[int]
+                Only return the entries of the publisher with this id (links are left out)
+            category: Optional[str]
+                Only return links of this category and entries of publishers of this category
+            date_from, date_to: Optional[date]
+                Only return the rows dated between these two dates (included)
+            limit: int
+                Maximum number of results
+
+        Returns
+        --------------
+            items: list[dict]
+                The matching rows, with their kind ("link" or "entry") and relevance score
+    """
+    if not q.strip():
+        raise HTTPException(status_code=422, detail="The search query is empty")
+    if not 1 <= limit <= MAX_SEARCH_RESULTS:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {MAX_SEARCH_RESULTS}")
+    rows = get_repository().search(q, publisher, category, date_from, date_to, limit)
+    return [dict(zip(SEARCH_COLUMNS, row)) for row in rows]
+
+# Statistics, read from the summary tables kept up to date as rows are written
+def _stats(table: str, group_by: str, filters: dict, tags: tuple, request: Optional[Request],
+           response: Optional[Response]) -> list:
+    """
+        Shared implementation of the statistics endpoints: the number of rows of a table
+        in each bucket of group_by, through the response cache.
+    """
+    summary = SUMMARIES[table]
+    if group_by not in summary.groups:
+        raise HTTPException(status_code=422, detail=f"group_by must be one of {', '.join(summary.groups)}")
+
+    def fetch_stats():
+        rows = get_repository().stats(table, group_by, **filters)
+        return [{group_by: bucket, summary.count: count} for bucket, count in rows], {}
+
+    key = cache_key(f"stats/{table}", {"group_by": group_by, "filters": filters})
+    return _cached_response(key, tags, request, response, fetch_stats)
+
+@app.get("/stats/links")
+def link_stats(request: Request = None, response: Response = None, group_by: str = "category",
+               type: Optional[str] = None, category: Optional[str] = None):
+    """
+        ## Count links
+        This function returns the number of links of each category or type, or added
+        each week or month, without reading the LINKS table: the counts are kept up to
+        date in a summary table as links are added, changed and deleted.
+
+        Parameters
+        --------------
+            group_by: str
+                category, type, week (the monday of the week) or month (YYYY-MM). Links
+                without a date are left out of the weeks and months
+            type, category: Optional[str]
+                Only count the links of this type and category
+
+        Returns
+        --------------
+            items: list[dict]
+                The buckets and their number of links, e.g. {"month": "2023-06", "links": 12}
+    """
+    return _stats("links", group_by, {"type": type, "category": category}, ("links", ), request, response)
+
+@app.get("/stats/entries")
+def entry_stats(request: Request = None, response: Response = None, group_by: str = "publisher",
+                publisher: Optional[int] = None, type: Optional[str] = None, category: Optional[str] = None):
+    """
+        ## Count entries
+        This function returns the number of entries of each publisher, or of each
+        category or type of publisher, or published each week or month, without reading
+        the ENTRY table: the counts are kept up to date in a summary table as entries
+        are added, changed and deleted.
+
+        Parameters
+        --------------
+            group_by: str
+                publisher (its id), category, type, week (the monday of the week) or
+                month (YYYY-MM). Entries without a date are left out of the weeks and months
+            publisher: Optional[int]
+                Only count the entries of the publisher with this id
+            type, category: Optional[str]
+                Only count the entries of publishers of this type and category
+
+        Returns
+        --------------
+            items: list[dict]
+                The buckets and their number of entries, e.g. {"publisher": 1, "entries": 250}
+    """
+    filters = {"publisher": publisher, "type": type, "category": category}
+    return _stats("entry", group_by, filters, ("entry", "publishers"), request, response)
+
+@app.get("/stats/publishers/dormant")
+def dormant_publishers(request: Request = None, response: Response = None, days: int = 90,
+                       category: Optional[str] = None):
+    """
+        ## Dormant publishers
+        This function returns the publishers that have not published anything for the
+        given number of days (including those without any entry), the longest silent
+        first.
+
+        Parameters
+        --------------
+            days: int
+                Number of days without entries after which a publisher is dormant
+            category: Optional[str]
+                Only return the publishers of this category
+
+        Returns
+        --------------
+            items: list[dict]
+                The id, name, category, type, number of entries and date of the last
+                entry of the dormant publishers
+    """
+    if days < 1:
+        raise HTTPException(status_code=422, detail="days must be at least 1")
+    before = date.today() - timedelta(days=days)
+
+    def fetch_dormant():
+        rows = get_repository().dormant_publishers(before, category)
+        return [dict(zip(DORMANT_COLUMNS, row)) for row in rows], {}
+
+    key = cache_key("stats/dormant", {"before": before, "category": category})
+    return _cached_response(key, ("entry", "publishers"), request, response, fetch_dormant)
+
+# Export and import of whole tables
+def _transfer_table(table: str, format: str, importing: bool = False) -> str:
+    """
+        Returns the name in the database of a table that can be exported and imported,
+        checking that the format can be used with it.
+    """
+    if table not in TRANSFER_TABLES:
+        raise HTTPException(status_code=404, detail=f"table must be one of {', '.join(TRANSFER_TABLES)}")
+    try:
+        check_format(format, TRANSFER_TABLES[table], importing)
+    except UnsupportedFormat as error:
+        raise HTTPException(status_code=422, detail=str(error))
+    return TRANSFER_TABLES[table]
+
+@app.get("/export/{table}")
+def export_table(table: str, format: str = "ndjson"):
+    """
+        ## Export a table
+        This function streams every row of the LINKS, ENTRY or PUBLISHERS table in a
+        file, reading them from the database STREAM_CHUNK_SIZE at a time so that memory
+        usage does not depend on the size of the table.
+
+        Parameters
+        --------------
+            table: str
+                links, entries or publishers
+            format: str
+                ndjson (default), csv or parquet (needs pyarrow)
+    """
+    name = _transfer_table(table, format)
+    chunks = get_repository().stream_rows(name, chunk_size=STREAM_CHUNK_SIZE)
+    return StreamingResponse(export_chunks(chunks, TABLES[name].columns, format), media_type=MEDIA_TYPES[format],
+                             headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'})
+
+@app.post("/import/{table}", response_model=ImportResult)
+async def import_table(table: str, request: Request, format: str = "ndjson"):
+    """
+        ## Import a table
+        This function loads the rows of the file sent as the request body in the LINKS,
+        ENTRY or PUBLISHERS table, in batches. Rows already in the table are skipped.
+
+        Parameters
+        --------------
+            table: str
+                links, entries or publishers
+            format: str
+                ndjson (default), csv, parquet (needs pyarrow), or opml for a list of
+                feeds to import as publishers
+
+        Returns
+        --------------
+            (ImportResult) The number of rows read, inserted and skipped, and the
+            import speed
+    """
+    name = _transfer_table(table, format, importing=True)
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE) as body:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+        try:
+            summary = await run_in_threadpool(import_records, get_repository(), name, read_records(body, format))
+        except MalformedFile as error:
+            # the chunks read before the error were inserted
+            get_response_cache().invalidate(name)
+            raise HTTPException(status_code=400, detail=str(error))
+    if summary.inserted:
+        get_response_cache().invalidate(name)
+    return summary.as_dict()
+
+# Links queued by POST /links, saved in the background
+@app.on_event("startup")
+def start_ingest_worker():
+    # links queued before a restart, or by the CLI, are saved without waiting for a new one
+    get_ingest_worker().start()
+
+@app.on_event("shutdown")
+def stop_ingest_worker():
+    get_ingest_worker().stop(timeout=30)
+
+@app.get("/jobs/{job_id}", response_model=Job)
+def get_job(job_id: int):
+    """
+        ## Get the status of a queued link
+        This function returns the status of the job saving a link queued by POST /links:
+        queued, resolving (its title is being fetched), done (with the title it was
+        saved with) or failed (with the error of the last attempt).
+
+        Parameters
+        --------------
+            job_id: int
+                The id of the job, returned by POST /links
+    """
+    job = get_ingest_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="There is no job with this id")
+    return job._asdict()
+
+@app.get("/jobs")
+def get_jobs_stats():
+    """
+        ## Get ingestion queue statistics
+        This function returns the number of queued links in each status (done and
+        failed jobs are kept for a week).
+    """
+    return get_ingest_queue().stats()
+
+# Metadata of webpages, shared with the CLI through the on-disk link cache
+@app.get("/metadata")
+def get_url_metadata(url: str):
+    """
+        ## Get the metadata of a webpage
+        This function returns the title, og:title, canonical url and final url of the
+        webpage the url points to. It is served from the link metadata cache when
+        possible, and fetched (and cached) otherwise.
+
+        Parameters
+        --------------
+            url: str
+                The url of the webpage
+    """
+    try:
+        metadata = get_cached_link_metadata(url, get_link_cache(), timeout=10)
+    except Exception as error:
+        raise HTTPException(status_code=502, detail=f"Could not fetch {url}: {error}")
+    return metadata
+
+@app.get("/metadata/cache")
+def get_metadata_cache_stats():
+    """
+        ## Get link metadata cache statistics
+        This function returns the hit/miss counters of the link metadata cache
+        (since the API was started) and the number of urls it holds.
+    """
+    return get_link_cache().stats()
+
+@app.get("/cache")
+def get_response_cache_stats():
+    """
+        ## Get response cache statistics
+        This function returns the hit/miss counters of the response cache of the GET
+        endpoints (since the API was started) and the number of responses it holds.
+    """
+    return get_response_cache().stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+        ## Get metrics
+        This function returns the metrics of the API in the Prometheus text format:
+        request latency by route, time spent and rows read or written by database
+        statement, and the feed timings of jobs run by the API process.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/pool")
+def get_pool_stats():
+    """
+        ## Get connection pool statistics
+        This function returns the usage of the database connections of the storage
+        backend. With MySQL these are the statistics of the connection pool (connections
+        open and checked out, time spent waiting for a connection, timeouts and
+        reconnections), which can be used to size the pool under load; with SQLite the
+        connections open, in use and idle.
+    """
+    return get_repository().connection_stats()
@@ -0,0 +1,64 @@
+"""
+Benchmark of the startup time of the CLI: the wall time of commands that return
+before touching the database (--help of the group and of a command), against the
+time it takes to import the api module, which every command used to pay before the
+CLI imported its dependencies lazily. The slowest imports of `cli.py --help` are
+listed (from python -X importtime).
+
+    python benchmarks/bench_cli_startup.py --repeat 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMMANDS = {
+    "cli --help": [sys.executable, "cli.py", "--help"],
+    "cli addlink --help": [sys.executable, "cli.py", "addlink", "--help"],
+    "python (baseline)": [sys.executable, "-c", "pass"],
+    "import api": [sys.executable, "-c", "import api"],
+}
+
+
+def run(name, command, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=PROJECT_DIR, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    print(f"{name:<20} {statistics.median(timings) * 1000:>8.1f} ms median {min(timings) * 1000:>8.1f} ms min")
+    return statistics.median(timings)
+
+def slowest_imports(command, count):
+    """
+    The modules whose import (including their own imports) took the longest.
+    """
+    output = subprocess.run([command[0], "-X", "importtime"] + command[1:], cwd=PROJECT_DIR, check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True).stderr
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        # only the top level imports, the nested ones are included in their time
+        if module.startswith(" ") and not module.startswith("  "):
+            imports.append((int(cumulative), module.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="runs per command, the median is reported")
+    parser.add_argument("--imports", type=int, default=8, help="number of slowest imports listed")
+    args = parser.parse_args()
+
+    timings = {name: run(name, command, args.repeat) for name, command in COMMANDS.items()}
+    print(f"the CLI starts {timings['import api'] / timings['cli --help']:.2f}x faster than importing the api")
+    print("slowest imports of cli --help:")
+    for cumulative, module in slowest_imports(COMMANDS["cli --help"], args.imports):
+        print(f"    {module:<30} {cumulative / 1000:>8.1f} ms")
+
+if __name__ == "__main__":
+    main()
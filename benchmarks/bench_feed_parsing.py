@@ -0,0 +1,87 @@
+"""
+Benchmark of the parsing of large feeds: feedparser.parse, which builds the whole
+document, against the streaming reader of utils.feed_stream, reading the whole feed
+or stopping after the newest entries. Time and peak memory (tracemalloc) are reported.
+
+    python benchmarks/bench_feed_parsing.py --items 5000 --newest 20
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from email.utils import formatdate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feedparser  # noqa: E402
+
+from utils.feed_stream import read_feed  # noqa: E402
+
+WORDS = "the of and to in is was for on that with as by at from this are be new how why".split()
+
+
+def synthetic_podcast_feed(path: str, items: int, description_words: int, seed: int):
+    """
+    Writes a RSS 2.0 podcast feed with items entries, newest first, each with a long
+    show-notes description, the way large podcast feeds look.
+    """
+    rng = random.Random(seed)
+    now = time.time()
+    with open(path, "w", encoding="utf-8") as file:
+        file.write('<?xml version="1.0" encoding="utf-8"?>\n<rss version="2.0" '
+                   'xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd"><channel>'
+                   "<title>Synthetic podcast</title><link>https://podcast.example.com</link><ttl>60</ttl>\n")
+        for i in range(items):
+            notes = " ".join(rng.choices(WORDS, k=description_words))
+            file.write(f"<item><title>Episode {items - i}</title>"
+                       f"<link>https://podcast.example.com/episodes/{items - i}</link>"
+                       f"<guid isPermaLink=\"false\">episode-{items - i}</guid>"
+                       f"<pubDate>{formatdate(now - i * 7 * 86400)}</pubDate>"
+                       f"<description><![CDATA[<p>{notes}</p>]]></description>"
+                       f"<itunes:duration>01:02:03</itunes:duration>"
+                       f'<enclosure url="https://cdn.example.com/{items - i}.mp3" length="1" type="audio/mpeg"/>'
+                       f"</item>\n")
+        file.write("</channel></rss>\n")
+
+def measure(name, parse, repeat):
+    best, peak, entries = float("inf"), 0, 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        entries = len(parse().entries)
+        best = min(best, time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    print(f"{name:<22} {best * 1000:>10.1f} ms {peak / 2 ** 20:>10.1f} MiB peak {entries:>8} entries")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=5000, help="entries in the synthetic feed")
+    parser.add_argument("--description-words", type=int, default=300, help="words in each entry's description")
+    parser.add_argument("--newest", type=int, default=20, help="entries read by the early-stopping run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per parser, the best time is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "feed.xml")
+        synthetic_podcast_feed(path, args.items, args.description_words, args.seed)
+        print(f"feed: {args.items} entries, {os.path.getsize(path) / 2 ** 20:.1f} MiB")
+
+        def parse_feedparser():
+            with open(path, "rb") as file:
+                return feedparser.parse(file.read())
+
+        def parse_stream(max_entries=None):
+            with open(path, "rb") as file:
+                return read_feed(file, max_entries)
+
+        measure("feedparser", parse_feedparser, args.repeat)
+        measure("stream", parse_stream, args.repeat)
+        measure(f"stream (newest {args.newest})", lambda: parse_stream(args.newest), args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark of the extraction of links from emails: the MIME-aware extractor
+(utils.link_extractor) against the regex over the whole message that
+read_email_inbox used before it.
+
+    python benchmarks/bench_link_extraction.py --messages 500 --links 60
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from email.message import EmailMessage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.link_extractor import extract_links_from_messages  # noqa: E402
+
+LEGACY_PATTERN = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
+WORDS = "the of and to in is was for on that with as by at from this are be new how why".split()
+HOSTS = [f"news{i}.example.com" for i in range(20)]
+
+
+def legacy_extract(messages):
+    """
+    The extraction as read_email_inbox did it before utils.link_extractor.
+    """
+    links = []
+    for message in messages:
+        matches = re.findall(LEGACY_PATTERN, message.as_string())
+        if len(matches) > 1:
+            for match in matches:
+                if match not in links and "</a>" not in match and "</div>" not in match:
+                    links.append(match)
+        elif matches: links = [matches[0]]
+    return links
+
+def synthetic_newsletter(rng: random.Random, links: int) -> EmailMessage:
+    """
+    A newsletter with a plain text and an HTML alternative, both quoted-printable
+    encoded, where some links are repeated (tracking footers, "read more" buttons).
+    """
+    urls = [f"https://{rng.choice(HOSTS)}/{rng.randrange(10 ** 6)}/{'-'.join(rng.sample(WORDS, 4))}"
+            for _ in range(links)]
+    urls += rng.sample(urls, links // 4)
+    text = "\n\n".join(f"{' '.join(rng.choices(WORDS, k=30))}\nRead more: {url}." for url in urls)
+    html = "".join(f'<div class="story"><p>{" ".join(rng.choices(WORDS, k=30))}</p>'
+                   f'<a href="{url}?utm_source=newsletter&amp;utm_medium=email">Read more</a></div>'
+                   for url in urls)
+    message = EmailMessage()
+    message["Subject"] = "Weekly digest"
+    message["From"] = "digest@example.com"
+    message.set_content(text, cte="quoted-printable")
+    message.add_alternative(f"<html><body>{html}</body></html>", subtype="html", cte="quoted-printable")
+    return message
+
+def run(name, extract, messages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        links = extract(messages)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<10} {len(messages) / best:>10.1f} messages/s {best * 1000:>10.1f} ms {len(links):>8} links")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500, help="number of synthetic newsletters")
+    parser.add_argument("--links", type=int, default=60, help="distinct links per newsletter")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per extractor, the best one is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    messages = [synthetic_newsletter(rng, args.links) for _ in range(args.messages)]
+    legacy = run("legacy", legacy_extract, messages, args.repeat)
+    extractor = run("extractor", extract_links_from_messages, messages, args.repeat)
+    print(f"speedup    {legacy / extractor:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Local HTTP server serving synthetic RSS feeds and HTML pages, used by the benchmark
+harness instead of the real websites.
+
+    /feeds/<n>.xml   a RSS 2.0 feed of feed_items entries
+    /pages/<n>.html  a page titled "Page <n>" of about page_kb KiB
+
+Every response is delayed by latency_ms (+/- jitter_ms) before its first byte, like a
+remote server would. The server listens on hosts loopback addresses (127.0.0.1,
+127.0.0.2, ...; any 127.x.y.z address is local on Linux) so that the per-host limits
+of the pipelines apply as they would with many websites.
+"""
+import random
+import re
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+WORDS = "the of and to in is was for on that with as by at from this are be new how why".split()
+PATH = re.compile(r"^/(feeds|pages)/(\d+)\.(xml|html)$")
+CHUNK_SIZE = 16 * 1024
+
+
+def synthetic_feed(number: int, items: int, base_url: str) -> bytes:
+    """
+    Returns the RSS feed number: items entries, newest first, one a day.
+    """
+    rng = random.Random(number)
+    now = time.time()
+    entries = "".join(f"<item><title>Feed {number} entry {items - i}</title>"
+                      f"<link>{base_url}/pages/{number * 100000 + items - i}.html</link>"
+                      f"<pubDate>{formatdate(now - i * 86400)}</pubDate>"
+                      f"<description>{' '.join(rng.choices(WORDS, k=60))}</description></item>"
+                      for i in range(items))
+    return (f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+            f"<title>Feed {number}</title><link>{base_url}</link>{entries}</channel></rss>").encode("utf-8")
+
+def synthetic_page(number: int, size: int) -> bytes:
+    """
+    Returns the HTML page number, padded with paragraphs to about size bytes.
+    """
+    rng = random.Random(number)
+    head = (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Page {number}</title>'
+            f'<meta property="og:title" content="Page {number}"></head><body>')
+    paragraphs, length = [], len(head)
+    while length < size:
+        paragraph = f"<p>{' '.join(rng.choices(WORDS, k=80))}</p>"
+        paragraphs.append(paragraph)
+        length += len(paragraph)
+    return (head + "".join(paragraphs) + "</body></html>").encode("utf-8")
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        fixtures = self.server.fixtures
+        match = PATH.match(self.path.split("?", 1)[0])
+        if match is None:
+            self.send_error(404)
+            return
+        kind, number = match.group(1), int(match.group(2))
+        delay = fixtures.latency_ms + random.uniform(-fixtures.jitter_ms, fixtures.jitter_ms)
+        time.sleep(max(delay, 0) / 1000)
+        if kind == "feeds":
+            body = synthetic_feed(number, fixtures.feed_items, fixtures.url(number))
+            content_type = "application/rss+xml; charset=utf-8"
+        else:
+            body = synthetic_page(number, fixtures.page_kb * 1024)
+            content_type = "text/html; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            for start in range(0, len(body), CHUNK_SIZE):
+                self.wfile.write(body[start:start + CHUNK_SIZE])
+        except (BrokenPipeError, ConnectionResetError):
+            # clients reading only the <head> of a page close the connection early
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """
+    The fixture HTTP server, listening on the same port of hosts loopback addresses.
+    Use it as a context manager to start and stop it.
+    """
+
+    def __init__(self, hosts: int = 8, latency_ms: float = 20, jitter_ms: float = 5,
+                 feed_items: int = 50, page_kb: int = 64):
+        self.hosts = hosts
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.feed_items = feed_items
+        self.page_kb = page_kb
+        self.port = None
+        self._servers: List[ThreadingHTTPServer] = []
+
+    def url(self, number: int) -> str:
+        """
+        Returns the base url of the host serving the fixture number.
+        """
+        return f"http://127.0.0.{1 + number % self.hosts}:{self.port}"
+
+    def feed_url(self, number: int) -> str:
+        return f"{self.url(number)}/feeds/{number}.xml"
+
+    def page_url(self, number: int) -> str:
+        return f"{self.url(number)}/pages/{number}.html"
+
+    def start(self) -> "FixtureServer":
+        for host in range(1, self.hosts + 1):
+            server = ThreadingHTTPServer((f"127.0.0.{host}", self.port or 0), FixtureHandler)
+            server.daemon_threads = True
+            server.fixtures = self
+            self.port = server.server_address[1]
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self._servers.append(server)
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
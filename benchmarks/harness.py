@@ -0,0 +1,295 @@
+"""
+End-to-end benchmark of the content manager, running offline against local stand-ins:
+a fixture HTTP server for the feeds and pages (benchmarks/fixtures.py), an IMAP
+server for the inbox (benchmarks/imap_server.py) and a seeded MySQL database
+(benchmarks/seed.py, the database is dropped and created again), or a seeded SQLite
+database with --storage sqlite.
+
+Scenarios:
+    weekly_entry_update   polls every seeded publisher's feed and stores the new entries
+    add_link_from_email   reads the inbox, resolves the titles of the links and stores them
+    api                   sends GET requests to the list, hash and search endpoints
+
+For each pipeline and endpoint the throughput, the p50/p95/p99 latency and the peak
+RSS of the process running it are reported, and saved as JSON. Comparing two result
+files flags the regressions:
+
+    python -m benchmarks.harness run --output before.json
+    python -m benchmarks.harness run --output after.json --baseline before.json
+    python -m benchmarks.harness compare before.json after.json --threshold 10
+"""
+import argparse
+import imaplib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Dict, List, Tuple
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from benchmarks.fixtures import FixtureServer  # noqa: E402
+from benchmarks.imap_server import ImapStandIn, newsletter  # noqa: E402
+
+RESULTS_DIR = os.path.join(PROJECT_DIR, "benchmarks", "results")
+ENDPOINTS = ["/links?limit=100", "/publishers", "/entries?limit=100", "/publishers/hash", "/search?q=entry"]
+
+# a scenario returns, for each operation it measured, the latencies in seconds, the
+# total duration in seconds and the number of errors
+Measurements = Dict[str, Tuple[List[float], float, int]]
+
+
+def scenario_weekly_entry_update(config: dict) -> Measurements:
+    from api import get_hashes_from_db
+    from cli import fetch_publisher_feed, store_publisher_feed
+    from utils.feed_poller import poll_feeds
+
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    fetch = partial(fetch_publisher_feed, timeout=config["timeout"])
+    for result in poll_feeds(get_hashes_from_db(), fetch, max_workers=config["workers"],
+                             per_host=config["per_host"]):
+        stored = time.perf_counter()
+        if result.ok:
+            try:
+                store_publisher_feed(result.publisher, result.value)
+            except Exception:
+                errors += 1
+        else:
+            errors += 1
+        latencies.append(result.elapsed + time.perf_counter() - stored)
+    return {"weekly_entry_update": (latencies, time.perf_counter() - start, errors)}
+
+def scenario_add_link_from_email(config: dict) -> Measurements:
+    from api import Link, create_links
+    from utils.concurrency import bounded_map
+    from utils.email_scraper import read_email_inbox
+    from utils.link_resolver import resolve_link
+
+    start = time.perf_counter()
+    server = imaplib.IMAP4("127.0.0.1", config["imap_port"])
+    server.login("benchmark", "benchmark")
+    links, _ = read_email_inbox(server, {})
+    server.logout()
+    read = time.perf_counter() - start
+
+    latencies, errors, schemas = [], 0, []
+    resolve = partial(resolve_link, timeout=config["timeout"], retries=0)
+    for link, value, error, elapsed in bounded_map(resolve, links, lambda link: link,
+                                                   max_workers=config["workers"], per_host=config["per_host"]):
+        latencies.append(elapsed)
+        if error is not None:
+            errors += 1
+            continue
+        schemas.append(Link(link=link, title=value[1], date=value[0]))
+    create_links(schemas)
+    return {"email_inbox_read": ([read], read, 0),
+            "add_link_from_email": (latencies, time.perf_counter() - start, errors)}
+
+def scenario_api(config: dict) -> Measurements:
+    from fastapi.testclient import TestClient
+
+    from api import app
+
+    local = threading.local()
+
+    def get(path: str) -> Tuple[float, bool]:
+        if not hasattr(local, "client"):
+            local.client = TestClient(app, raise_server_exceptions=False)
+        start = time.perf_counter()
+        response = local.client.get(path)
+        return time.perf_counter() - start, response.status_code == 200
+
+    measurements = {}
+    with ThreadPoolExecutor(config["concurrency"]) as executor:
+        for path in ENDPOINTS:
+            start = time.perf_counter()
+            results = list(executor.map(get, [path] * config["requests"]))
+            measurements[f"api GET {path}"] = ([latency for latency, _ in results], time.perf_counter() - start,
+                                               sum(not ok for _, ok in results))
+    return measurements
+
+SCENARIOS = {"weekly_entry_update": scenario_weekly_entry_update,
+             "add_link_from_email": scenario_add_link_from_email,
+             "api": scenario_api}
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Returns the q-th percentile of the values (nearest rank).
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+def summarize(latencies: List[float], seconds: float, errors: int, peak_rss_mb: float) -> dict:
+    return {"operations": len(latencies),
+            "errors": errors,
+            "seconds": round(seconds, 4),
+            "throughput": round(len(latencies) / seconds, 2) if seconds else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "peak_rss_mb": round(peak_rss_mb, 1)}
+
+def _run_in_child(name: str, config: dict, results: multiprocessing.Queue):
+    try:
+        measurements = SCENARIOS[name](config)
+        # ru_maxrss is in KiB on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        results.put({operation: summarize(*values, peak) for operation, values in measurements.items()})
+    except Exception:
+        results.put({"error": traceback.format_exc()})
+
+def run_scenario(name: str, config: dict) -> dict:
+    """
+    Runs a scenario in a fresh process, so that its peak RSS is its own.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_run_in_child, args=(name, config, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    if "error" in outcome:
+        raise RuntimeError(f"Scenario {name} failed:\n{outcome['error']}")
+    return outcome
+
+
+def compare(baseline: dict, current: dict, threshold: float = 10) -> List[str]:
+    """
+    Prints, for every operation measured in both runs, how its throughput, p95 latency
+    and peak RSS changed, and returns the operations whose throughput dropped or p95
+    latency grew by more than threshold percent.
+    """
+    regressions = []
+    print(f"{'operation':<32} {'throughput':>12} {'p95':>12} {'peak rss':>12}")
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        changes = [(new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+                   for key in ("throughput", "p95_ms", "peak_rss_mb")]
+        regressed = changes[0] < -threshold or changes[1] > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<32} {changes[0]:>+11.1f}% {changes[1]:>+11.1f}% {changes[2]:>+11.1f}%"
+              + ("  REGRESSION" if regressed else ""))
+    return regressions
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=PROJECT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run(args) -> dict:
+    if args.storage == "sqlite":
+        os.environ["sqlitePath"] = args.sqlite_path
+    else:
+        configured = os.environ.get("dbName", "content_manager")
+        if args.database == configured and not args.reuse_database:
+            raise SystemExit(f"Refusing to drop the tables of {args.database}, the database configured in the "
+                             f"environment; pass another --database")
+        os.environ["dbName"] = args.database
+    os.environ["storageBackend"] = args.storage
+    os.environ["responseCacheBackend"] = args.response_cache
+    from benchmarks.seed import create_database, load_schema, seed
+
+    config = {"timeout": args.timeout, "workers": args.workers, "per_host": args.per_host,
+              "requests": args.requests, "concurrency": args.concurrency}
+    results = {}
+    with FixtureServer(args.hosts, args.latency_ms, args.jitter_ms, args.feed_items, args.page_kb) as fixtures:
+        if args.storage == "mysql":
+            create_database(args.database)
+        for name in args.scenarios:
+            load_schema()
+            seed(fixtures.feed_url, args.publishers, args.links, args.entries, args.seed)
+            messages = [(number, newsletter(number, [fixtures.page_url(number * args.links_per_email + link)
+                                                     for link in range(args.links_per_email)]))
+                        for number in range(1, args.emails + 1)]
+            with ImapStandIn(messages) as imap:
+                outcome = run_scenario(name, {**config, "imap_port": imap.port})
+            for operation, summary in outcome.items():
+                print(f"{operation:<32} {summary['throughput']:>10.1f}/s  p50 {summary['p50_ms']:>8.1f} ms  "
+                      f"p95 {summary['p95_ms']:>8.1f} ms  p99 {summary['p99_ms']:>8.1f} ms  "
+                      f"rss {summary['peak_rss_mb']:>6.1f} MiB  errors {summary['errors']}")
+            results.update(outcome)
+    return {"meta": {"started": datetime.now().isoformat(timespec="seconds"), "commit": _git_commit(),
+                     "python": platform.python_version(), "platform": platform.platform(),
+                     "settings": {key: value for key, value in vars(args).items() if key != "command"}},
+            "results": results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    run_parser.add_argument("--storage", choices=["mysql", "sqlite"], default="mysql", help="storage backend")
+    run_parser.add_argument("--database", default="content_manager_bench",
+                            help="MySQL database whose tables are dropped and seeded")
+    run_parser.add_argument("--sqlite-path", default=os.path.join(tempfile.gettempdir(), "content_manager_bench.sqlite3"),
+                            help="SQLite database whose tables are emptied and seeded")
+    run_parser.add_argument("--reuse-database", action="store_true",
+                            help="allow --database to be the database configured in the environment")
+    run_parser.add_argument("--publishers", type=int, default=50)
+    run_parser.add_argument("--links", type=int, default=5000, help="links seeded in the database")
+    run_parser.add_argument("--entries", type=int, default=20000, help="entries seeded in the database")
+    run_parser.add_argument("--emails", type=int, default=20)
+    run_parser.add_argument("--links-per-email", type=int, default=10)
+    run_parser.add_argument("--feed-items", type=int, default=50)
+    run_parser.add_argument("--page-kb", type=int, default=64)
+    run_parser.add_argument("--latency-ms", type=float, default=20)
+    run_parser.add_argument("--jitter-ms", type=float, default=5)
+    run_parser.add_argument("--hosts", type=int, default=8, help="loopback addresses the fixtures are spread on")
+    run_parser.add_argument("--workers", type=int, default=16)
+    run_parser.add_argument("--per-host", type=int, default=2)
+    run_parser.add_argument("--timeout", type=float, default=10)
+    run_parser.add_argument("--requests", type=int, default=200, help="requests sent to each endpoint")
+    run_parser.add_argument("--concurrency", type=int, default=8, help="requests sent at the same time")
+    run_parser.add_argument("--response-cache", choices=["none", "memory"], default="none")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", help="result file (default: benchmarks/results/<time>.json)")
+    run_parser.add_argument("--baseline", help="result file to compare the run with")
+    run_parser.add_argument("--threshold", type=float, default=10, help="regression threshold, in percent")
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=10, help="regression threshold, in percent")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        current = run(args)
+        output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(current, file, indent=2)
+        print(f"Results saved in {output}")
+        baseline_path = args.baseline
+    else:
+        with open(args.current, encoding="utf-8") as file:
+            current = json.load(file)
+        baseline_path = args.baseline
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if compare(baseline, current, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Minimal IMAP4rev1 server holding a single read-only mailbox in memory, used by the
+benchmark harness instead of gmail. It implements what read_email_inbox needs:
+CAPABILITY, LOGIN, SELECT/EXAMINE, UID SEARCH (every message matches), UID FETCH
+over a UID range, NOOP and LOGOUT. Any user name and password are accepted.
+"""
+import re
+import socketserver
+import threading
+from email.message import EmailMessage
+from typing import List, Tuple
+
+COMMAND = re.compile(rb"^(\S+) (?:UID )?(\S+)(?: (.*))?$", re.IGNORECASE)
+UID_RANGE = re.compile(rb"^(\d+)(?::(\d+|\*))?")
+
+
+def newsletter(number: int, links: List[str]) -> bytes:
+    """
+    Returns an email with a plain text and an HTML part listing the links.
+    """
+    message = EmailMessage()
+    message["Subject"] = f"Links {number}"
+    message["From"] = "me@example.com"
+    message.set_content("\n".join(f"Worth reading: {link}" for link in links))
+    message.add_alternative("<html><body>" + "".join(f'<p><a href="{link}">{link}</a></p>' for link in links)
+                            + "</body></html>", subtype="html")
+    return bytes(message)
+
+
+class ImapHandler(socketserver.StreamRequestHandler):
+
+    def send(self, line: bytes):
+        self.wfile.write(line + b"\r\n")
+
+    def handle(self):
+        mailbox = self.server.mailbox
+        self.send(b"* OK IMAP4rev1 stand-in ready")
+        for line in self.rfile:
+            match = COMMAND.match(line.rstrip(b"\r\n"))
+            if match is None:
+                self.send(b"* BAD unparsable command")
+                continue
+            tag, command, arguments = match.group(1), match.group(2).upper(), match.group(3) or b""
+            if command == b"CAPABILITY":
+                self.send(b"* CAPABILITY IMAP4rev1")
+            elif command in (b"SELECT", b"EXAMINE"):
+                uids = [uid for uid, _ in mailbox.messages]
+                self.send(b"* %d EXISTS" % len(uids))
+                self.send(b"* OK [UIDVALIDITY %d] UIDs valid" % mailbox.uidvalidity)
+                self.send(b"* OK [UIDNEXT %d] Predicted next UID" % (max(uids, default=0) + 1))
+                self.send(tag + b" OK [READ-ONLY] " + command + b" completed")
+                continue
+            elif command == b"SEARCH":
+                self.send(b"* SEARCH " + b" ".join(b"%d" % uid for uid, _ in mailbox.messages))
+            elif command == b"FETCH":
+                self.fetch(arguments)
+            elif command == b"LOGOUT":
+                self.send(b"* BYE logging out")
+                self.send(tag + b" OK LOGOUT completed")
+                return
+            elif command not in (b"LOGIN", b"NOOP"):
+                self.send(tag + b" BAD unknown command")
+                continue
+            self.send(tag + b" OK " + command + b" completed")
+
+    def fetch(self, arguments: bytes):
+        match = UID_RANGE.match(arguments)
+        first = int(match.group(1))
+        last = match.group(2)
+        messages = self.server.mailbox.messages
+        if last is None:
+            selected = [(number, uid, body) for number, (uid, body) in enumerate(messages, 1) if uid == first]
+        else:
+            last = None if last == b"*" else int(last)
+            selected = [(number, uid, body) for number, (uid, body) in enumerate(messages, 1)
+                        if uid >= first and (last is None or uid <= last)]
+            if not selected and last is None and messages:
+                # "n:*" always includes the last message
+                selected = [(len(messages), *messages[-1])]
+        for number, uid, body in selected:
+            self.wfile.write(b"* %d FETCH (UID %d BODY[] {%d}\r\n" % (number, uid, len(body)) + body + b")\r\n")
+
+
+class ImapStandIn(socketserver.ThreadingTCPServer):
+    """
+    The IMAP stand-in, serving messages (a list of (uid, raw message) pairs) on a
+    local port. Use it as a context manager to start and stop it.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, messages: List[Tuple[int, bytes]], uidvalidity: int = 1, host: str = "127.0.0.1"):
+        super().__init__((host, 0), ImapHandler)
+        self.mailbox = self
+        self.messages = sorted(messages)
+        self.uidvalidity = uidvalidity
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,86 @@
+"""
+Seeding of the benchmark database: the schema of sql/db_dump.sql is loaded in a
+dedicated database (every table is dropped and created again), or the tables of the
+SQLite database are emptied, and filled with synthetic publishers, links and entries.
+"""
+import os
+import random
+from datetime import date, timedelta
+from typing import Callable
+
+import mysql.connector
+
+from storage import get_repository
+from utils.migrations import split_statements
+from utils.urls import url_hash
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql", "db_dump.sql")
+WORDS = "the of and to in is was for on that with as by at from this are be new how why".split()
+TYPES = ["article", "video", "podcast", "newsletter"]
+CATEGORIES = ["math", "technology", "programming", "art", "startups"]
+BATCH_SIZE = 1000
+
+
+def create_database(database: str):
+    """
+    Creates the database if it does not exist, with the credentials in the environment.
+    """
+    connection = mysql.connector.connect(host=os.environ.get("dbHost", "localhost"),
+                                         port=int(os.environ.get("dbPort", 3306)),
+                                         user=os.environ.get("dbUserName"),
+                                         password=os.environ.get("dbPassword"))
+    try:
+        connection.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{database}`")
+    finally:
+        connection.close()
+
+def load_schema():
+    """
+    Drops every table of the database configured by dbName and creates them again
+    from sql/db_dump.sql. With the SQLite storage backend the tables are emptied instead
+    (the schema is created when the database is opened).
+    """
+    repository = get_repository()
+    if repository.dialect == "sqlite":
+        with repository.session(write=True) as cursor:
+            for table in ("links_stats", "entry_stats", "entry_fingerprints", "entry", "links", "publishers"):
+                cursor.execute(f"DELETE FROM {table}")
+            # publisher ids start from 1 again, as in a new MySQL table
+            cursor.execute("DELETE FROM sqlite_sequence")
+        return
+    with open(SCHEMA_PATH, encoding="utf-8") as file:
+        statements = split_statements(file.read())
+    with repository.session(write=True) as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+def _title(rng: random.Random) -> str:
+    return " ".join(rng.choices(WORDS, k=8)).capitalize()
+
+def seed(feed_url: Callable[[int], str], publishers: int, links: int, entries: int, seed: int = 0):
+    """
+    Fills the database of the storage backend with publishers whose feeds are served by
+    the fixture server (feed_url returns the feed of a publisher number), and with
+    links and entries that are not in any feed.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    with get_repository().session(write=True) as cursor:
+        cursor.executemany("INSERT INTO publishers (name, website, rss, type, category) VALUES (%s, %s, %s, %s, %s)",
+                           [(f"Publisher {number}", feed_url(number).rsplit("/feeds/", 1)[0], feed_url(number),
+                             rng.choice(TYPES), rng.choice(CATEGORIES))
+                            for number in range(publishers)])
+        cursor.execute("SELECT id FROM publishers")
+        ids = [row[0] for row in cursor.fetchall()]
+        rows = [(link, f"{_title(rng)} {number}", today - timedelta(days=rng.randrange(3650)), rng.choice(TYPES),
+                 rng.choice(CATEGORIES), url_hash(link))
+                for number, link in ((number, f"https://seed.example.com/links/{number}") for number in range(links))]
+        for start in range(0, len(rows), BATCH_SIZE):
+            cursor.executemany("INSERT INTO links (link, title, date, type, category, link_hash) "
+                               "VALUES (%s, %s, %s, %s, %s, %s)", rows[start:start + BATCH_SIZE])
+        rows = [(f"{_title(rng)} {number}", link, rng.choice(ids), today - timedelta(days=rng.randrange(3650)),
+                 url_hash(link))
+                for number, link in ((number, f"https://seed.example.com/entries/{number}") for number in range(entries))]
+        for start in range(0, len(rows), BATCH_SIZE):
+            cursor.executemany("INSERT INTO entry (title, link, publisher, date, link_hash) "
+                               "VALUES (%s, %s, %s, %s, %s)", rows[start:start + BATCH_SIZE])
@@ -1,10 +1,26 @@
+import atexit
 import click
-from typing import Optional
+import os
+import time
+from functools import partial
+from typing import TYPE_CHECKING, Optional, Tuple
 
-from api import Link, Publisher, Entry, create_link, create_publisher, create_entry, get_hashes_from_db, update_publisher_hash
-from utils.link_data import get_link_data # importing function to get title
-from utils.email_scraper import read_email_inbox
-from utils.rss_scraper import get_rss_hash, get_rss_entries
+from dotenv import load_dotenv
+
+from utils.api_client import ApiClient, ApiError, get_client, set_client
+from utils.metrics import FEED_ENTRIES, FEED_ERRORS, FEED_STAGE_SECONDS, write_metrics
+from utils.state import PROJECT_DIR
+
+# the modules a command needs (the database drivers, FastAPI, feedparser ...) are
+# imported by the command itself, so that the CLI starts quickly and a command that
+# doesn't use the database works when it is unreachable
+if TYPE_CHECKING:
+    from utils.rss_scraper import FeedResponse
+
+load_dotenv()
+
+# the tables that can be exported and imported, see utils.transfer.TRANSFER_TABLES
+TRANSFER_CHOICES = ("links", "entries", "publishers")
 
 @click.help_option(
         """
@@ -32,8 +48,16 @@ from utils.rss_scraper import get_rss_hash, get_rss_entries
 )
 
 @click.group
-def mycommands():
-    pass
+@click.option("--metrics", "metrics_path", type=click.Path(dir_okay=False, allow_dash=True),
+              help="Write the metrics of the run (Prometheus text format) to this file when it ends, - for stdout")
+@click.option("--api-url", envvar="apiUrl",
+              help="Send the changes to the API server running at this address instead of writing "
+                   "to the database from this process (default: the apiUrl setting)")
+def mycommands(metrics_path: Optional[str], api_url: Optional[str]):
+    if metrics_path:
+        atexit.register(write_metrics, metrics_path)
+    if api_url:
+        set_client(ApiClient(api_url))
 
 @click.command()
 @click.argument("link", type=str, required=1)
@@ -41,7 +65,9 @@ def mycommands():
               help="Insert the type of content (youtube, blog post, article...)")
 @click.option("-c", "--category",
               help="Insert the category of content (startups, programming, art ...)")
-def addLink(link: str, cont_type: Optional[str], category: Optional[str]):
+@click.option("-q", "--queue", "queued", is_flag=True,
+              help="Return at once and let the API fetch the title and save the link in the background")
+def addLink(link: str, cont_type: Optional[str], category: Optional[str], queued: bool):
     """
     This function adds a link to the LINKS table by calling the corresponding method
     of the database's api
@@ -54,36 +80,86 @@ def addLink(link: str, cont_type: Optional[str], category: Optional[str]):
             The type of content the link falls into 
         category: Optional[str]
             The category of content the link falls into
+        queued: bool
+            If True the link is added to the ingestion queue of the API instead
     """
-    date, title = get_link_data(link)
-    schema = Link(link=link,
-                  title=title,
-                  date=date,
-                  type=cont_type,
-                  category=category)
-    create_link(schema)
+    if queued:
+        job = get_client().enqueue_link(link, cont_type, category)
+        click.echo(f"Link queued (job {job})")
+        return None
+    from utils.link_cache import get_link_cache
+    from utils.link_resolver import resolve_link
+
+    date, title = resolve_link(link, cache=get_link_cache())
+    try:
+        get_client().create_link({"link": link,
+                                  "title": title,
+                                  "date": date,
+                                  "type": cont_type,
+                                  "category": category})
+    except ApiError as error:
+        if error.status != 409:
+            raise
+        click.echo(f"The link is already saved: {error.detail}")
+        return None
     click.echo("Link inserted successfully!")
 
 @click.command()
-def add_link_from_email():
+@click.option("-w", "--workers", type=int, default=8, show_default=True,
+              help="Maximum number of pages fetched at the same time")
+@click.option("--per-host", type=int, default=2, show_default=True,
+              help="Maximum number of pages fetched at the same time from the same website")
+@click.option("--timeout", type=float, default=10, show_default=True,
+              help="Seconds after which fetching a page is aborted")
+@click.option("--retries", type=int, default=2, show_default=True,
+              help="Number of times a page that could not be fetched is retried")
+@click.option("--no-cache", is_flag=True, help="Fetch every page instead of using the link metadata cache")
+def add_link_from_email(workers: int, per_host: int, timeout: float, retries: int, no_cache: bool):
     """
-    This function adds links by reading the email inbox. It inserts the links sent 
-    in the day the function is invoked.
+    This function adds links by reading the email inbox. It inserts the links sent
+    since the last time it was invoked (the ones sent in the day, the first time).
+    The sync state is only saved once the links are inserted, so a failed run is
+    picked up again by the next one.
+    The titles of the pages are fetched in parallel; when a title can't be fetched
+    the link itself is used as title.
+
+    Parameters
+    --------------
+        workers: int
+            Global limit on the number of pages fetched at the same time
+        per_host: int
+            Limit on the number of pages fetched at the same time from a single website
+        timeout: float
+            Per-page network timeout in seconds
+        retries: int
+            Number of retries for pages that could not be fetched
+        no_cache: bool
+            If True the link metadata cache is bypassed
     """
-    links = read_email_inbox()
+    from utils.email_scraper import load_sync_state, read_email_inbox, save_sync_state
+    from utils.link_cache import get_link_cache
+    from utils.link_resolver import resolve_links
+
+    links, state = read_email_inbox(state=load_sync_state())
     if len(links) == 0:
+        save_sync_state(state)
         click.echo("There are no links to add to the database")
         return None
-    for link in links:
-    # here i could do without getting the date and recycle date.today()
-        date, title = get_link_data(link)
-        schema = Link(link=link,
-                      title=title,
-                      date=date,
-                      type=None,
-                      category=None)
-        create_link(schema)
-    click.echo("Links inserted successfully!")
+    cache = None if no_cache else get_link_cache()
+    rows = [{"link": link,
+             "title": title,
+             "date": date,
+             "type": None,
+             "category": None}
+            for link, date, title in resolve_links(links, max_workers=workers, per_host=per_host,
+                                                   timeout=timeout, retries=retries, cache=cache)]
+    result = get_client().create_links(rows)
+    save_sync_state(state)
+    click.echo(f"Links inserted successfully! ({result['inserted']} inserted, {result['skipped']} already saved)")
+    if cache is not None:
+        stats = cache.stats()
+        click.echo(f"Link metadata cache: {stats['hits']} hits, {stats['misses']} misses, "
+                   f"{stats['revalidated']} revalidated")
 
 @click.command()
 @click.argument("name", type=str, required=1)
@@ -112,56 +188,418 @@ def add_publisher(name: str, website: str, rss: str, category: Optional[str],
         type: Optional[str]
             THe type of content published by the publisher
     """
-    hash = get_rss_hash(rss)
-    schema = Publisher(name=name,
-                       website=website,
-                       rss=rss,
-                       category=category,
-                       type=pub_type,
-                       hash=hash)
-    create_publisher(schema)
+    # the hash is left empty so that the entries currently in the feed
+    # are inserted by the next weekly_entry_update
+    get_client().create_publisher({"name": name,
+                                   "website": website,
+                                   "rss": rss,
+                                   "category": category,
+                                   "type": pub_type,
+                                   "hash": None})
     click.echo("Publisher added successfully!")
 
+def fetch_publisher_feed(item: dict, timeout: Optional[float] = None, max_entries: Optional[int] = None
+                         ) -> Tuple["FeedResponse", Optional[str]]:
+    """
+    This function downloads the feed of a publisher once, sending the validators
+    stored in the database so that an unchanged feed is neither downloaded nor parsed,
+    and computes the hash of the set of entries it contains.
+    It only does network and parsing work, so it is safe to run on worker threads.
+
+    Parameters
+    --------------
+        item: dict
+            Row returned by get_hashes_from_db
+        timeout: Optional[float]
+            Number of seconds after which downloading the feed is aborted
+        max_entries: Optional[int]
+            If passed, only the first (newest) max_entries entries of the feed are read
+    
+    Returns
+    --------------
+        (tuple) The response and the current hash of the feed, None if the server
+        answered 304 Not Modified (the response still carries its headers, e.g. its
+        Cache-Control max-age)
+    """
+    from utils.rss_scraper import fetch_feed, get_rss_hash
+
+    response = fetch_feed(item["rss"], item["etag"], item["last_modified"], timeout, max_entries)
+    FEED_STAGE_SECONDS.observe(response.fetch_seconds, publisher=item["name"], stage="fetch")
+    if response.not_modified:
+        return response, None
+    with FEED_STAGE_SECONDS.time(publisher=item["name"], stage="hash"):
+        current_hash = get_rss_hash(response.feed)
+    FEED_STAGE_SECONDS.observe(response.parse_seconds, publisher=item["name"], stage="parse")
+    return response, current_hash
+
+def store_publisher_feed(item: dict, value: Tuple["FeedResponse", Optional[str]],
+                         verbose: bool = False):
+    """
+    This function writes the result of fetch_publisher_feed to the database. When the
+    set of entries of the feed changed, the entries whose fingerprint has never been
+    seen are inserted in the ENTRY table and their fingerprints are recorded. Then the
+    hash and validators of the feed are updated if they changed.
+    Returns the number of entries that were inserted.
+
+    Parameters
+    --------------
+        item: dict
+            Row returned by get_hashes_from_db
+        value: tuple
+            Value returned by fetch_publisher_feed for this publisher
+        verbose: bool
+            If True prints additional information
+    """
+    response, current_hash = value
+    if response.not_modified:
+        if verbose:
+            print(item["name"], "has not published anything new")
+        return 0
+    from utils.rss_scraper import get_rss_entries
+
+    client = get_client()
+    with FEED_STAGE_SECONDS.time(publisher=item["name"], stage="insert"):
+        new_entries = []
+        if current_hash != item["hash"]:
+            seen = set(client.get_entry_fingerprints(item["id"]))
+            new_entries = get_rss_entries(response.feed, item["id"], seen)
+        if new_entries:
+            if verbose:
+                print(item["name"], "has published", len(new_entries), "new entries")
+            client.create_entries([{"title": entry[0],
+                                    "link": entry[1],
+                                    "publisher": entry[2],
+                                    "date": entry[3]}
+                                   for entry in new_entries])
+            client.add_entry_fingerprints(item["id"], [entry[4] for entry in new_entries])
+        elif verbose:
+            print(item["name"], "has not published anything new")
+        if (current_hash, response.etag, response.last_modified) != \
+                (item["hash"], item["etag"], item["last_modified"]):
+            client.update_publisher_hash(item["id"], current_hash, response.etag, response.last_modified)
+    FEED_ENTRIES.inc(len(new_entries), publisher=item["name"])
+    return len(new_entries)
+
 @click.command()
 @click.option("-v", "--verbose", help="Prints added information")
-def weekly_entry_update(verbose: bool):
+@click.option("-w", "--workers", type=int, default=16, show_default=True,
+              help="Maximum number of feeds fetched at the same time (1 polls them one by one)")
+@click.option("--per-host", type=int, default=2, show_default=True,
+              help="Maximum number of feeds fetched at the same time from the same host")
+@click.option("--timeout", type=float, default=30, show_default=True,
+              help="Seconds after which downloading a single feed is aborted")
+@click.option("--max-entries", type=int,
+              help="Only read the first (newest) entries of each feed, e.g. for very large podcast feeds")
+def weekly_entry_update(verbose: bool, workers: int, per_host: int, timeout: float,
+                        max_entries: Optional[int]):
     """
     This function is meant to be run weekly (this can be scheduled by the user).
     It will read the hashes form the PUBLISHERS table and compare them with the ones
     calculated at the moment the function is invoked. If they are different that means
     content has been published, so it is scraped from the rss feed and inserted in the
-    ENTRY table. Finally the hash stored in the database is updated
+    ENTRY table. Finally the hash stored in the database is updated.
+    The feeds are fetched concurrently, while the database is written from this thread.
+    A feed that fails is reported in the final summary and does not stop the others.
 
     Parameters
     --------------
         verbose: bool
             If True prints additional information while the function is being executed.
+        workers: int
+            Global limit on the number of feeds fetched at the same time
+        per_host: int
+            Limit on the number of feeds fetched at the same time from a single host
+        timeout: float
+            Per-feed network timeout in seconds
+        max_entries: Optional[int]
+            Maximum number of entries read from each feed
     """
-    db_hashes = get_hashes_from_db()
-    for item in db_hashes:
-        current_hash = get_rss_hash(item["rss"])
-        if current_hash != item["hash"]:
-            if verbose:
-                print(item["name"], "has published something this week")
-            
-            weekly_entries = get_rss_entries(item["rss"], item["id"])
-
-            for entry in weekly_entries:
-                schema = Entry(title=entry[0], 
-                               link=entry[1], 
-                               publisher=entry[2], 
-                               date=entry[3])
-                create_entry(schema)
-            
-            update_publisher_hash(item["id"], current_hash)
-        if verbose:
-            print(item["name"], "has not published anything this week")
+    from utils.feed_poller import PollSummary, poll_feeds
+
+    db_hashes = get_client().get_hashes_from_db()
+    summary = PollSummary()
+    fetch = partial(fetch_publisher_feed, timeout=timeout, max_entries=max_entries)
+    for result in poll_feeds(db_hashes, fetch, max_workers=workers, per_host=per_host):
+        item = result.publisher
+        if result.ok:
+            try:
+                store_publisher_feed(item, result.value, verbose)
+            except Exception as error:
+                result.error = error
+        if not result.ok:
+            FEED_ERRORS.inc(publisher=item["name"])
+        if not result.ok and verbose:
+            print(item["name"], "could not be updated:", result.error)
+        summary.add(result)
+    click.echo(summary.report())
     click.echo("Weekly entries updated successfully")
 
+@click.command()
+@click.option("-v", "--verbose", is_flag=True, help="Prints added information")
+@click.option("-w", "--workers", type=int, default=16, show_default=True,
+              help="Maximum number of feeds fetched at the same time")
+@click.option("--per-host", type=int, default=2, show_default=True,
+              help="Maximum number of feeds fetched at the same time from the same host")
+@click.option("--timeout", type=float, default=30, show_default=True,
+              help="Seconds after which downloading a single feed is aborted")
+@click.option("--max-entries", type=int,
+              help="Only read the first (newest) entries of each feed, e.g. for very large podcast feeds")
+@click.option("--min-interval", type=float, default=15, show_default=True,
+              help="Minimum number of minutes between two polls of the same feed")
+@click.option("--max-interval", type=float, default=7 * 24 * 60, show_default=True,
+              help="Maximum number of minutes between two polls of the same feed")
+@click.option("--state", "state_path", type=click.Path(dir_okay=False),
+              default=lambda: os.environ.get("schedulerStatePath", os.path.join(PROJECT_DIR, ".scheduler_state.json")),
+              help="File where the polling state is kept between restarts")
+@click.option("--once", is_flag=True, help="Poll the feeds that are due and exit instead of running forever")
+def scheduler(verbose: bool, workers: int, per_host: int, timeout: float, max_entries: Optional[int],
+              min_interval: float, max_interval: float, state_path: str, once: bool):
+    """
+    This function keeps the ENTRY table up to date by polling every publisher's feed
+    when it is due, instead of all of them once a week. Feeds of publishers that publish
+    often are polled often, dormant feeds less and less (see FeedScheduler); the RSS
+    <ttl> and Cache-Control max-age of the feeds are respected and failing feeds are
+    retried with an exponential backoff. The polling state is saved after every round,
+    so the scheduler can be stopped (Ctrl+C) and restarted.
+
+    Parameters
+    --------------
+        verbose: bool
+            If True prints additional information while the function is being executed.
+        workers, per_host, timeout, max_entries:
+            See weekly_entry_update
+        min_interval, max_interval: float
+            Bounds, in minutes, of the interval between two polls of the same feed
+        state_path: str
+            Path of the file holding the polling state
+        once: bool
+            If True only the feeds that are due are polled, then the function returns
+    """
+    from utils.feed_poller import poll_feeds
+    from utils.scheduler import FeedScheduler
+
+    feeds = FeedScheduler.load(state_path, min_interval=min_interval * 60, max_interval=max_interval * 60)
+    fetch = partial(fetch_publisher_feed, timeout=timeout, max_entries=max_entries)
+    try:
+        while True:
+            publishers = {item["id"]: item for item in get_client().get_hashes_from_db()}
+            feeds.sync(publishers)
+            due = [publishers[publisher] for publisher in feeds.pop_due()]
+            for result in poll_feeds(due, fetch, max_workers=workers, per_host=per_host):
+                item = result.publisher
+                if result.ok:
+                    try:
+                        new_entries = store_publisher_feed(item, result.value, verbose)
+                    except Exception as error:
+                        result.error = error
+                if result.ok:
+                    # on a 304 the feed is None, but its headers may still carry a max-age
+                    response = result.value[0]
+                    schedule = feeds.record_success(item["id"], response.feed, response.headers, new_entries)
+                else:
+                    FEED_ERRORS.inc(publisher=item["name"])
+                    schedule = feeds.record_failure(item["id"])
+                    click.echo(f"{item['name']} could not be updated: {result.error}")
+                if verbose:
+                    click.echo(f"{item['name']} will be polled again in {(schedule.next_poll - time.time()) / 60:.0f} minutes")
+            if due:
+                feeds.save(state_path)
+            if once:
+                break
+            wait = feeds.seconds_until_next()
+            # new publishers are picked up at least once a minute
+            time.sleep(60 if wait is None else min(wait, 60))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        feeds.save(state_path)
+
+@click.command()
+@click.option("--target", type=int, help="Last migration version to apply (default: all)")
+@click.option("--list", "list_only", is_flag=True, help="Only list the migrations and whether they are applied")
+def migrate(target: Optional[int], list_only: bool):
+    """
+    This function brings the database schema up to date by applying, in order, the
+    migrations in sql/migrations that have not been applied yet.
+
+    Parameters
+    --------------
+        target: Optional[int]
+            The last migration version to apply
+        list_only: bool
+            If True the migrations are listed and nothing is applied
+    """
+    from storage import get_repository
+    from utils.migrations import discover_migrations, migrate as apply_migrations, pending_migrations
+
+    if list_only:
+        pending = {migration.version for migration in pending_migrations()}
+        for migration in discover_migrations(dialect=get_repository().dialect):
+            status = "pending" if migration.version in pending else "applied"
+            click.echo(f"{migration.version:04d} {migration.name}: {status}")
+        return None
+    applied = apply_migrations(target)
+    for migration in applied:
+        click.echo(f"Applied {migration.version:04d} {migration.name}")
+    click.echo(f"{len(applied)} migrations applied, the database is up to date"
+               if target is None else f"{len(applied)} migrations applied")
+
+@click.command()
+@click.option("--strict", is_flag=True, help="Exit with an error if a query does an unexpected full table scan")
+def explain(strict: bool):
+    """
+    This function prints the EXPLAIN plan of every query issued by the API endpoints
+    and flags the ones that scan a whole table when they should use an index.
+
+    Parameters
+    --------------
+        strict: bool
+            If True the command fails when an unexpected full table scan is found
+    """
+    from storage import get_repository
+    from utils.query_plans import explain_queries
+
+    if get_repository().backend != "mysql":
+        raise click.ClickException("explain reads the MySQL query plans, it needs storageBackend=mysql")
+    regressions = []
+    for query, plan, regression in explain_queries():
+        click.echo(f"{'FULL SCAN ' if regression else ''}{query.name}: {query.sql}")
+        for step in plan:
+            click.echo(f"    table={step.get('table')} type={step.get('type')} key={step.get('key')} "
+                       f"rows={step.get('rows')} extra={step.get('Extra')}")
+        if regression:
+            regressions.append(query.name)
+    if regressions:
+        click.echo(f"{len(regressions)} queries do a full table scan: {', '.join(regressions)}")
+        if strict:
+            raise SystemExit(1)
+    else:
+        click.echo("Every endpoint query uses an index")
+
+@click.command()
+@click.argument("table", type=click.Choice(TRANSFER_CHOICES))
+@click.option("-o", "--output", type=click.Path(dir_okay=False, allow_dash=True), default="-", show_default=True,
+              help="File the rows are written to, - for stdout")
+@click.option("-f", "--format", "format", type=click.Choice(["ndjson", "csv", "parquet"]),
+              help="Format of the file (default: from the extension of the output, ndjson otherwise)")
+@click.option("--chunk-size", type=int, default=5000, show_default=True,
+              help="Rows read from the database and written at a time")
+def export(table: str, output: str, format: Optional[str], chunk_size: int):
+    """
+    This function writes every row of the LINKS, ENTRY (entries) or PUBLISHERS table to
+    a file, a chunk at a time so that memory usage does not depend on the size of the table.
+
+    Parameters
+    --------------
+        table: str
+            links, entries or publishers
+        output: str
+            The file the rows are written to
+        format: Optional[str]
+            ndjson, csv or parquet (a columnar format for analytics, needs pyarrow)
+        chunk_size: int
+            The number of rows read and written at a time
+    """
+    from storage import TABLES, get_repository
+    from utils.transfer import TRANSFER_TABLES, UnsupportedFormat, check_format, export_chunks, format_from_path
+
+    format = format or format_from_path(output) or "ndjson"
+    name = TRANSFER_TABLES[table]
+    try:
+        check_format(format, name)
+    except UnsupportedFormat as error:
+        raise click.ClickException(str(error))
+    start = time.perf_counter()
+    rows = 0
+    with click.open_file(output, "wb") as file:
+        def counted(chunks):
+            nonlocal rows
+            for chunk in chunks:
+                rows += len(chunk)
+                yield chunk
+
+        for data in export_chunks(counted(get_repository().stream_rows(name, chunk_size=chunk_size)),
+                                  TABLES[name].columns, format):
+            file.write(data)
+    elapsed = time.perf_counter() - start
+    click.echo(f"Exported {rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s)", err=True)
+
+@click.command("import")
+@click.argument("table", type=click.Choice(TRANSFER_CHOICES))
+@click.argument("source", type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option("-f", "--format", "format", type=click.Choice(["ndjson", "csv", "parquet", "opml"]),
+              help="Format of the file (default: from its extension, ndjson otherwise)")
+@click.option("--chunk-size", type=int, default=10000, show_default=True,
+              help="Rows inserted in a single transaction")
+def import_table(table: str, source: str, format: Optional[str], chunk_size: int):
+    """
+    This function loads the rows of a file (e.g. written by export, or an OPML list of
+    feeds for publishers) in the LINKS, ENTRY (entries) or PUBLISHERS table, in batches.
+    Rows that are already in the table are skipped.
+
+    Parameters
+    --------------
+        table: str
+            links, entries or publishers
+        source: str
+            The file to import, - for stdin
+        format: Optional[str]
+            ndjson, csv, parquet (needs pyarrow) or opml (publishers only)
+        chunk_size: int
+            The number of rows inserted in a single transaction
+    """
+    from storage import get_repository
+    from utils.response_cache import get_response_cache
+    from utils.transfer import TRANSFER_TABLES, MalformedFile, UnsupportedFormat, check_format, format_from_path, \
+        import_records, read_records
+
+    format = format or format_from_path(source) or "ndjson"
+    name = TRANSFER_TABLES[table]
+    try:
+        check_format(format, name, importing=True)
+        with click.open_file(source, "rb") as file:
+            summary = import_records(get_repository(), name, read_records(file, format, chunk_size))
+    except (UnsupportedFormat, MalformedFile) as error:
+        # the chunks read before the error were inserted
+        get_response_cache().invalidate(name)
+        raise click.ClickException(str(error))
+    if summary.inserted:
+        get_response_cache().invalidate(name)
+    click.echo(summary.report())
+
+@click.command()
+@click.option("--chunk-size", type=int, default=1000, show_default=True, help="Rows read and rewritten at a time")
+def canonicalize(chunk_size: int):
+    """
+    This function rewrites the links of the LINKS and ENTRY tables that are not in
+    canonical form (e.g. stored with tracking parameters before migration 0006) and
+    removes the rows that turn out to be duplicates. It can be run again safely, e.g.
+    after the canonicalization rules changed.
+
+    Parameters
+    --------------
+        chunk_size: int
+            The number of rows read and rewritten at a time
+    """
+    from storage import get_repository
+    from utils.response_cache import get_response_cache
+
+    for table in ("links", "entry"):
+        updated, deleted = get_repository().canonicalize(table, chunk_size)
+        if updated or deleted:
+            get_response_cache().invalidate(table)
+        click.echo(f"{table}: {updated} links rewritten, {deleted} duplicates removed")
+
 mycommands.add_command(addLink)
 mycommands.add_command(add_link_from_email)
 mycommands.add_command(add_publisher)
 mycommands.add_command(weekly_entry_update)
+mycommands.add_command(scheduler)
+mycommands.add_command(migrate)
+mycommands.add_command(canonicalize)
+mycommands.add_command(explain)
+mycommands.add_command(export)
+mycommands.add_command(import_table)
 
 if __name__ == "__main__":
     mycommands()
\ No newline at end of file
@@ -0,0 +1,288 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import mysql.connector
+from mysql.connector.constants import ClientFlag
+from dotenv import load_dotenv
+
+from utils.metrics import DB_QUERY_ROWS, DB_QUERY_SECONDS, query_labels
+
+load_dotenv()
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no database connection becomes available within the pool's timeout.
+    """
+
+
+class ConnectionPool:
+    """
+    A thread safe pool of MySQL connections.
+
+    At most size connections are kept open while idle; up to max_overflow more are
+    opened when the pool is exhausted and closed as soon as they are returned. Callers
+    that find every connection in use wait up to timeout seconds before PoolTimeout
+    is raised. Connections idle for more than ping_after seconds are checked (and
+    transparently reconnected) before being handed out, and connections older than
+    recycle seconds are replaced.
+    """
+
+    def __init__(self, size: int = 5, max_overflow: int = 10, timeout: float = 30,
+                 recycle: float = 3600, ping_after: float = 30, **connect_args):
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self.connect_args = connect_args
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size + max_overflow)
+        self._lock = threading.Lock()
+        self._open = 0
+        self._checked_out = 0
+        self._created = {}
+        self._counters = {"checkouts": 0, "timeouts": 0, "reconnects": 0, "discarded": 0,
+                          "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+
+    def _connect(self):
+        connection = mysql.connector.connect(**self.connect_args)
+        with self._lock:
+            self._open += 1
+        self._created[id(connection)] = time.monotonic()
+        return connection
+
+    def _close(self, connection):
+        self._created.pop(id(connection), None)
+        with self._lock:
+            self._open -= 1
+        try:
+            connection.close()
+        except mysql.connector.Error:
+            pass
+
+    def _checkout_idle(self):
+        """
+        Returns a healthy idle connection, or None if there are no idle connections.
+        """
+        while True:
+            try:
+                connection, returned_at = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            now = time.monotonic()
+            if now - self._created.get(id(connection), now) > self.recycle:
+                self._close(connection)
+                continue
+            if now - returned_at > self.ping_after:
+                try:
+                    connection.ping()
+                except mysql.connector.Error:
+                    try:
+                        connection.reconnect(attempts=1)
+                    except mysql.connector.Error:
+                        self._close(connection)
+                        continue
+                    with self._lock:
+                        self._counters["reconnects"] += 1
+            return connection
+
+    def acquire(self):
+        """
+        Checks a connection out of the pool, opening a new one if needed.
+        """
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._counters["timeouts"] += 1
+            raise PoolTimeout(f"No database connection available after {self.timeout}s")
+        waited = time.perf_counter() - start
+        try:
+            connection = self._checkout_idle() or self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._checked_out += 1
+            self._counters["checkouts"] += 1
+            self._counters["wait_seconds_total"] += waited
+            self._counters["wait_seconds_max"] = max(self._counters["wait_seconds_max"], waited)
+        return connection
+
+    def release(self, connection, discard: bool = False):
+        """
+        Returns a connection to the pool. Broken and overflow connections are closed.
+        """
+        with self._lock:
+            self._checked_out -= 1
+            overflow = self._open > self.size
+        if discard or overflow:
+            with self._lock:
+                self._counters["discarded"] += discard
+            self._close(connection)
+        else:
+            self._idle.put((connection, time.monotonic()))
+        self._slots.release()
+
+    def stats(self) -> dict:
+        """
+        Returns the current usage of the pool and its cumulative counters.
+        """
+        with self._lock:
+            checkouts = self._counters["checkouts"]
+            return {"size": self.size,
+                    "max_overflow": self.max_overflow,
+                    "open": self._open,
+                    "checked_out": self._checked_out,
+                    "idle": self._idle.qsize(),
+                    "overflow": max(self._open - self.size, 0),
+                    **self._counters,
+                    "wait_seconds_avg": self._counters["wait_seconds_total"] / checkouts if checkouts else 0.0}
+
+    def close(self):
+        """
+        Closes every idle connection.
+        """
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            self._close(connection)
+
+
+class InstrumentedCursor:
+    """
+    Wraps a cursor to record the time spent executing each statement and the number
+    of rows it returned or affected in the database metrics. Rows of unbuffered
+    cursors are counted as they are fetched.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._labels = None
+        self._count_fetched = False
+
+    def _executed(self, statement: str, start: float):
+        self._labels = query_labels(statement)
+        DB_QUERY_SECONDS.observe(time.perf_counter() - start, **self._labels)
+        rows = self._cursor.rowcount
+        self._count_fetched = rows is None or rows < 0
+        if not self._count_fetched and rows:
+            DB_QUERY_ROWS.inc(rows, **self._labels)
+
+    def _fetched(self, rows: int):
+        if self._count_fetched and rows:
+            DB_QUERY_ROWS.inc(rows, **self._labels)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            self._executed(operation, start)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            self._executed(operation, start)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._fetched(row is not None)
+        return row
+
+    def fetchmany(self, size=1):
+        rows = self._cursor.fetchmany(size)
+        self._fetched(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._fetched(len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """
+    This function returns the process wide connection pool, creating it on first use
+    from the settings in the environment (.env file):
+
+        dbHost, dbPort, dbName, dbUserName, dbPassword
+        dbPoolSize (5), dbPoolMaxOverflow (10), dbPoolTimeout (30 seconds),
+        dbPoolRecycle (3600 seconds), dbPoolPingAfter (30 seconds)
+
+    It can also be used as a FastAPI dependency.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(size=int(os.environ.get("dbPoolSize", 5)),
+                                   max_overflow=int(os.environ.get("dbPoolMaxOverflow", 10)),
+                                   timeout=float(os.environ.get("dbPoolTimeout", 30)),
+                                   recycle=float(os.environ.get("dbPoolRecycle", 3600)),
+                                   ping_after=float(os.environ.get("dbPoolPingAfter", 30)),
+                                   host=os.environ.get("dbHost", "localhost"),
+                                   port=int(os.environ.get("dbPort", 3306)),
+                                   user=os.environ.get("dbUserName"),
+                                   password=os.environ.get("dbPassword"),
+                                   database=os.environ.get("dbName", "content_manager"),
+                                   # UPDATE reports the rows it matched rather than the rows
+                                   # it changed, so that updating a row with its current
+                                   # values is not mistaken for a missing row
+                                   client_flags=[ClientFlag.FOUND_ROWS])
+        return _pool
+
+@contextmanager
+def session(buffered: bool = True):
+    """
+    This function checks a connection out of the pool and yields a cursor on it,
+    instrumented to record the database metrics (see InstrumentedCursor). The
+    transaction is committed when the block exits normally and rolled back when it
+    raises; the connection is then returned to the pool (or discarded if it broke).
+
+    Parameters
+    --------------
+        buffered: bool
+            If False the cursor streams the rows from the server instead of
+            fetching the whole result set when the query is executed
+    """
+    pool = get_pool()
+    connection = pool.acquire()
+    discard = False
+    cursor = None
+    try:
+        cursor = connection.cursor(buffered=buffered)
+        yield InstrumentedCursor(cursor)
+        connection.commit()
+    except (mysql.connector.OperationalError, mysql.connector.InterfaceError):
+        discard = True
+        raise
+    except BaseException:
+        try:
+            connection.rollback()
+        except mysql.connector.Error:
+            discard = True
+        raise
+    finally:
+        if cursor is not None:
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                discard = True
+        pool.release(connection, discard)
@@ -0,0 +1,3 @@
+CALL venv\Scripts\activate.bat
+python cli.py scheduler -v
+CALL venv\Scripts\deactivate.bat
\ No newline at end of file
@@ -23,16 +23,52 @@ DROP TABLE IF EXISTS `entry`;
 /*!40101 SET @saved_cs_client     = @@character_set_client */;
 /*!50503 SET character_set_client = utf8mb4 */;
 CREATE TABLE `entry` (
+  `id` bigint NOT NULL AUTO_INCREMENT,
   `title` varchar(300) NOT NULL,
-  `link` varchar(300) NOT NULL,
+  `link` varchar(2048) NOT NULL,
   `publisher` int DEFAULT NULL,
   `date` date DEFAULT NULL,
-  PRIMARY KEY (`title`,`link`),
-  KEY `publisher` (`publisher`),
+  `link_hash` char(32) CHARACTER SET ascii NOT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `entry_link_hash` (`link_hash`),
+  KEY `entry_date` (`date`),
+  KEY `entry_publisher_date` (`publisher`,`date`),
+  FULLTEXT KEY `entry_title_fulltext` (`title`),
   CONSTRAINT `entry_ibfk_1` FOREIGN KEY (`publisher`) REFERENCES `publishers` (`id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `entry_fingerprints`
+--
+
+DROP TABLE IF EXISTS `entry_fingerprints`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `entry_fingerprints` (
+  `publisher` int NOT NULL,
+  `fingerprint` char(32) NOT NULL,
+  PRIMARY KEY (`publisher`,`fingerprint`),
+  CONSTRAINT `entry_fingerprints_ibfk_1` FOREIGN KEY (`publisher`) REFERENCES `publishers` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=ascii;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `entry_stats`
+--
+
+DROP TABLE IF EXISTS `entry_stats`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `entry_stats` (
+  `publisher` int NOT NULL,
+  `week` char(10) CHARACTER SET ascii COLLATE ascii_general_ci NOT NULL,
+  `month` char(7) CHARACTER SET ascii COLLATE ascii_general_ci NOT NULL,
+  `entries` int NOT NULL,
+  PRIMARY KEY (`publisher`,`week`,`month`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `links`
 --
@@ -41,12 +77,34 @@ DROP TABLE IF EXISTS `links`;
 /*!40101 SET @saved_cs_client     = @@character_set_client */;
 /*!50503 SET character_set_client = utf8mb4 */;
 CREATE TABLE `links` (
-  `link` varchar(300) NOT NULL,
+  `id` bigint NOT NULL AUTO_INCREMENT,
+  `link` varchar(2048) NOT NULL,
   `title` varchar(300) NOT NULL,
   `date` date DEFAULT NULL,
   `type` varchar(100) DEFAULT NULL,
   `category` varchar(100) DEFAULT NULL,
-  PRIMARY KEY (`link`,`title`)
+  `link_hash` char(32) CHARACTER SET ascii NOT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `links_link_hash` (`link_hash`),
+  KEY `links_title` (`title`),
+  FULLTEXT KEY `links_title_fulltext` (`title`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `links_stats`
+--
+
+DROP TABLE IF EXISTS `links_stats`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `links_stats` (
+  `type` varchar(100) NOT NULL,
+  `category` varchar(100) NOT NULL,
+  `week` char(10) CHARACTER SET ascii COLLATE ascii_general_ci NOT NULL,
+  `month` char(7) CHARACTER SET ascii COLLATE ascii_general_ci NOT NULL,
+  `links` int NOT NULL,
+  PRIMARY KEY (`type`,`category`,`week`,`month`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
@@ -65,10 +123,87 @@ CREATE TABLE `publishers` (
   `type` varchar(100) DEFAULT NULL,
   `category` varchar(100) DEFAULT NULL,
   `hash` varchar(300) DEFAULT NULL,
+  `etag` varchar(300) DEFAULT NULL,
+  `last_modified` varchar(100) DEFAULT NULL,
   PRIMARY KEY (`name`,`website`),
   UNIQUE KEY `id` (`id`)
 ) ENGINE=InnoDB AUTO_INCREMENT=2 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `schema_migrations`
+--
+
+DROP TABLE IF EXISTS `schema_migrations`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `schema_migrations` (
+  `version` int NOT NULL,
+  `name` varchar(200) NOT NULL,
+  `applied_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`version`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `schema_migrations`
+--
+-- This dump already contains the schema produced by these migrations
+--
+
+LOCK TABLES `schema_migrations` WRITE;
+/*!40000 ALTER TABLE `schema_migrations` DISABLE KEYS */;
+INSERT INTO `schema_migrations` (`version`, `name`) VALUES (1,'publisher_validators'),(2,'entry_fingerprints'),(3,'lookup_indexes'),(4,'entry_date_indexes'),(5,'fulltext_search'),(6,'link_hashes'),(7,'summary_stats');
+/*!40000 ALTER TABLE `schema_migrations` ENABLE KEYS */;
+UNLOCK TABLES;
+--
+-- Triggers keeping links_stats and entry_stats up to date (see migration 0007)
+--
+
+CREATE TRIGGER `links_stats_insert` AFTER INSERT ON `links` FOR EACH ROW
+  INSERT INTO `links_stats` (`type`, `category`, `week`, `month`, `links`)
+  VALUES (COALESCE(NEW.`type`, ''), COALESCE(NEW.`category`, ''),
+          COALESCE(DATE_FORMAT(NEW.`date` - INTERVAL WEEKDAY(NEW.`date`) DAY, '%Y-%m-%d'), ''),
+          COALESCE(DATE_FORMAT(NEW.`date`, '%Y-%m'), ''), 1)
+  ON DUPLICATE KEY UPDATE `links` = `links` + 1;
+CREATE TRIGGER `links_stats_delete` AFTER DELETE ON `links` FOR EACH ROW
+  UPDATE `links_stats` SET `links` = `links` - 1
+  WHERE `type` = COALESCE(OLD.`type`, '') AND `category` = COALESCE(OLD.`category`, '')
+    AND `week` = COALESCE(DATE_FORMAT(OLD.`date` - INTERVAL WEEKDAY(OLD.`date`) DAY, '%Y-%m-%d'), '')
+    AND `month` = COALESCE(DATE_FORMAT(OLD.`date`, '%Y-%m'), '');
+CREATE TRIGGER `links_stats_update_old` AFTER UPDATE ON `links` FOR EACH ROW
+  UPDATE `links_stats` SET `links` = `links` - 1
+  WHERE `type` = COALESCE(OLD.`type`, '') AND `category` = COALESCE(OLD.`category`, '')
+    AND `week` = COALESCE(DATE_FORMAT(OLD.`date` - INTERVAL WEEKDAY(OLD.`date`) DAY, '%Y-%m-%d'), '')
+    AND `month` = COALESCE(DATE_FORMAT(OLD.`date`, '%Y-%m'), '');
+CREATE TRIGGER `links_stats_update_new` AFTER UPDATE ON `links` FOR EACH ROW FOLLOWS `links_stats_update_old`
+  INSERT INTO `links_stats` (`type`, `category`, `week`, `month`, `links`)
+  VALUES (COALESCE(NEW.`type`, ''), COALESCE(NEW.`category`, ''),
+          COALESCE(DATE_FORMAT(NEW.`date` - INTERVAL WEEKDAY(NEW.`date`) DAY, '%Y-%m-%d'), ''),
+          COALESCE(DATE_FORMAT(NEW.`date`, '%Y-%m'), ''), 1)
+  ON DUPLICATE KEY UPDATE `links` = `links` + 1;
+CREATE TRIGGER `entry_stats_insert` AFTER INSERT ON `entry` FOR EACH ROW
+  INSERT INTO `entry_stats` (`publisher`, `week`, `month`, `entries`)
+  VALUES (COALESCE(NEW.`publisher`, 0),
+          COALESCE(DATE_FORMAT(NEW.`date` - INTERVAL WEEKDAY(NEW.`date`) DAY, '%Y-%m-%d'), ''),
+          COALESCE(DATE_FORMAT(NEW.`date`, '%Y-%m'), ''), 1)
+  ON DUPLICATE KEY UPDATE `entries` = `entries` + 1;
+CREATE TRIGGER `entry_stats_delete` AFTER DELETE ON `entry` FOR EACH ROW
+  UPDATE `entry_stats` SET `entries` = `entries` - 1
+  WHERE `publisher` = COALESCE(OLD.`publisher`, 0)
+    AND `week` = COALESCE(DATE_FORMAT(OLD.`date` - INTERVAL WEEKDAY(OLD.`date`) DAY, '%Y-%m-%d'), '')
+    AND `month` = COALESCE(DATE_FORMAT(OLD.`date`, '%Y-%m'), '');
+CREATE TRIGGER `entry_stats_update_old` AFTER UPDATE ON `entry` FOR EACH ROW
+  UPDATE `entry_stats` SET `entries` = `entries` - 1
+  WHERE `publisher` = COALESCE(OLD.`publisher`, 0)
+    AND `week` = COALESCE(DATE_FORMAT(OLD.`date` - INTERVAL WEEKDAY(OLD.`date`) DAY, '%Y-%m-%d'), '')
+    AND `month` = COALESCE(DATE_FORMAT(OLD.`date`, '%Y-%m'), '');
+CREATE TRIGGER `entry_stats_update_new` AFTER UPDATE ON `entry` FOR EACH ROW FOLLOWS `entry_stats_update_old`
+  INSERT INTO `entry_stats` (`publisher`, `week`, `month`, `entries`)
+  VALUES (COALESCE(NEW.`publisher`, 0),
+          COALESCE(DATE_FORMAT(NEW.`date` - INTERVAL WEEKDAY(NEW.`date`) DAY, '%Y-%m-%d'), ''),
+          COALESCE(DATE_FORMAT(NEW.`date`, '%Y-%m'), ''), 1)
+  ON DUPLICATE KEY UPDATE `entries` = `entries` + 1;
 /*!40103 SET TIME_ZONE=@OLD_TIME_ZONE */;
 
 /*!40101 SET SQL_MODE=@OLD_SQL_MODE */;
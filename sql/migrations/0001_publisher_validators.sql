@@ -0,0 +1,6 @@
+-- HTTP validators of the last download of each publisher's rss feed,
+-- sent back as If-None-Match / If-Modified-Since by weekly_entry_update. Databases
+-- created from a db_dump.sql older than these columns need it before the first update.
+ALTER TABLE `publishers`
+  ADD COLUMN `etag` varchar(300) DEFAULT NULL AFTER `hash`,
+  ADD COLUMN `last_modified` varchar(100) DEFAULT NULL AFTER `etag`;
@@ -0,0 +1,11 @@
+-- Fingerprints (MD5 of the link) of the entries already seen in each feed
+CREATE TABLE `entry_fingerprints` (
+  `publisher` int NOT NULL,
+  `fingerprint` char(32) NOT NULL,
+  PRIMARY KEY (`publisher`,`fingerprint`),
+  CONSTRAINT `entry_fingerprints_ibfk_1` FOREIGN KEY (`publisher`) REFERENCES `publishers` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=ascii;
+
+-- the entries already stored count as seen
+INSERT IGNORE INTO `entry_fingerprints`
+  SELECT `publisher`, MD5(`link`) FROM `entry` WHERE `publisher` IS NOT NULL;
@@ -0,0 +1,4 @@
+-- links are looked up, updated and deleted by title alone, but the primary key
+-- is (link, title); entries are deleted by link, but the primary key is (title, link)
+CREATE INDEX `links_title` ON `links` (`title`);
+CREATE INDEX `entry_link` ON `entry` (`link`);
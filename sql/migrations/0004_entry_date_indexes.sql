@@ -0,0 +1,5 @@
+-- entries are filtered by date range, on their own or for a single publisher.
+-- (publisher, date) also serves the foreign key, so it replaces the `publisher` index
+CREATE INDEX `entry_date` ON `entry` (`date`);
+CREATE INDEX `entry_publisher_date` ON `entry` (`publisher`, `date`);
+DROP INDEX `publisher` ON `entry`;
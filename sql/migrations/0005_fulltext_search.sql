@@ -0,0 +1,3 @@
+-- used by GET /search, InnoDB can only build one FULLTEXT index per statement
+ALTER TABLE `links` ADD FULLTEXT INDEX `links_title_fulltext` (`title`);
+ALTER TABLE `entry` ADD FULLTEXT INDEX `entry_title_fulltext` (`title`);
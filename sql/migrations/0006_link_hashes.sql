@@ -0,0 +1,26 @@
+-- links and entries are identified by an id and deduplicated on the md5 of their
+-- canonical link (utils.urls.url_hash) instead of a primary key on (link, title):
+-- the same article shared with different titles or tracking parameters was stored
+-- several times, and varchar(300) rejected longer urls.
+-- The hashes computed here are those of the links as stored; `python cli.py canonicalize`
+-- rewrites the links that are not in canonical form and their hashes afterwards.
+ALTER TABLE `links` DROP PRIMARY KEY,
+  ADD COLUMN `id` bigint NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST,
+  MODIFY `link` varchar(2048) NOT NULL,
+  ADD COLUMN `link_hash` char(32) CHARACTER SET ascii DEFAULT NULL;
+UPDATE `links` SET `link_hash` = MD5(`link`);
+-- keep the first of the rows with the same link
+DELETE duplicate FROM `links` duplicate JOIN `links` kept
+  ON kept.`link_hash` = duplicate.`link_hash` AND kept.`id` < duplicate.`id`;
+ALTER TABLE `links` MODIFY `link_hash` char(32) CHARACTER SET ascii NOT NULL,
+  ADD UNIQUE KEY `links_link_hash` (`link_hash`);
+
+ALTER TABLE `entry` DROP PRIMARY KEY, DROP INDEX `entry_link`,
+  ADD COLUMN `id` bigint NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST,
+  MODIFY `link` varchar(2048) NOT NULL,
+  ADD COLUMN `link_hash` char(32) CHARACTER SET ascii DEFAULT NULL;
+UPDATE `entry` SET `link_hash` = MD5(`link`);
+DELETE duplicate FROM `entry` duplicate JOIN `entry` kept
+  ON kept.`link_hash` = duplicate.`link_hash` AND kept.`id` < duplicate.`id`;
+ALTER TABLE `entry` MODIFY `link_hash` char(32) CHARACTER SET ascii NOT NULL,
+  ADD UNIQUE KEY `entry_link_hash` (`link_hash`);
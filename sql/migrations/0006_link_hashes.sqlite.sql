@@ -0,0 +1,33 @@
+-- SQLite version of 0006_link_hashes.sql. SQLite can't change the primary key of a
+-- table, so links and entry are rebuilt with the schema of sql/sqlite_schema.sql,
+-- which recreates their indexes and triggers after the migration. The rowids are
+-- kept, so the full text indexes stay valid. The links are canonicalized here with
+-- the canonical_url and url_hash functions the repository registers.
+DELETE FROM links WHERE rowid NOT IN (SELECT MIN(rowid) FROM links GROUP BY url_hash(link));
+CREATE TABLE links_rebuilt (
+  id INTEGER PRIMARY KEY,
+  link varchar(2048) NOT NULL,
+  title varchar(300) NOT NULL COLLATE NOCASE,
+  date date DEFAULT NULL,
+  type varchar(100) DEFAULT NULL COLLATE NOCASE,
+  category varchar(100) DEFAULT NULL COLLATE NOCASE,
+  link_hash char(32) NOT NULL UNIQUE
+);
+INSERT INTO links_rebuilt (id, link, title, date, type, category, link_hash)
+SELECT rowid, canonical_url(link), title, date, type, category, url_hash(link) FROM links;
+DROP TABLE links;
+ALTER TABLE links_rebuilt RENAME TO links;
+
+DELETE FROM entry WHERE rowid NOT IN (SELECT MIN(rowid) FROM entry GROUP BY url_hash(link));
+CREATE TABLE entry_rebuilt (
+  id INTEGER PRIMARY KEY,
+  title varchar(300) NOT NULL COLLATE NOCASE,
+  link varchar(2048) NOT NULL,
+  publisher INTEGER DEFAULT NULL REFERENCES publishers (id),
+  date date DEFAULT NULL,
+  link_hash char(32) NOT NULL UNIQUE
+);
+INSERT INTO entry_rebuilt (id, title, link, publisher, date, link_hash)
+SELECT rowid, title, canonical_url(link), publisher, date, url_hash(link) FROM entry;
+DROP TABLE entry;
+ALTER TABLE entry_rebuilt RENAME TO entry;
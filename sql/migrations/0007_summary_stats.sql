@@ -0,0 +1,77 @@
+-- used by GET /stats: the number of links and entries of every week and month (the
+-- monday of the week, YYYY-MM; '' for the undated rows), kept up to date by triggers
+-- so that the statistics never scan links and entry. A week spanning two months has
+-- a row in each. Type, category and publisher are '' (0 for the publisher) when missing.
+CREATE TABLE `links_stats` (
+  `type` varchar(100) NOT NULL,
+  `category` varchar(100) NOT NULL,
+  `week` char(10) CHARACTER SET ascii NOT NULL,
+  `month` char(7) CHARACTER SET ascii NOT NULL,
+  `links` int NOT NULL,
+  PRIMARY KEY (`type`, `category`, `week`, `month`)
+);
+CREATE TABLE `entry_stats` (
+  `publisher` int NOT NULL,
+  `week` char(10) CHARACTER SET ascii NOT NULL,
+  `month` char(7) CHARACTER SET ascii NOT NULL,
+  `entries` int NOT NULL,
+  PRIMARY KEY (`publisher`, `week`, `month`)
+);
+-- a trigger body is a single statement (the statements of a migration are split on
+-- semicolons), so an update has a trigger removing the old row and one adding the new
+CREATE TRIGGER `links_stats_insert` AFTER INSERT ON `links` FOR EACH ROW
+  INSERT INTO `links_stats` (`type`, `category`, `week`, `month`, `links`)
+  VALUES (COALESCE(NEW.`type`, ''), COALESCE(NEW.`category`, ''),
+          COALESCE(DATE_FORMAT(NEW.`date` - INTERVAL WEEKDAY(NEW.`date`) DAY, '%Y-%m-%d'), ''),
+          COALESCE(DATE_FORMAT(NEW.`date`, '%Y-%m'), ''), 1)
+  ON DUPLICATE KEY UPDATE `links` = `links` + 1;
+CREATE TRIGGER `links_stats_delete` AFTER DELETE ON `links` FOR EACH ROW
+  UPDATE `links_stats` SET `links` = `links` - 1
+  WHERE `type` = COALESCE(OLD.`type`, '') AND `category` = COALESCE(OLD.`category`, '')
+    AND `week` = COALESCE(DATE_FORMAT(OLD.`date` - INTERVAL WEEKDAY(OLD.`date`) DAY, '%Y-%m-%d'), '')
+    AND `month` = COALESCE(DATE_FORMAT(OLD.`date`, '%Y-%m'), '');
+CREATE TRIGGER `links_stats_update_old` AFTER UPDATE ON `links` FOR EACH ROW
+  UPDATE `links_stats` SET `links` = `links` - 1
+  WHERE `type` = COALESCE(OLD.`type`, '') AND `category` = COALESCE(OLD.`category`, '')
+    AND `week` = COALESCE(DATE_FORMAT(OLD.`date` - INTERVAL WEEKDAY(OLD.`date`) DAY, '%Y-%m-%d'), '')
+    AND `month` = COALESCE(DATE_FORMAT(OLD.`date`, '%Y-%m'), '');
+CREATE TRIGGER `links_stats_update_new` AFTER UPDATE ON `links` FOR EACH ROW FOLLOWS `links_stats_update_old`
+  INSERT INTO `links_stats` (`type`, `category`, `week`, `month`, `links`)
+  VALUES (COALESCE(NEW.`type`, ''), COALESCE(NEW.`category`, ''),
+          COALESCE(DATE_FORMAT(NEW.`date` - INTERVAL WEEKDAY(NEW.`date`) DAY, '%Y-%m-%d'), ''),
+          COALESCE(DATE_FORMAT(NEW.`date`, '%Y-%m'), ''), 1)
+  ON DUPLICATE KEY UPDATE `links` = `links` + 1;
+CREATE TRIGGER `entry_stats_insert` AFTER INSERT ON `entry` FOR EACH ROW
+  INSERT INTO `entry_stats` (`publisher`, `week`, `month`, `entries`)
+  VALUES (COALESCE(NEW.`publisher`, 0),
+          COALESCE(DATE_FORMAT(NEW.`date` - INTERVAL WEEKDAY(NEW.`date`) DAY, '%Y-%m-%d'), ''),
+          COALESCE(DATE_FORMAT(NEW.`date`, '%Y-%m'), ''), 1)
+  ON DUPLICATE KEY UPDATE `entries` = `entries` + 1;
+CREATE TRIGGER `entry_stats_delete` AFTER DELETE ON `entry` FOR EACH ROW
+  UPDATE `entry_stats` SET `entries` = `entries` - 1
+  WHERE `publisher` = COALESCE(OLD.`publisher`, 0)
+    AND `week` = COALESCE(DATE_FORMAT(OLD.`date` - INTERVAL WEEKDAY(OLD.`date`) DAY, '%Y-%m-%d'), '')
+    AND `month` = COALESCE(DATE_FORMAT(OLD.`date`, '%Y-%m'), '');
+CREATE TRIGGER `entry_stats_update_old` AFTER UPDATE ON `entry` FOR EACH ROW
+  UPDATE `entry_stats` SET `entries` = `entries` - 1
+  WHERE `publisher` = COALESCE(OLD.`publisher`, 0)
+    AND `week` = COALESCE(DATE_FORMAT(OLD.`date` - INTERVAL WEEKDAY(OLD.`date`) DAY, '%Y-%m-%d'), '')
+    AND `month` = COALESCE(DATE_FORMAT(OLD.`date`, '%Y-%m'), '');
+CREATE TRIGGER `entry_stats_update_new` AFTER UPDATE ON `entry` FOR EACH ROW FOLLOWS `entry_stats_update_old`
+  INSERT INTO `entry_stats` (`publisher`, `week`, `month`, `entries`)
+  VALUES (COALESCE(NEW.`publisher`, 0),
+          COALESCE(DATE_FORMAT(NEW.`date` - INTERVAL WEEKDAY(NEW.`date`) DAY, '%Y-%m-%d'), ''),
+          COALESCE(DATE_FORMAT(NEW.`date`, '%Y-%m'), ''), 1)
+  ON DUPLICATE KEY UPDATE `entries` = `entries` + 1;
+-- the rows already stored
+INSERT INTO `links_stats` (`type`, `category`, `week`, `month`, `links`)
+SELECT COALESCE(`type`, ''), COALESCE(`category`, ''),
+       COALESCE(DATE_FORMAT(`date` - INTERVAL WEEKDAY(`date`) DAY, '%Y-%m-%d'), ''),
+       COALESCE(DATE_FORMAT(`date`, '%Y-%m'), ''), COUNT(*)
+FROM `links` GROUP BY 1, 2, 3, 4
+ON DUPLICATE KEY UPDATE `links` = `links` + VALUES(`links`);
+INSERT INTO `entry_stats` (`publisher`, `week`, `month`, `entries`)
+SELECT COALESCE(`publisher`, 0), COALESCE(DATE_FORMAT(`date` - INTERVAL WEEKDAY(`date`) DAY, '%Y-%m-%d'), ''),
+       COALESCE(DATE_FORMAT(`date`, '%Y-%m'), ''), COUNT(*)
+FROM `entry` GROUP BY 1, 2, 3
+ON DUPLICATE KEY UPDATE `entries` = `entries` + VALUES(`entries`);
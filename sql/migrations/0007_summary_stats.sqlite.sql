@@ -0,0 +1,13 @@
+-- SQLite version of 0007_summary_stats.sql: the tables and triggers are created by
+-- sql/sqlite_schema.sql, the rows already stored are counted here (from scratch, so
+-- the rows written since the database was opened are not counted twice).
+DELETE FROM links_stats;
+INSERT INTO links_stats (type, category, week, month, links)
+SELECT COALESCE(type, ''), COALESCE(category, ''), COALESCE(date(date, 'weekday 0', '-6 days'), ''),
+       COALESCE(strftime('%Y-%m', date), ''), COUNT(*)
+FROM links GROUP BY COALESCE(type, '') COLLATE NOCASE, COALESCE(category, '') COLLATE NOCASE, 3, 4;
+DELETE FROM entry_stats;
+INSERT INTO entry_stats (publisher, week, month, entries)
+SELECT COALESCE(publisher, 0), COALESCE(date(date, 'weekday 0', '-6 days'), ''),
+       COALESCE(strftime('%Y-%m', date), ''), COUNT(*)
+FROM entry GROUP BY 1, 2, 3;
@@ -0,0 +1,8 @@
+-- Generation of each tag (table) of the response caches, incremented by every write
+-- that invalidates it, so that the API processes drop the responses made stale by
+-- the writes of another process (e.g. the CLI) within a second
+CREATE TABLE `cache_generations` (
+  `tag` varchar(64) CHARACTER SET ascii NOT NULL,
+  `generation` bigint NOT NULL DEFAULT 0,
+  PRIMARY KEY (`tag`)
+);
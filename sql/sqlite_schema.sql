@@ -0,0 +1,164 @@
+-- Schema of the SQLite storage backend (storageBackend=sqlite), equivalent to the
+-- MySQL schema of db_dump.sql after every migration. It is applied each time the
+-- database is opened, so every statement must be idempotent.
+-- Text columns compare case insensitively, like the utf8mb4_0900_ai_ci collation.
+
+CREATE TABLE IF NOT EXISTS publishers (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name varchar(200) NOT NULL COLLATE NOCASE,
+  website varchar(200) NOT NULL COLLATE NOCASE,
+  rss varchar(300) NOT NULL,
+  type varchar(100) DEFAULT NULL COLLATE NOCASE,
+  category varchar(100) DEFAULT NULL COLLATE NOCASE,
+  hash varchar(300) DEFAULT NULL,
+  etag varchar(300) DEFAULT NULL,
+  last_modified varchar(100) DEFAULT NULL,
+  UNIQUE (name, website)
+);
+
+CREATE TABLE IF NOT EXISTS links (
+  id INTEGER PRIMARY KEY,
+  link varchar(2048) NOT NULL,
+  title varchar(300) NOT NULL COLLATE NOCASE,
+  date date DEFAULT NULL,
+  type varchar(100) DEFAULT NULL COLLATE NOCASE,
+  category varchar(100) DEFAULT NULL COLLATE NOCASE,
+  -- md5 of the canonical link (utils.urls.url_hash), the links are deduplicated on it
+  link_hash char(32) NOT NULL UNIQUE
+);
+CREATE INDEX IF NOT EXISTS links_title ON links (title);
+
+CREATE TABLE IF NOT EXISTS entry (
+  id INTEGER PRIMARY KEY,
+  title varchar(300) NOT NULL COLLATE NOCASE,
+  link varchar(2048) NOT NULL,
+  publisher INTEGER DEFAULT NULL REFERENCES publishers (id),
+  date date DEFAULT NULL,
+  link_hash char(32) NOT NULL UNIQUE
+);
+CREATE INDEX IF NOT EXISTS entry_date ON entry (date);
+CREATE INDEX IF NOT EXISTS entry_publisher_date ON entry (publisher, date);
+
+CREATE TABLE IF NOT EXISTS entry_fingerprints (
+  publisher INTEGER NOT NULL REFERENCES publishers (id) ON DELETE CASCADE,
+  fingerprint char(32) NOT NULL,
+  PRIMARY KEY (publisher, fingerprint)
+) WITHOUT ROWID;
+
+-- used by GET /search: full text indexes of the titles, kept in sync by triggers.
+-- Bulk inserts (SQLiteRepository.insert_many) set fts_deferred.deferred inside their
+-- transaction and index the new rows with a single statement, which is several times
+-- faster than a trigger call per row.
+CREATE TABLE IF NOT EXISTS fts_deferred (deferred INTEGER NOT NULL);
+INSERT INTO fts_deferred SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM fts_deferred);
+CREATE VIRTUAL TABLE IF NOT EXISTS links_fts USING fts5(title, content='links', content_rowid='rowid');
+DROP TRIGGER IF EXISTS links_fts_insert;
+CREATE TRIGGER IF NOT EXISTS links_fts_insert_row AFTER INSERT ON links
+WHEN NOT (SELECT deferred FROM fts_deferred) BEGIN
+  INSERT INTO links_fts (rowid, title) VALUES (new.rowid, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS links_fts_delete AFTER DELETE ON links BEGIN
+  INSERT INTO links_fts (links_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+END;
+CREATE TRIGGER IF NOT EXISTS links_fts_update AFTER UPDATE OF title ON links BEGIN
+  INSERT INTO links_fts (links_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+  INSERT INTO links_fts (rowid, title) VALUES (new.rowid, new.title);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS entry_fts USING fts5(title, content='entry', content_rowid='rowid');
+DROP TRIGGER IF EXISTS entry_fts_insert;
+CREATE TRIGGER IF NOT EXISTS entry_fts_insert_row AFTER INSERT ON entry
+WHEN NOT (SELECT deferred FROM fts_deferred) BEGIN
+  INSERT INTO entry_fts (rowid, title) VALUES (new.rowid, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS entry_fts_delete AFTER DELETE ON entry BEGIN
+  INSERT INTO entry_fts (entry_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+END;
+CREATE TRIGGER IF NOT EXISTS entry_fts_update AFTER UPDATE OF title ON entry BEGIN
+  INSERT INTO entry_fts (entry_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+  INSERT INTO entry_fts (rowid, title) VALUES (new.rowid, new.title);
+END;
+
+-- used by GET /stats: the number of links and entries of every week and month (the
+-- monday of the week, YYYY-MM; '' for the undated rows), kept up to date by triggers.
+-- A week spanning two months has a row in each. Type, category and publisher are ''
+-- (0 for the publisher) when missing. Bulk inserts add up their rows with a single
+-- statement while fts_deferred.deferred is set, like the full text indexes.
+CREATE TABLE IF NOT EXISTS links_stats (
+  type varchar(100) NOT NULL COLLATE NOCASE,
+  category varchar(100) NOT NULL COLLATE NOCASE,
+  week char(10) NOT NULL,
+  month char(7) NOT NULL,
+  links INTEGER NOT NULL,
+  PRIMARY KEY (type, category, week, month)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS links_stats_insert AFTER INSERT ON links
+WHEN NOT (SELECT deferred FROM fts_deferred) BEGIN
+  INSERT INTO links_stats (type, category, week, month, links)
+  VALUES (COALESCE(new.type, ''), COALESCE(new.category, ''), COALESCE(date(new.date, 'weekday 0', '-6 days'), ''),
+          COALESCE(strftime('%Y-%m', new.date), ''), 1)
+  ON CONFLICT (type, category, week, month) DO UPDATE SET links = links + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS links_stats_delete AFTER DELETE ON links BEGIN
+  UPDATE links_stats SET links = links - 1
+  WHERE type = COALESCE(old.type, '') AND category = COALESCE(old.category, '')
+    AND week = COALESCE(date(old.date, 'weekday 0', '-6 days'), '') AND month = COALESCE(strftime('%Y-%m', old.date), '');
+END;
+CREATE TRIGGER IF NOT EXISTS links_stats_update AFTER UPDATE OF type, category, date ON links BEGIN
+  UPDATE links_stats SET links = links - 1
+  WHERE type = COALESCE(old.type, '') AND category = COALESCE(old.category, '')
+    AND week = COALESCE(date(old.date, 'weekday 0', '-6 days'), '') AND month = COALESCE(strftime('%Y-%m', old.date), '');
+  INSERT INTO links_stats (type, category, week, month, links)
+  VALUES (COALESCE(new.type, ''), COALESCE(new.category, ''), COALESCE(date(new.date, 'weekday 0', '-6 days'), ''),
+          COALESCE(strftime('%Y-%m', new.date), ''), 1)
+  ON CONFLICT (type, category, week, month) DO UPDATE SET links = links + 1;
+END;
+
+CREATE TABLE IF NOT EXISTS entry_stats (
+  publisher INTEGER NOT NULL,
+  week char(10) NOT NULL,
+  month char(7) NOT NULL,
+  entries INTEGER NOT NULL,
+  PRIMARY KEY (publisher, week, month)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS entry_stats_insert AFTER INSERT ON entry
+WHEN NOT (SELECT deferred FROM fts_deferred) BEGIN
+  INSERT INTO entry_stats (publisher, week, month, entries)
+  VALUES (COALESCE(new.publisher, 0), COALESCE(date(new.date, 'weekday 0', '-6 days'), ''),
+          COALESCE(strftime('%Y-%m', new.date), ''), 1)
+  ON CONFLICT (publisher, week, month) DO UPDATE SET entries = entries + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS entry_stats_delete AFTER DELETE ON entry BEGIN
+  UPDATE entry_stats SET entries = entries - 1
+  WHERE publisher = COALESCE(old.publisher, 0) AND week = COALESCE(date(old.date, 'weekday 0', '-6 days'), '')
+    AND month = COALESCE(strftime('%Y-%m', old.date), '');
+END;
+CREATE TRIGGER IF NOT EXISTS entry_stats_update AFTER UPDATE OF publisher, date ON entry BEGIN
+  UPDATE entry_stats SET entries = entries - 1
+  WHERE publisher = COALESCE(old.publisher, 0) AND week = COALESCE(date(old.date, 'weekday 0', '-6 days'), '')
+    AND month = COALESCE(strftime('%Y-%m', old.date), '');
+  INSERT INTO entry_stats (publisher, week, month, entries)
+  VALUES (COALESCE(new.publisher, 0), COALESCE(date(new.date, 'weekday 0', '-6 days'), ''),
+          COALESCE(strftime('%Y-%m', new.date), ''), 1)
+  ON CONFLICT (publisher, week, month) DO UPDATE SET entries = entries + 1;
+END;
+
+-- see migration 0008: the generation of each tag of the response caches
+CREATE TABLE IF NOT EXISTS cache_generations (
+  tag varchar(64) NOT NULL PRIMARY KEY,
+  generation INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  version INTEGER NOT NULL PRIMARY KEY,
+  name varchar(200) NOT NULL,
+  applied_at datetime NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+-- a new database already contains the changes of these migrations
+INSERT INTO schema_migrations (version, name)
+SELECT version, name FROM (
+  SELECT 1 AS version, 'publisher_validators' AS name UNION ALL SELECT 2, 'entry_fingerprints'
+  UNION ALL SELECT 3, 'lookup_indexes' UNION ALL SELECT 4, 'entry_date_indexes'
+  UNION ALL SELECT 5, 'fulltext_search' UNION ALL SELECT 6, 'link_hashes'
+  UNION ALL SELECT 7, 'summary_stats' UNION ALL SELECT 8, 'cache_generations'
+) WHERE NOT EXISTS (SELECT 1 FROM schema_migrations);
@@ -0,0 +1,737 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import mysql.connector
+from dotenv import load_dotenv
+
+import database
+from database import InstrumentedCursor
+from utils.pagination import keyset_query
+from utils.search import search_query
+from utils.stats import dormant_query, stats_query
+from utils.urls import canonicalize_url, url_hash
+
+load_dotenv()
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+SQLITE_SCHEMA_PATH = os.path.join(PROJECT_DIR, "sql", "sqlite_schema.sql")
+# full text index of the titles of a table in the SQLite backend (see sqlite_schema.sql)
+FULLTEXT_TABLES = {"links": "links_fts", "entry": "entry_fts"}
+# adds the rows of a table after a rowid to its summary table, what the stats triggers
+# of sqlite_schema.sql do a row at a time
+SUMMARY_UPDATES = {
+    "links": "INSERT INTO links_stats (type, category, week, month, links) "
+             "SELECT COALESCE(type, ''), COALESCE(category, ''), COALESCE(date(date, 'weekday 0', '-6 days'), ''), "
+             "COALESCE(strftime('%Y-%m', date), ''), COUNT(*) FROM links WHERE rowid > %s "
+             "GROUP BY COALESCE(type, '') COLLATE NOCASE, COALESCE(category, '') COLLATE NOCASE, 3, 4 "
+             "ON CONFLICT (type, category, week, month) DO UPDATE SET links = links + excluded.links",
+    "entry": "INSERT INTO entry_stats (publisher, week, month, entries) "
+             "SELECT COALESCE(publisher, 0), COALESCE(date(date, 'weekday 0', '-6 days'), ''), "
+             "COALESCE(strftime('%Y-%m', date), ''), COUNT(*) FROM entry WHERE rowid > %s GROUP BY 1, 2, 3 "
+             "ON CONFLICT (publisher, week, month) DO UPDATE SET entries = entries + excluded.entries",
+}
+DEFAULT_SQLITE_PATH = os.path.join(PROJECT_DIR, "content_manager.sqlite3")
+# number of rows sent in a single multi-row INSERT by insert_many
+BATCH_SIZE = 500
+
+# dates are stored as ISO 8601 text in SQLite, which keeps them ordered
+sqlite3.register_adapter(date, date.isoformat)
+
+
+class DuplicateRow(ValueError):
+    """
+    Raised when a row is inserted with the link (once canonicalized) of a row already
+    in the table; id is the id of that row.
+    """
+
+    def __init__(self, table: str, id: int):
+        super().__init__(f"A row of {table} already has this link (id {id})")
+        self.id = id
+
+
+class Table(NamedTuple):
+    name: str
+    columns: Tuple[str, ...]
+    # the primary key, which orders the rows of the list endpoints
+    keys: Tuple[str, ...]
+    # filter name -> sql condition with a single %s placeholder
+    filters: Dict[str, str]
+    # the column holding an url, stored in canonical form and deduplicated on its
+    # hash (see utils.urls.url_hash), kept in the HASH_COLUMN column
+    url_column: Optional[str] = None
+
+
+HASH_COLUMN = "link_hash"
+
+TABLES = {
+    "links": Table("links", ("id", "link", "title", "date", "type", "category"), ("id", ),
+                   {"date_from": "links.date >= %s", "date_to": "links.date <= %s",
+                    "type": "links.type = %s", "category": "links.category = %s"}, "link"),
+    "publishers": Table("publishers", ("id", "name", "website", "rss", "type", "category", "hash", "etag",
+                                       "last_modified"), ("id", ),
+                        {"type": "publishers.type = %s", "category": "publishers.category = %s"}),
+    "entry": Table("entry", ("id", "title", "link", "publisher", "date"), ("id", ),
+                   {"date_from": "entry.date >= %s", "date_to": "entry.date <= %s",
+                    "publisher": "entry.publisher = %s",
+                    "type": "entry.publisher IN (SELECT id FROM publishers WHERE type = %s)",
+                    "category": "entry.publisher IN (SELECT id FROM publishers WHERE category = %s)"}, "link"),
+    "entry_fingerprints": Table("entry_fingerprints", ("publisher", "fingerprint"), ("publisher", "fingerprint"),
+                                {"publisher": "entry_fingerprints.publisher = %s"}),
+}
+
+
+def _table(name: str, *columns: str) -> Table:
+    """
+    Returns the description of a table, checking that it has the columns, since
+    table and column names are written into the statements.
+    """
+    if name not in TABLES:
+        raise ValueError(f"Unknown table {name!r}")
+    table = TABLES[name]
+    unknown = [column for column in columns if column not in table.columns]
+    if unknown:
+        raise ValueError(f"Unknown columns {unknown} in table {name}")
+    return table
+
+def _hashed(table: Table, row: dict) -> dict:
+    """
+    Returns the values of a row to write, with its url in canonical form and the hash
+    of the url when the table is deduplicated on it.
+    """
+    if table.url_column not in row or row[table.url_column] is None:
+        return row
+    link = canonicalize_url(row[table.url_column])
+    return {**row, table.url_column: link, HASH_COLUMN: url_hash(link, canonical=True)}
+
+def _hashed_values(row: tuple, position: int) -> tuple:
+    # same as _hashed, for a row given as a tuple with its url at position
+    link = canonicalize_url(row[position])
+    return (*row[:position], link, *row[position + 1:], url_hash(link, canonical=True))
+
+def _lookup(table: Table, column: str, value: Any) -> Tuple[str, Any]:
+    """
+    Returns the condition (column and value) finding the rows whose column equals
+    value: urls are looked up by their hash, a single probe of its unique index.
+    """
+    if column == table.url_column:
+        return HASH_COLUMN, url_hash(value)
+    return column, value
+
+
+# The statements of the repository, built from TABLES. They take the values as they
+# are stored (urls looked up by their hash, see _lookup), and are shared with
+# utils.query_plans so that the plans checked are those of the statements run.
+
+PUBLISHER_FEEDS_QUERY = "SELECT id, name, rss, hash, etag, last_modified FROM publishers"
+ENTRY_FINGERPRINTS_QUERY = "SELECT fingerprint FROM entry_fingerprints WHERE publisher = %s"
+CACHE_GENERATIONS_QUERY = "SELECT tag, generation FROM cache_generations"
+
+def _matching(column: str, values: Sequence[Any]) -> str:
+    return f"{column} = %s" if len(values) == 1 else f"{column} IN ({', '.join(['%s'] * len(values))})"
+
+def list_query(table: Table, filters: Optional[dict] = None, after: Optional[str] = None,
+               limit: Optional[int] = None) -> Tuple[str, list]:
+    """
+    Returns the keyset paginated query of the rows of a table matching the filters
+    (see TABLES, filters that are None are ignored). InvalidCursor is raised if
+    after is not a cursor of this table.
+    """
+    unknown = set(filters or {}) - set(table.filters)
+    if unknown:
+        raise ValueError(f"Unknown filters {sorted(unknown)} for table {table.name}")
+    select = f"SELECT {', '.join(f'{table.name}.{column}' for column in table.columns)} FROM {table.name}"
+    conditions = [(table.filters[name], value) for name, value in (filters or {}).items()]
+    return keyset_query(select, conditions, [f"{table.name}.{key}" for key in table.keys], after, limit)
+
+def select_query(table: Table, columns: Sequence[str], column: str, values: Sequence[Any]) -> Tuple[str, list]:
+    """
+    Returns the query of the columns of the rows of a table whose column is one of values.
+    """
+    return f"SELECT {', '.join(columns)} FROM {table.name} WHERE {_matching(column, values)}", list(values)
+
+def insert_query(table: Table, columns: Sequence[str], ignore: bool = False) -> str:
+    """
+    Returns the statement inserting a row given as the values of columns; with
+    ignore, rows whose primary key or link is already in the table are skipped.
+    """
+    return (f"INSERT {'IGNORE ' if ignore else ''}INTO {table.name} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})")
+
+def update_query(table: Table, fields: dict, column: str, values: Sequence[Any]) -> Tuple[str, list]:
+    """
+    Returns the statement setting the fields (a dictionary of column values) of the
+    rows of a table whose column is one of values.
+    """
+    return (f"UPDATE {table.name} SET {', '.join(f'{name} = %s' for name in fields)} "
+            f"WHERE {_matching(column, values)}", [*fields.values(), *values])
+
+def filtered_update_query(table: Table, fields: dict, filters: dict) -> Tuple[str, list]:
+    """
+    Returns the statement setting the fields of the rows of a table matching the
+    filters (see TABLES, filters that are None are ignored, at least one is needed).
+    """
+    conditions = [(table.filters[name], value) for name, value in filters.items() if value is not None]
+    if not conditions:
+        raise ValueError("A filtered change needs at least one filter")
+    return (f"UPDATE {table.name} SET {', '.join(f'{name} = %s' for name in fields)} WHERE "
+            + " AND ".join(condition for condition, _ in conditions),
+            [*fields.values(), *(value for _, value in conditions)])
+
+def delete_query(table: Table, column: str, value: Any) -> Tuple[str, list]:
+    """
+    Returns the statement deleting the rows of a table whose column equals value.
+    """
+    return f"DELETE FROM {table.name} WHERE {column} = %s", [value]
+
+
+class Repository:
+    """
+    Storage of the tables of the content manager. The handlers of the API (and through
+    them the CLI) only go through these methods, so the database can be changed by
+    picking another backend.
+
+    The statements are written once, in the MySQL dialect with %s placeholders;
+    backends that speak another dialect translate them in their cursors.
+    """
+    backend = ""
+    dialect = "mysql"
+    # raised by the backend when a statement breaks a constraint of the schema
+    integrity_errors: Tuple[type, ...] = ()
+
+    def session(self, buffered: bool = True, write: bool = False):
+        """
+        Context manager yielding a cursor inside a transaction, committed when the block
+        exits normally and rolled back when it raises. If buffered is False the rows
+        may be read from the database as they are fetched. write is True for the
+        transactions that modify the database.
+        """
+        raise NotImplementedError
+
+    def select_page(self, table: str, filters: Optional[dict] = None, after: Optional[str] = None,
+                    limit: Optional[int] = None) -> List[tuple]:
+        """
+        Returns the rows of a table matching the filters (see list_query), ordered by
+        primary key.
+        """
+        query, params = list_query(_table(table), filters, after, limit)
+        with self.session() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    def stream_rows(self, table: str, filters: Optional[dict] = None, after: Optional[str] = None,
+                    limit: Optional[int] = None, chunk_size: int = 1000) -> Iterator[List[tuple]]:
+        """
+        Same as select_page, but yields the rows chunk_size at a time as they are read
+        from the database, so that memory usage does not depend on the size of the result.
+        """
+        query, params = list_query(_table(table), filters, after, limit)
+        with self.session(buffered=False) as cursor:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
+    def get(self, table: str, column: str, value: Any) -> Optional[tuple]:
+        """
+        Returns the first row of a table whose column equals value, None if there is none.
+        """
+        table = _table(table, column)
+        column, value = _lookup(table, column, value)
+        with self.session() as cursor:
+            cursor.execute(*select_query(table, table.columns, column, [value]))
+            return cursor.fetchone()
+
+    def insert(self, table: str, row: dict):
+        """
+        Inserts a row (a dictionary of column values) in a table. Raises DuplicateRow
+        if the table already has a row with the same link.
+        """
+        table = _table(table, *row)
+        row = _hashed(table, row)
+        try:
+            with self.session(write=True) as cursor:
+                if HASH_COLUMN in row:
+                    existing = self._saved_id(cursor, table, row[HASH_COLUMN])
+                    if existing is not None:
+                        raise DuplicateRow(table.name, existing)
+                cursor.execute(insert_query(table, tuple(row)), tuple(row.values()))
+        except self.integrity_errors:
+            if HASH_COLUMN not in row:
+                raise
+            # the same link was inserted by another transaction between the probe and
+            # the insert: it is looked up in a new transaction, which sees that row
+            with self.session() as cursor:
+                existing = self._saved_id(cursor, table, row[HASH_COLUMN])
+            if existing is None:
+                raise
+            raise DuplicateRow(table.name, existing)
+
+    @staticmethod
+    def _saved_id(cursor, table: Table, link_hash: str) -> Optional[int]:
+        cursor.execute(*select_query(table, ("id", ), HASH_COLUMN, [link_hash]))
+        existing = cursor.fetchone()
+        return None if existing is None else existing[0]
+
+    def insert_many(self, table: str, rows: List[dict]) -> int:
+        """
+        Inserts rows (dictionaries with the same columns) in a table, BATCH_SIZE at a
+        time inside a single transaction. Rows whose primary key is already in the
+        table are skipped. Returns the number of rows inserted.
+        """
+        if not rows:
+            return 0
+        columns = tuple(rows[0])
+        return self.insert_values(table, columns, [tuple(row[column] for column in columns) for row in rows])
+
+    def insert_values(self, table: str, columns: Sequence[str], values: List[tuple]) -> int:
+        """
+        Same as insert_many, with the rows given as tuples of the values of columns.
+        """
+        if not values:
+            return 0
+        table = _table(table, *columns)
+        if table.url_column in columns:
+            position = columns.index(table.url_column)
+            columns = (*columns, HASH_COLUMN)
+            values = [_hashed_values(row, position) for row in values]
+        with self.session(write=True) as cursor:
+            return self._insert_batches(cursor, table.name, insert_query(table, columns, ignore=True), values)
+
+    def _insert_batches(self, cursor, table: str, statement: str, values: List[tuple]) -> int:
+        inserted = 0
+        for start in range(0, len(values), BATCH_SIZE):
+            cursor.executemany(statement, values[start:start + BATCH_SIZE])
+            inserted += max(cursor.rowcount, 0)
+        return inserted
+
+    def update(self, table: str, column: str, value: Any, fields: dict) -> bool:
+        """
+        Sets the fields (a dictionary of column values) of the rows of a table whose
+        column equals value, with a single UPDATE. Returns False if there is no such row.
+        """
+        table = _table(table, column, *fields)
+        column, value = _lookup(table, column, value)
+        fields = _hashed(table, fields)
+        with self.session(write=True) as cursor:
+            if not fields:
+                cursor.execute(*select_query(table, (column, ), column, [value]))
+                return cursor.fetchone() is not None
+            cursor.execute(*update_query(table, fields, column, [value]))
+            # the rows matched, even those already holding the new values (the MySQL
+            # connections are opened with the FOUND_ROWS flag)
+            return cursor.rowcount > 0
+
+    def update_many(self, table: str, column: str, changes: List[Tuple[Any, dict]],
+                    filters: Optional[dict] = None, fields: Optional[dict] = None) -> int:
+        """
+        Applies many changes to a table in a single transaction and returns the number
+        of rows they matched.
+
+        Parameters
+        --------------
+            changes: list[tuple]
+                Pairs of (value of column, fields to set on the rows with that value).
+                If the same value appears twice its last change is applied. Rows
+                receiving the same fields are changed by a single UPDATE, BATCH_SIZE
+                rows at a time
+            filters, fields: Optional[dict]
+                A change applied to every row matching the filters (see TABLES, at
+                least one is needed), before the per-row changes
+        """
+        table = _table(table, column)
+        latest = {}
+        for value, row_fields in changes:
+            latest[_lookup(table, column, value)[1]] = row_fields
+        if column == table.url_column:
+            column = HASH_COLUMN
+        groups: Dict[tuple, list] = {}
+        for value, row_fields in latest.items():
+            if row_fields:
+                _table(table.name, *row_fields)
+                groups.setdefault(tuple(_hashed(table, row_fields).items()), []).append(value)
+        filtered = None
+        if fields:
+            _table(table.name, *fields)
+            filtered = filtered_update_query(table, _hashed(table, fields), filters or {})
+        updated = 0
+        with self.session(write=True) as cursor:
+            if filtered is not None:
+                cursor.execute(*filtered)
+                updated += max(cursor.rowcount, 0)
+            for group, values in groups.items():
+                for start in range(0, len(values), BATCH_SIZE):
+                    cursor.execute(*update_query(table, dict(group), column, values[start:start + BATCH_SIZE]))
+                    updated += max(cursor.rowcount, 0)
+        return updated
+
+    def existing_ids(self, table: str, ids: Iterable[int]) -> Set[int]:
+        """
+        Returns those of the ids that are the id of a row of a table, BATCH_SIZE probes
+        of its primary key per query.
+        """
+        table = _table(table, "id")
+        ids = list(set(ids))
+        existing = set()
+        with self.session() as cursor:
+            for start in range(0, len(ids), BATCH_SIZE):
+                cursor.execute(*select_query(table, ("id", ), "id", ids[start:start + BATCH_SIZE]))
+                existing.update(row[0] for row in cursor.fetchall())
+        return existing
+
+    def saved_links(self, table: str, links: Sequence[str]) -> Set[str]:
+        """
+        Returns the hashes (see utils.urls.url_hash) of those of the links that are
+        already in a table, BATCH_SIZE probes of the hash index per query.
+        """
+        table = _table(table)
+        hashes = list({url_hash(link) for link in links})
+        saved = set()
+        with self.session() as cursor:
+            for start in range(0, len(hashes), BATCH_SIZE):
+                cursor.execute(*select_query(table, (HASH_COLUMN, ), HASH_COLUMN, hashes[start:start + BATCH_SIZE]))
+                saved.update(row[0] for row in cursor.fetchall())
+        return saved
+
+    def delete(self, table: str, column: str, value: Any) -> bool:
+        """
+        Deletes the rows of a table whose column equals value. Returns False if there
+        was no such row.
+        """
+        table = _table(table, column)
+        column, value = _lookup(table, column, value)
+        with self.session(write=True) as cursor:
+            cursor.execute(*delete_query(table, column, value))
+            return cursor.rowcount > 0
+
+    def canonicalize(self, table: str, chunk_size: int = 1000) -> Tuple[int, int]:
+        """
+        Rewrites the urls of a table that are not in canonical form (stored before the
+        table was deduplicated on their hash, or before the canonicalization rules
+        changed) with their canonical form and hash. Rows that turn out to have the
+        url of another row are deleted. Returns the number of rows updated and deleted.
+        """
+        table = _table(table)
+        column = table.url_column
+        if column is None:
+            raise ValueError(f"The table {table.name} has no url column")
+        updated = deleted = 0
+        last = 0
+        while True:
+            with self.session() as cursor:
+                cursor.execute(f"SELECT id, {column}, {HASH_COLUMN} FROM {table.name} WHERE id > %s "
+                               f"ORDER BY id LIMIT %s", (last, chunk_size))
+                rows = cursor.fetchall()
+            if not rows:
+                return updated, deleted
+            last = rows[-1][0]
+            changes = []
+            for row_id, link, link_hash in rows:
+                canonical = canonicalize_url(link)
+                canonical_hash = url_hash(canonical, canonical=True)
+                if canonical != link or canonical_hash != link_hash:
+                    changes.append((row_id, canonical, canonical_hash))
+            if not changes:
+                continue
+            with self.session(write=True) as cursor:
+                for row_id, link, link_hash in changes:
+                    cursor.execute(f"SELECT id FROM {table.name} WHERE {HASH_COLUMN} = %s", (link_hash, ))
+                    duplicate = cursor.fetchone()
+                    if duplicate is not None and duplicate[0] != row_id:
+                        cursor.execute(f"DELETE FROM {table.name} WHERE id = %s", (row_id, ))
+                        deleted += 1
+                    else:
+                        cursor.execute(f"UPDATE {table.name} SET {column} = %s, {HASH_COLUMN} = %s WHERE id = %s",
+                                       (link, link_hash, row_id))
+                        updated += 1
+
+    def cache_generations(self) -> Dict[str, int]:
+        """
+        Returns the generation of the tags of the response caches that were invalidated
+        (see utils.response_cache.InMemoryCache).
+        """
+        with self.session() as cursor:
+            cursor.execute(CACHE_GENERATIONS_QUERY)
+            return dict(cursor.fetchall())
+
+    def bump_cache_generations(self, tags: Sequence[str]):
+        """
+        Increments the generation of tags of the response caches, telling the other
+        processes that the responses stored with them are stale.
+        """
+        tags = sorted(set(tags))
+        if not tags:
+            return
+        with self.session(write=True) as cursor:
+            cursor.executemany("INSERT IGNORE INTO cache_generations (tag) VALUES (%s)", [(tag, ) for tag in tags])
+            cursor.execute(f"UPDATE cache_generations SET generation = generation + 1 WHERE {_matching('tag', tags)}",
+                           tags)
+
+    def publisher_feeds(self) -> List[dict]:
+        """
+        Returns the id, name, rss feed, feed hash and validators of every publisher.
+        """
+        with self.session() as cursor:
+            cursor.execute(PUBLISHER_FEEDS_QUERY)
+            return [{"id": row[0], "name": row[1], "rss": row[2], "hash": row[3], "etag": row[4],
+                     "last_modified": row[5]}
+                    for row in cursor.fetchall()]
+
+    def entry_fingerprints(self, publisher: int) -> List[str]:
+        """
+        Returns the fingerprints of the entries already seen in a publisher's feed.
+        """
+        with self.session() as cursor:
+            cursor.execute(ENTRY_FINGERPRINTS_QUERY, (publisher, ))
+            return [row[0] for row in cursor.fetchall()]
+
+    def search(self, q: str, publisher: Optional[int] = None, category: Optional[str] = None,
+               date_from: Optional[date] = None, date_to: Optional[date] = None, limit: int = 20) -> List[tuple]:
+        """
+        Returns the rows of the LINKS and ENTRY tables whose title matches q, best
+        matches first (see utils.search.search_query).
+        """
+        query, params = search_query(q, publisher, category, date_from, date_to, limit, self.dialect)
+        with self.session() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    def stats(self, table: str, group_by: str, **filters) -> List[Tuple[Any, int]]:
+        """
+        Returns the number of rows of the LINKS or ENTRY table in each bucket of group_by,
+        read from their summary table (see utils.stats.stats_query).
+        """
+        query, params = stats_query(table, group_by, **filters)
+        with self.session() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    def dormant_publishers(self, before: date, category: Optional[str] = None) -> List[tuple]:
+        """
+        Returns the publishers without entries dated on or after before (see
+        utils.stats.dormant_query).
+        """
+        query, params = dormant_query(before, category)
+        with self.session() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    def apply_schema(self):
+        """
+        Creates the tables, indexes and triggers of the schema that are missing (the
+        schema of MySQL databases is only changed by the migrations).
+        """
+
+    def connection_stats(self) -> dict:
+        """
+        Returns the usage of the connections of the backend (see GET /pool).
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MySQLRepository(Repository):
+    """
+    The tables stored in MySQL, through the connection pool of database.py.
+    """
+    backend = "mysql"
+    integrity_errors = (mysql.connector.IntegrityError, )
+
+    def session(self, buffered: bool = True, write: bool = False):
+        return database.session(buffered)
+
+    def connection_stats(self) -> dict:
+        return {"backend": self.backend, **database.get_pool().stats()}
+
+
+@lru_cache(maxsize=512)
+def sqlite_statement(statement: str) -> str:
+    """
+    This function translates a statement of the MySQL dialect of the repository to
+    SQLite: qmark placeholders instead of %s, INSERT OR IGNORE instead of INSERT IGNORE.
+    """
+    statement = statement.replace("%s", "?")
+    if statement.startswith("INSERT IGNORE "):
+        statement = "INSERT OR IGNORE " + statement[len("INSERT IGNORE "):]
+    return statement
+
+
+class SQLiteCursor:
+    """
+    Wraps a sqlite3 cursor so that it accepts the statements of the repository.
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    def execute(self, operation, params=()):
+        return self._cursor.execute(sqlite_statement(operation), tuple(params or ()))
+
+    def executemany(self, operation, seq_params):
+        return self._cursor.executemany(sqlite_statement(operation), seq_params)
+
+    @property
+    def column_names(self) -> Tuple[str, ...]:
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class SQLiteRepository(Repository):
+    """
+    The tables stored in an embedded SQLite database, for single node installs, tests
+    and benchmarks: no server to run and no network round-trip per query.
+
+    The database is in WAL mode, so readers are not blocked by the writer and commits
+    only append to the log. Connections are kept open and reused, each one keeping
+    up to cached_statements prepared statements (the repository issues a small set
+    of fixed statements, so they are compiled once per connection). Transactions
+    that write take the write lock when they begin, so concurrent writers wait for
+    each other (up to timeout seconds) instead of failing.
+    """
+    backend = "sqlite"
+    dialect = "sqlite"
+    integrity_errors = (sqlite3.IntegrityError, )
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, timeout: float = 30, cached_statements: int = 256):
+        self.path = path
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+        connection = self._connect()
+        connection.execute("PRAGMA journal_mode=WAL")
+        self._idle.put(connection)
+        self.apply_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        # check_same_thread is off because a streamed response is read by several
+        # worker threads, one after the other; a connection is only used by one
+        # session at a time
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                     check_same_thread=False, cached_statements=self.cached_statements)
+        connection.execute("PRAGMA foreign_keys=ON")
+        # durable across application crashes; only a power loss can drop the last commits
+        connection.execute("PRAGMA synchronous=NORMAL")
+        # used by the migrations that deduplicate the links in SQL
+        connection.create_function("canonical_url", 1, canonicalize_url, deterministic=True)
+        connection.create_function("url_hash", 1, url_hash, deterministic=True)
+        with self._lock:
+            self._open += 1
+        return connection
+
+    def apply_schema(self):
+        with open(SQLITE_SCHEMA_PATH, encoding="utf-8") as file:
+            schema = file.read()
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        try:
+            connection.executescript(schema)
+        finally:
+            self._idle.put(connection)
+
+    @contextmanager
+    def session(self, buffered: bool = True, write: bool = False):
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        cursor = connection.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            yield InstrumentedCursor(SQLiteCursor(cursor))
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            cursor.close()
+            self._idle.put(connection)
+
+    def _insert_batches(self, cursor, table: str, statement: str, values: List[tuple]) -> int:
+        fulltext = FULLTEXT_TABLES.get(table)
+        if fulltext is None:
+            return super()._insert_batches(cursor, table, statement, values)
+        # the insert triggers are skipped while deferred is set, and the rows inserted
+        # (those after the last rowid, since the write lock is held) are indexed and
+        # counted at once
+        cursor.execute("UPDATE fts_deferred SET deferred = 1")
+        cursor.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}")
+        last, = cursor.fetchone()
+        inserted = super()._insert_batches(cursor, table, statement, values)
+        cursor.execute(f"INSERT INTO {fulltext} (rowid, title) SELECT rowid, title FROM {table} WHERE rowid > %s",
+                       (last,))
+        cursor.execute(SUMMARY_UPDATES[table], (last,))
+        cursor.execute("UPDATE fts_deferred SET deferred = 0")
+        return inserted
+
+    def connection_stats(self) -> dict:
+        """
+        Returns the number of connections open, in use by a session and idle (kept
+        open for the next sessions); there is no limit, so no session waits for one.
+        """
+        idle = self._idle.qsize()
+        with self._lock:
+            open_connections = self._open
+        return {"backend": self.backend, "open": open_connections, "checked_out": max(open_connections - idle, 0),
+                "idle": idle}
+
+    def close(self):
+        """
+        Closes every idle connection.
+        """
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            connection.close()
+            with self._lock:
+                self._open -= 1
+
+
+BACKENDS = {"mysql": MySQLRepository, "sqlite": SQLiteRepository}
+
+_repository: Optional[Repository] = None
+_repository_lock = threading.Lock()
+
+def get_repository() -> Repository:
+    """
+    This function returns the process wide repository, creating it on first use from
+    the settings in the environment (.env file): storageBackend (mysql, or sqlite)
+    and, for sqlite, sqlitePath (content_manager.sqlite3 in the project folder).
+    The MySQL backend is configured as described in database.get_pool.
+    """
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            backend = os.environ.get("storageBackend", "mysql")
+            if backend not in BACKENDS:
+                raise ValueError(f"Unknown storage backend {backend!r}, expected one of {sorted(BACKENDS)}")
+            if backend == "sqlite":
+                _repository = SQLiteRepository(os.environ.get("sqlitePath", DEFAULT_SQLITE_PATH))
+            else:
+                _repository = BACKENDS[backend]()
+        return _repository
+
+def set_repository(repository: Repository):
+    """
+    This function replaces the process wide repository, e.g. with one on a test database.
+    """
+    global _repository
+    with _repository_lock:
+        _repository = repository
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import SQLiteRepository, set_repository
+from utils.response_cache import NullCache, set_response_cache
+
+
+@pytest.fixture
+def repository(tmp_path):
+    """
+    A SQLite repository in a temporary folder, used as the process wide repository
+    (the response cache is disabled so every request reads it).
+    """
+    repository = SQLiteRepository(str(tmp_path / "content_manager.sqlite3"))
+    set_repository(repository)
+    set_response_cache(NullCache())
+    yield repository
+    repository.close()
@@ -0,0 +1,34 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+
+
+@pytest.fixture
+def client(repository):
+    return TestClient(api.app)
+
+
+def test_create_link_with_the_link_of_a_saved_link_is_a_conflict(client):
+    link = {"title": "An article", "date": "2023-06-01"}
+    response = client.post("/links", json={**link, "link": "https://example.com/article?utm_source=newsletter"})
+    assert response.status_code == 201
+    response = client.post("/links", json={**link, "link": "https://Example.com/article/?fbclid=abc#comments"})
+    assert response.status_code == 409
+    assert [row["link"] for row in client.get("/links").json()] == ["https://example.com/article"]
+
+
+def test_create_entry_with_the_link_of_a_saved_entry_is_a_conflict(client):
+    client.post("/publishers", json={"name": "Publisher", "website": "https://example.com", "rss": "https://example.com/feed",
+                                     "category": None, "hash": None})
+    entry = {"title": "An entry", "publisher": 1, "date": "2023-06-01"}
+    assert client.post("/entries", json={**entry, "link": "https://example.com/entry?utm_medium=rss"}).status_code == 201
+    assert client.post("/entries", json={**entry, "link": "https://example.com/entry/?utm_campaign=weekly"}).status_code == 409
+    assert len(client.get("/entries").json()) == 1
+
+
+def test_pool_reports_the_connections_of_the_sqlite_backend(client):
+    assert client.get("/links").status_code == 200
+    stats = client.get("/pool").json()
+    assert stats["backend"] == "sqlite"
+    assert stats["open"] == stats["idle"] + stats["checked_out"] >= 1
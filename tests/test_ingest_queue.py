@@ -0,0 +1,76 @@
+import sqlite3
+import time
+
+import pytest
+
+import utils.ingest_queue
+from utils.ingest_queue import IngestQueue, IngestWorker
+
+
+@pytest.fixture
+def ingest_queue(tmp_path):
+    ingest_queue = IngestQueue(str(tmp_path / "ingest_queue.sqlite3"))
+    yield ingest_queue
+    ingest_queue.close()
+
+
+def _wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_links_already_saved_are_skipped(repository, ingest_queue, monkeypatch):
+    monkeypatch.setattr(utils.ingest_queue, "resolve_link", lambda link, *args, **kwargs: ("2023-06-01", "Title"))
+    worker = IngestWorker(ingest_queue, max_workers=2, commit_interval=0.01)
+    first = ingest_queue.enqueue("https://example.com/article?utm_source=newsletter")
+    second = ingest_queue.enqueue("https://example.com/article/")
+    worker.start()
+    worker.wake()
+    try:
+        _wait_for(lambda: ingest_queue.stats()["resolving"] + ingest_queue.stats()["queued"] == 0)
+    finally:
+        worker.stop()
+    assert sorted(ingest_queue.get(job).status for job in (first, second)) == ["done", "skipped"]
+    assert len(repository.select_page("links", {}, None, None)) == 1
+
+
+def test_a_restarted_worker_keeps_all_its_slots(repository, ingest_queue):
+    worker = IngestWorker(ingest_queue, max_workers=3)
+    for _ in range(3):
+        worker.start()
+        worker.stop()
+    acquired = 0
+    while worker._slots.acquire(blocking=False):
+        acquired += 1
+    assert acquired == 3
+
+
+def test_the_worker_outlives_a_locked_queue(repository, ingest_queue, monkeypatch):
+    monkeypatch.setattr(utils.ingest_queue, "resolve_link", lambda link, *args, **kwargs: ("2023-06-01", "Title"))
+    complete = ingest_queue.complete
+    calls = []
+
+    def locked_once(results):
+        calls.append(results)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        complete(results)
+
+    monkeypatch.setattr(ingest_queue, "complete", locked_once)
+    worker = IngestWorker(ingest_queue, max_workers=2, commit_interval=0.01)
+    worker.start()
+    try:
+        first = ingest_queue.enqueue("https://example.com/first")
+        worker.wake()
+        _wait_for(lambda: len(calls) == 1)
+        second = ingest_queue.enqueue("https://example.com/second")
+        worker.wake()
+        _wait_for(lambda: ingest_queue.get(second).status == "done")
+    finally:
+        worker.stop()
+    assert worker.last_error == "complete: database is locked"
+    # the first link was saved, only its job is left resolving until the lease expires
+    assert ingest_queue.get(first).status == "resolving"
+    assert len(repository.select_page("links", {}, None, None)) == 2
@@ -0,0 +1,16 @@
+from storage import TABLES
+from utils.query_plans import ENDPOINT_QUERIES
+
+
+def test_the_endpoint_queries_cover_every_filter():
+    for name in ("links", "publishers", "entry"):
+        for condition in TABLES[name].filters.values():
+            assert any(condition in query.sql for query in ENDPOINT_QUERIES), condition
+
+
+def test_the_endpoint_queries_are_valid_statements(repository):
+    with repository.session() as cursor:
+        for query in ENDPOINT_QUERIES:
+            # the full text search statements are written for MySQL
+            if "MATCH(" not in query.sql:
+                cursor.execute("EXPLAIN QUERY PLAN " + query.sql, query.params)
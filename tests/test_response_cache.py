@@ -0,0 +1,19 @@
+from utils.response_cache import CachedResponse, InMemoryCache
+
+
+def test_invalidations_are_shared_between_processes(repository):
+    api, cli = InMemoryCache(shared=repository, sync_interval=0), InMemoryCache(shared=repository, sync_interval=0)
+    assert api.get("/links") is None
+    api.set("/links", CachedResponse([], '"etag"'), ("links", ), api.snapshot(("links", )))
+    assert api.get("/links") is not None
+    cli.invalidate("links")
+    assert api.get("/links") is None
+
+
+def test_a_response_is_kept_until_the_next_sync(repository):
+    api, cli = InMemoryCache(shared=repository, sync_interval=3600), InMemoryCache(shared=repository)
+    api.get("/links")
+    api.set("/links", CachedResponse([], '"etag"'), ("links", ), api.snapshot(("links", )))
+    cli.invalidate("links", "entry")
+    assert api.get("/links") is not None
+    assert repository.cache_generations() == {"entry": 1, "links": 1}
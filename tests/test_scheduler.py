@@ -0,0 +1,63 @@
+import feedparser
+
+from utils.scheduler import FeedScheduler
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+
+
+def _feed(ttl=None, days=(1, 2, 3, 4)):
+    items = "".join(f"<item><title>{day}</title><pubDate>0{day} Jun 2023 10:00:00 GMT</pubDate></item>"
+                    for day in days)
+    return feedparser.parse(f"<rss version='2.0'><channel><title>Feed</title>"
+                            f"{f'<ttl>{ttl}</ttl>' if ttl is not None else ''}{items}</channel></rss>")
+
+
+def _scheduler(**settings) -> FeedScheduler:
+    scheduler = FeedScheduler(min_interval=15 * 60, max_interval=7 * DAY, jitter=0, **settings)
+    scheduler.sync([1], now=0)
+    return scheduler
+
+
+def test_the_interval_follows_the_publications_and_grows_while_nothing_is_new():
+    scheduler = _scheduler()
+    assert scheduler.pop_due(now=0) == [1]
+    schedule = scheduler.record_success(1, _feed(), {}, new_entries=4, now=0)
+    assert (schedule.interval, schedule.next_poll) == (DAY, DAY)
+    schedule = scheduler.record_success(1, _feed(), {}, new_entries=0, now=DAY)
+    assert schedule.interval == 1.5 * DAY
+    for _ in range(10):
+        schedule = scheduler.record_success(1, _feed(), {}, new_entries=0, now=schedule.next_poll)
+    assert schedule.interval == 7 * DAY
+
+
+def test_the_interval_is_never_shorter_than_the_ttl_or_max_age():
+    scheduler = _scheduler()
+    schedule = scheduler.record_success(1, _feed(ttl=2880, days=(1, 2)), {}, new_entries=1, now=0)
+    assert schedule.interval == 2 * DAY
+    # a 304 has no feed, but its Cache-Control still applies
+    schedule = scheduler.record_success(1, None, {"Cache-Control": "public, max-age=864000"}, new_entries=0, now=0)
+    assert schedule.interval == 10 * DAY
+
+
+def test_failing_feeds_back_off_exponentially_and_keep_their_interval():
+    scheduler = _scheduler()
+    scheduler.record_success(1, _feed(), {}, new_entries=4, now=0)
+    delays = [scheduler.record_failure(1, now=0).next_poll for _ in range(12)]
+    assert delays[:4] == [15 * 60, 30 * 60, HOUR, 2 * HOUR]
+    assert delays[-1] == 7 * DAY
+    schedule = scheduler.record_success(1, None, {}, new_entries=0, now=0)
+    assert (schedule.failures, schedule.interval) == (0, 1.5 * DAY)
+
+
+def test_a_loaded_scheduler_carries_on_where_the_saved_one_stopped(tmp_path):
+    path = str(tmp_path / "scheduler.json")
+    scheduler = _scheduler()
+    scheduler.sync([1, 2], now=0)
+    scheduler.record_success(1, _feed(), {}, new_entries=4, now=0)
+    scheduler.record_failure(2, now=0)
+    scheduler.save(path)
+    loaded = FeedScheduler.load(path, jitter=0)
+    assert loaded.feeds == scheduler.feeds
+    assert loaded.pop_due(now=HOUR) == [2]
+    assert loaded.seconds_until_next(now=HOUR) == DAY - HOUR
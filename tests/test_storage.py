@@ -0,0 +1,25 @@
+import pytest
+
+from storage import DuplicateRow, Repository
+
+
+def test_a_link_inserted_between_the_probe_and_the_insert_is_a_duplicate(repository, monkeypatch):
+    repository.insert("links", {"link": "https://example.com/article", "title": "An article", "date": "2023-06-01"})
+    probes = []
+
+    def saved_id(cursor, table, link_hash):
+        # the first probe runs before the concurrent insert committed
+        probes.append(link_hash)
+        return None if len(probes) == 1 else Repository._saved_id(cursor, table, link_hash)
+
+    monkeypatch.setattr(repository, "_saved_id", saved_id)
+    with pytest.raises(DuplicateRow) as raised:
+        repository.insert("links", {"link": "https://example.com/article/", "title": "Again", "date": "2023-06-02"})
+    assert raised.value.id == 1
+    assert len(probes) == 2
+
+
+def test_other_integrity_errors_are_not_duplicates(repository):
+    with pytest.raises(repository.integrity_errors):
+        repository.insert("entry", {"link": "https://example.com/entry", "title": "An entry", "publisher": 42,
+                                    "date": "2023-06-01"})
@@ -0,0 +1,21 @@
+import io
+
+import pytest
+
+from utils.transfer import MalformedFile, import_records, read_records
+
+
+def test_import_of_a_ndjson_line_that_is_not_an_object_is_malformed(repository):
+    data = b'{"link": "https://example.com/a", "title": "A", "date": "2023-06-01"}\n[1]\n'
+    with pytest.raises(MalformedFile, match="line 2 is not a JSON object"):
+        import_records(repository, "links", read_records(io.BytesIO(data), "ndjson"))
+
+
+def test_import_of_entries_of_missing_publishers_counts_them_as_invalid(repository):
+    repository.insert("publishers", {"name": "Publisher", "website": "https://example.com",
+                                     "rss": "https://example.com/feed"})
+    data = (b'{"title": "A", "link": "https://example.com/a", "publisher": 1, "date": "2023-06-01"}\n'
+            b'{"title": "B", "link": "https://example.com/b", "publisher": 42, "date": "2023-06-01"}\n'
+            b'{"title": "C", "link": "https://example.com/c", "publisher": true, "date": "2023-06-01"}\n')
+    summary = import_records(repository, "entry", read_records(io.BytesIO(data), "ndjson"))
+    assert (summary.read, summary.inserted, summary.invalid) == (3, 1, 2)
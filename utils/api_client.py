@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+from typing import List, Optional, Union
+
+# requests and the api module (FastAPI, pydantic, the database drivers) are only
+# imported by the client that needs them, so that commands that don't use the
+# database start quickly
+
+
+class ApiError(Exception):
+    """
+    Raised when the API server answers a request with an error status.
+    """
+
+    def __init__(self, status: int, detail):
+        super().__init__(f"The API answered {status}: {detail}")
+        self.status = status
+        self.detail = detail
+
+
+class LocalClient:
+    """
+    Reads and writes the database by calling the handlers of the api module in this
+    process. The api module is imported the first time the client is used.
+    """
+
+    def __init__(self):
+        self._api = None
+
+    @property
+    def api(self):
+        if self._api is None:
+            import api
+            self._api = api
+        return self._api
+
+    def create_link(self, link: dict):
+        from fastapi import HTTPException
+
+        try:
+            self.api.create_link(self.api.NewLink(**link))
+        except HTTPException as error:
+            # the same error as the ApiClient, e.g. 409 for a link already saved
+            raise ApiError(error.status_code, error.detail)
+
+    def enqueue_link(self, link: str, type: Optional[str] = None, category: Optional[str] = None) -> int:
+        # the link is saved by the worker of the API once it runs (see utils.ingest_queue)
+        from utils.ingest_queue import get_ingest_queue
+
+        return get_ingest_queue().enqueue(link, type, category)
+
+    def create_links(self, links: List[dict]) -> dict:
+        return self.api.create_links([self.api.Link(**link) for link in links]).dict()
+
+    def create_publisher(self, publisher: dict):
+        self.api.create_publisher(self.api.Publisher(**publisher))
+
+    def create_entries(self, entries: List[dict]) -> dict:
+        return self.api.create_entries([self.api.Entry(**entry) for entry in entries]).dict()
+
+    def get_hashes_from_db(self) -> List[dict]:
+        return self.api.get_hashes_from_db()
+
+    def update_publisher_hash(self, publisher_id: int, new_hash: str, etag: Optional[str] = None,
+                              last_modified: Optional[str] = None):
+        self.api.update_publisher_hash(publisher_id, new_hash, etag, last_modified)
+
+    def get_entry_fingerprints(self, publisher: int) -> List[str]:
+        return self.api.get_entry_fingerprints(publisher)
+
+    def add_entry_fingerprints(self, publisher: int, fingerprints: List[str]):
+        self.api.add_entry_fingerprints(self.api.EntryFingerprints(publisher=publisher, fingerprints=fingerprints))
+
+    def close(self):
+        pass
+
+
+class ApiClient:
+    """
+    Same methods as LocalClient, through the endpoints of a running API server, so
+    that the CLI needs neither the database drivers nor the credentials. Requests
+    share a keep-alive session: the connection to the server is opened once and
+    reused by every call instead of paying a TCP (and TLS) handshake per request.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 30, pool_size: int = 4):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _request(self, method: str, path: str, body=None, **params):
+        """
+        Sends a request and returns the decoded JSON of the response. Dates in the
+        body are sent in ISO format, parameters that are None are left out.
+        """
+        kwargs = {"params": {key: value for key, value in params.items() if value is not None}}
+        if body is not None:
+            kwargs["data"] = json.dumps(body, default=str)
+            kwargs["headers"] = {"Content-Type": "application/json"}
+        response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("detail")
+            except ValueError:
+                detail = response.text
+            raise ApiError(response.status_code, detail)
+        return response.json()
+
+    def create_link(self, link: dict):
+        self._request("POST", "/links", link)
+
+    def enqueue_link(self, link: str, type: Optional[str] = None, category: Optional[str] = None) -> int:
+        return self._request("POST", "/links", {"link": link, "type": type, "category": category})["job"]
+
+    def create_links(self, links: List[dict]) -> dict:
+        return self._request("POST", "/links/bulk", links)
+
+    def create_publisher(self, publisher: dict):
+        self._request("POST", "/publishers", publisher)
+
+    def create_entries(self, entries: List[dict]) -> dict:
+        return self._request("POST", "/entries/bulk", entries)
+
+    def get_hashes_from_db(self) -> List[dict]:
+        return self._request("GET", "/publishers/hash")
+
+    def update_publisher_hash(self, publisher_id: int, new_hash: str, etag: Optional[str] = None,
+                              last_modified: Optional[str] = None):
+        self._request("PUT", f"/publishers/{publisher_id}/hash", publisher_id=publisher_id, new_hash=new_hash,
+                      etag=etag, last_modified=last_modified)
+
+    def get_entry_fingerprints(self, publisher: int) -> List[str]:
+        return self._request("GET", "/entries/fingerprints", publisher=publisher)
+
+    def add_entry_fingerprints(self, publisher: int, fingerprints: List[str]):
+        self._request("POST", "/entries/fingerprints", {"publisher": publisher, "fingerprints": fingerprints})
+
+    def close(self):
+        self.session.close()
+
+
+_client: Optional[Union[LocalClient, ApiClient]] = None
+_client_lock = threading.Lock()
+
+def get_client() -> Union[LocalClient, ApiClient]:
+    """
+    This function returns the process-wide client used by the CLI: an ApiClient if
+    the apiUrl setting is set in the .env file, a LocalClient otherwise.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            url = os.environ.get("apiUrl")
+            _client = ApiClient(url) if url else LocalClient()
+        return _client
+
+def set_client(client: Optional[Union[LocalClient, ApiClient]]):
+    """
+    This function replaces the process-wide client (None goes back to the default).
+    """
+    global _client
+    with _client_lock:
+        if _client is not None and _client is not client:
+            _client.close()
+        _client = client
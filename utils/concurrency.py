@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+def url_host(url: str) -> str:
+    """
+    This function returns the lowercase host name of an url, or an empty
+    string when the url has none.
+    """
+    return (urlsplit(url).hostname or "").lower()
+
+
+class HostLimiter:
+    """
+    Caps the number of requests that can be in flight towards the same host
+    at the same time. One semaphore is lazily created for every host.
+    """
+
+    def __init__(self, per_host: int):
+        if per_host < 1:
+            raise ValueError("per_host must be at least 1")
+        self.per_host = per_host
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host)
+                self._semaphores[host] = semaphore
+        return semaphore
+
+    @contextmanager
+    def limit(self, url: str):
+        """
+        Blocks until a slot for the url's host is free and releases it on exit.
+        """
+        with self._semaphore(url_host(url)):
+            yield
+
+
+def interleave_by_host(items: Iterable[Any], url_of: Callable[[Any], str]) -> List[Any]:
+    """
+    This function reorders the items so that consecutive items point to different
+    hosts whenever possible (round robin over the hosts). This keeps the worker
+    threads from all queueing up behind the per-host limit of the same host.
+    """
+    buckets = OrderedDict()
+    for item in items:
+        buckets.setdefault(url_host(url_of(item)), []).append(item)
+    ordered = []
+    queues = [list(reversed(bucket)) for bucket in buckets.values()]
+    while queues:
+        for queue in queues:
+            ordered.append(queue.pop())
+        queues = [queue for queue in queues if queue]
+    return ordered
+
+
+def bounded_map(func: Callable[[Any], Any], items: Iterable[Any], url_of: Callable[[Any], str],
+                max_workers: int = 16, per_host: int = 2
+                ) -> Iterator[Tuple[Any, Any, Optional[BaseException], float]]:
+    """
+    This function applies func to every item on a bounded thread pool, allowing at most
+    max_workers calls at the same time overall and at most per_host calls towards the
+    same host. Results are yielded in completion order, so the caller can consume them
+    (for instance writing them to the database) from its own thread while the
+    remaining items are still being processed.
+
+    An exception raised by func is returned instead of being propagated, so a single
+    failing item never aborts the whole run.
+
+    Parameters
+    --------------
+        func: Callable
+            Function called with each item
+        items: Iterable
+            The items to process
+        url_of: Callable
+            Function returning the url an item points to, used for the per-host limit
+        max_workers: int
+            Global concurrency limit
+        per_host: int
+            Per-host concurrency limit
+
+    Returns
+    --------------
+        (Iterator[tuple]) Tuples of (item, result, error, elapsed seconds)
+    """
+    limiter = HostLimiter(per_host)
+
+    def run(item):
+        start = time.perf_counter()
+        try:
+            with limiter.limit(url_of(item)):
+                result = func(item)
+        except Exception as error:
+            return item, None, error, time.perf_counter() - start
+        return item, result, None, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [executor.submit(run, item) for item in interleave_by_host(items, url_of)]
+        for future in as_completed(futures):
+            yield future.result()
@@ -1,9 +1,14 @@
 import email
+from email.message import Message
 from dotenv import load_dotenv
 import os
 import imaplib
 import re
 from datetime import date
+from typing import List, Optional, Tuple
+
+from utils.link_extractor import extract_links_from_messages
+from utils.state import PROJECT_DIR, load_state, save_state
 
 MONTH_REFERENCES = {
     1: "Jan",
@@ -20,47 +25,140 @@ MONTH_REFERENCES = {
     12: "Dec"
 }
 
-def read_email_inbox():
+MAILBOX = "Links"
+DEFAULT_SYNC_STATE_PATH = os.path.join(PROJECT_DIR, ".email_sync_state.json")
+FETCH_UID = re.compile(rb"UID (\d+)")
+
+def connect_inbox() -> imaplib.IMAP4:
     """
-    This function reads a gmail inbox, and scrpaes all the links contained in emails
-    that can be found in the "Links" server, which were sent on the day this function is
-    called.
+    This function connects and logs in to the IMAP server configured in the environment
+    (.env file): imapHost (imap.gmail.com), imapPort (993), imapSsl (true),
+    gmailUserEmail and gmailAppPassword.
+    """
+    load_dotenv()
+    host = os.environ.get("imapHost", "imap.gmail.com")
+    port = int(os.environ.get("imapPort", 993))
+    use_ssl = os.environ.get("imapSsl", "true").lower() not in ("0", "false", "no")
+    server = imaplib.IMAP4_SSL(host, port) if use_ssl else imaplib.IMAP4(host, port)
+    server.login(os.environ.get("gmailUserEmail"), os.environ.get("gmailAppPassword"))
+    return server
 
-    Returns
-    --------------
-        links: list
-            A list containing the links that were found in the emails sent
-            on the day this function is called.
+def load_sync_state(path: Optional[str] = None) -> dict:
+    """
+    This function returns the sync state saved by the last run: for every mailbox its
+    UIDVALIDITY and the UID of the last message processed.
+    """
+    return load_state(path or os.environ.get("emailSyncStatePath", DEFAULT_SYNC_STATE_PATH), {})
+
+def save_sync_state(state: dict, path: Optional[str] = None):
+    """
+    This function saves the sync state returned by read_email_inbox. It should be called
+    once the links have been stored, so that a failed run is retried by the next one.
+    """
+    save_state(path or os.environ.get("emailSyncStatePath", DEFAULT_SYNC_STATE_PATH), state)
+
+def _untagged_int(server: imaplib.IMAP4, name: str) -> Optional[int]:
+    _, data = server.response(name)
+    return int(data[0]) if data and data[0] is not None else None
+
+def _first_unsynced_uid(server: imaplib.IMAP4) -> int:
+    """
+    Returns the UID to start from when the mailbox has never been synced (or its
+    UIDVALIDITY changed): the first message received today, as the job did before
+    keeping a sync state.
     """
-    link_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
     today = date.today()
     today_str_query = f"{today.day}-{MONTH_REFERENCES[today.month]}-{today.year}"
-    links = []
+    response, data = server.uid("SEARCH", None, f'(SINCE "{today_str_query}")')
+    uids = [int(uid) for uid in data[0].split()] if response == "OK" and data and data[0] else []
+    if uids:
+        return min(uids)
+    uidnext = _untagged_int(server, "UIDNEXT")
+    if uidnext is not None:
+        return uidnext
+    response, data = server.uid("SEARCH", None, "ALL")
+    uids = [int(uid) for uid in data[0].split()] if response == "OK" and data and data[0] else []
+    return max(uids, default=0) + 1
 
-    load_dotenv()
-    username = os.environ.get("gmailUserEmail")
-    password = os.environ.get("gmailAppPassword")
-    
-    server = imaplib.IMAP4_SSL('imap.gmail.com')
-    server.login(username, password)
-    server.select("Links")
-    response, items = server.search(None, f'(SINCE "{today_str_query}")')
-    items = items[0].split()
+def fetch_new_messages(server: imaplib.IMAP4, state: dict,
+                       mailbox: str = MAILBOX) -> Tuple[List[Tuple[int, Message]], dict]:
+    """
+    This function fetches, with a single UID FETCH over a UID range, every message of
+    the mailbox that arrived after the last one processed, without marking them as read.
+
+    Parameters
+    --------------
+        server: imaplib.IMAP4
+            A logged in IMAP connection
+        state: dict
+            The sync state returned by load_sync_state
+        mailbox: str
+            The mailbox to read
+
+    Returns
+    --------------
+        (tuple) The new messages as (uid, message) pairs in UID order, and the
+        updated sync state
+    """
+    response, _ = server.select(mailbox, readonly=True)
     if response != "OK":
-        return None
-    for item in items:
-        response2, data = server.fetch(item, "(UID BODY[TEXT])")
-        
+        return [], state
+    uidvalidity = _untagged_int(server, "UIDVALIDITY")
+    synced = state.get(mailbox)
+    if synced is not None and synced.get("uidvalidity") == uidvalidity:
+        first_uid = synced["last_uid"] + 1
+    else:
+        first_uid = _first_unsynced_uid(server)
+    last_uid = first_uid - 1
+
+    messages = []
+    response, data = server.uid("FETCH", f"{first_uid}:*", "(BODY.PEEK[])")
+    if response == "OK":
         for element in data:
-            if isinstance(element, tuple):
-                message = email.message_from_bytes(element[1])
-                matches = re.findall(link_pattern, message.as_string())
-                break
-        if len(matches) > 1:
-            for match in matches: 
-                # check that it's not already in list
-                if match not in links and "</a>" not in match and "</div>" not in match: 
-                    links.append(match)
-        else: links = [matches[0]]
-    
-    return links
\ No newline at end of file
+            if not isinstance(element, tuple):
+                continue
+            match = FETCH_UID.search(element[0])
+            # "n:*" always matches the last message, even when its UID is lower than n
+            if match is None or int(match.group(1)) < first_uid:
+                continue
+            uid = int(match.group(1))
+            messages.append((uid, email.message_from_bytes(element[1])))
+            last_uid = max(last_uid, uid)
+    messages.sort(key=lambda pair: pair[0])
+    new_state = {**state, mailbox: {"uidvalidity": uidvalidity, "last_uid": last_uid}}
+    return messages, new_state
+
+def read_email_inbox(server: Optional[imaplib.IMAP4] = None,
+                     state: Optional[dict] = None) -> Tuple[List[str], dict]:
+    """
+    This function reads a gmail inbox, and scrpaes all the links contained in emails
+    that can be found in the "Links" server which have not been processed yet. The
+    first time it is called, the emails sent on that day are read.
+
+    Parameters
+    --------------
+        server: Optional[imaplib.IMAP4]
+            A logged in IMAP connection. If None, connect_inbox is used
+        state: Optional[dict]
+            The sync state returned by load_sync_state. If None it is loaded
+
+    Returns
+    --------------
+        links: list
+            A list containing the links that were found in the new emails
+        state: dict
+            The updated sync state, to save with save_sync_state once the links are stored
+    """
+    if state is None:
+        state = load_sync_state()
+    own_server = server is None
+    if own_server:
+        server = connect_inbox()
+    try:
+        messages, state = fetch_new_messages(server, state)
+    finally:
+        if own_server:
+            server.logout()
+
+    links = extract_links_from_messages(message for _, message in messages)
+    return links, state
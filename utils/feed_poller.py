@@ -0,0 +1,76 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from utils.concurrency import bounded_map
+
+
+@dataclass
+class FeedResult:
+    """
+    Outcome of polling a single publisher's feed.
+    """
+    publisher: dict
+    value: Any = None
+    error: Optional[BaseException] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class PollSummary:
+    """
+    Collects the outcome of every feed polled during a run.
+    """
+    started: float = field(default_factory=time.perf_counter)
+    succeeded: int = 0
+    failures: List[Tuple[str, str]] = field(default_factory=list)
+
+    def add(self, result: FeedResult):
+        if result.ok:
+            self.succeeded += 1
+        else:
+            self.failures.append((result.publisher.get("name", result.publisher.get("rss")),
+                                  f"{type(result.error).__name__}: {result.error}"))
+
+    @property
+    def failed(self) -> int:
+        return len(self.failures)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def report(self) -> str:
+        lines = [f"Polled {self.succeeded + self.failed} feeds in {self.elapsed:.1f}s: "
+                 f"{self.succeeded} succeeded, {self.failed} failed"]
+        lines += [f"  {name}: {error}" for name, error in self.failures]
+        return "\n".join(lines)
+
+
+def poll_feeds(publishers: Iterable[dict], fetch: Callable[[dict], Any],
+               max_workers: int = 16, per_host: int = 2) -> Iterator[FeedResult]:
+    """
+    This function fetches the feeds of the publishers concurrently and yields a
+    FeedResult for each of them as soon as it is available. The network bound part
+    (fetch) runs on the worker threads while the consumer of the iterator stays on
+    the calling thread, which is where database writes should happen.
+
+    Parameters
+    --------------
+        publishers: Iterable[dict]
+            Rows returned by get_hashes_from_db (each must have an "rss" key)
+        fetch: Callable[[dict], Any]
+            Function downloading and processing a publisher's feed. Its return value
+            is stored in FeedResult.value
+        max_workers: int
+            Maximum number of feeds being fetched at the same time
+        per_host: int
+            Maximum number of feeds being fetched at the same time from the same host
+    """
+    for publisher, value, error, elapsed in bounded_map(fetch, publishers, lambda p: p["rss"],
+                                                        max_workers=max_workers, per_host=per_host):
+        yield FeedResult(publisher=publisher, value=value, error=error, elapsed=elapsed)
@@ -0,0 +1,161 @@
+import io
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Iterator, Optional, Union
+
+import feedparser
+
+# bytes read from the response at a time
+CHUNK_SIZE = 64 * 1024
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+RSS1 = "{http://purl.org/rss/1.0/}"
+DUBLIN_CORE = "{http://purl.org/dc/elements/1.1/}"
+RDF = "{http://www.w3.org/1999/02/22-rdf-syntax-ns#}"
+FEEDBURNER = "{http://rssnamespace.org/feedburner/ext/1.0}"
+ENTRY_TAGS = {"item", RSS1 + "item", ATOM + "entry"}
+CHANNEL_TAGS = {"channel", RSS1 + "channel", ATOM + "feed"}
+PUBLISHED_TAGS = {"pubDate", ATOM + "published", DUBLIN_CORE + "date"}
+UPDATED_TAGS = {ATOM + "updated"}
+
+
+def _text(element: ET.Element) -> str:
+    return "".join(element.itertext()).strip()
+
+def parse_date(value: Optional[str]) -> Optional[time.struct_time]:
+    """
+    Parses a RFC 822 (RSS) or RFC 3339 (Atom) date into a UTC struct_time, as feedparser
+    does for the *_parsed keys. Returns None if the date can't be parsed.
+    """
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.utctimetuple()
+
+def _entry(element: ET.Element) -> feedparser.FeedParserDict:
+    """
+    Builds, from an <item> or <entry> element, the subset of the entry feedparser would
+    return that is used by the content manager (title, link, id, dates and the
+    original link of the feeds redirected through feedburner).
+    """
+    entry = feedparser.FeedParserDict()
+    permalink = None
+    for child in element:
+        tag = child.tag
+        if tag in ("title", RSS1 + "title", ATOM + "title"):
+            entry["title"] = _text(child)
+        elif tag in ("link", RSS1 + "link") and "link" not in entry:
+            entry["link"] = _text(child)
+        elif tag == ATOM + "link" and child.get("rel", "alternate") == "alternate" and "link" not in entry:
+            entry["link"] = child.get("href", "").strip()
+        elif tag in ("guid", ATOM + "id"):
+            entry["id"] = _text(child)
+            if tag == "guid" and child.get("isPermaLink", "true").lower() == "true":
+                permalink = entry["id"]
+        elif tag in PUBLISHED_TAGS and "published_parsed" not in entry:
+            entry["published"] = _text(child)
+            entry["published_parsed"] = parse_date(entry["published"])
+        elif tag == FEEDBURNER + "origLink":
+            # the link of the article behind a feedburner redirect (feedparser's key)
+            entry["feedburner_origlink"] = _text(child)
+        elif tag in UPDATED_TAGS:
+            entry["updated"] = _text(child)
+            entry["updated_parsed"] = parse_date(entry["updated"])
+    if not entry.get("link") and permalink and permalink.startswith(("http://", "https://")):
+        entry["link"] = permalink
+    if "id" not in entry and element.get(RDF + "about"):
+        entry["id"] = element.get(RDF + "about")
+    return entry
+
+
+class FeedStream:
+    """
+    Incremental reader of RSS 2.0, RSS 1.0 and Atom feeds. Iterating over it yields the
+    entries (as feedparser would return them, limited to title, link, id and dates) as
+    soon as they are parsed, reading the source a chunk at a time. Parsed elements are
+    discarded as soon as they have been read, so memory usage depends on the size of a
+    single entry and not on the size of the feed. Stopping the iteration stops reading.
+
+    The elements of the channel that come before the entries (title, ttl, ...) are
+    available in the feed attribute, like feedparser's feed.feed.
+
+    A feed that is not well-formed XML raises xml.etree.ElementTree.ParseError.
+    """
+
+    def __init__(self, source: Union[bytes, io.RawIOBase, io.BufferedIOBase], chunk_size: int = CHUNK_SIZE):
+        self.source = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+        self.chunk_size = chunk_size
+        self.feed = feedparser.FeedParserDict()
+
+    def __iter__(self) -> Iterator[feedparser.FeedParserDict]:
+        parser = ET.XMLPullParser(events=("start", "end"))
+        stack = []
+        while True:
+            chunk = self.source.read(self.chunk_size)
+            if chunk:
+                parser.feed(chunk)
+            else:
+                parser.close()
+            for event, element in parser.read_events():
+                if event == "start":
+                    stack.append(element)
+                    continue
+                stack.pop()
+                parent = stack[-1] if stack else None
+                if element.tag in ENTRY_TAGS:
+                    yield _entry(element)
+                elif parent is not None and parent.tag in CHANNEL_TAGS and len(element) == 0:
+                    name = element.tag.rsplit("}", 1)[-1]
+                    self.feed.setdefault(name, (element.text or "").strip())
+                else:
+                    continue
+                # free the element and its children, which have been read
+                element.clear()
+                if parent is not None:
+                    parent.remove(element)
+            if not chunk:
+                return
+
+
+def read_feed(source: Union[bytes, io.RawIOBase, io.BufferedIOBase], max_entries: Optional[int] = None,
+              until: Optional[Callable[[dict], bool]] = None) -> feedparser.FeedParserDict:
+    """
+    This function reads a feed with a FeedStream and returns it in the shape returned by
+    feedparser.parse (feed and entries), stopping as soon as max_entries entries have
+    been read or an entry for which until returns True is found (that entry and the ones
+    after it are left out). Since feeds list their newest entries first, this allows
+    reading only the part of a large feed that matters.
+
+    Parameters
+    --------------
+        source: bytes | file object
+            The content of the feed, or a binary file object (e.g. an http response) to read it from
+        max_entries: Optional[int]
+            Maximum number of entries read
+        until: Optional[Callable[[dict], bool]]
+            Predicate telling whether an entry is already known or too old to be read
+
+    Returns
+    --------------
+        (FeedParserDict) The channel elements in feed, the entries read in entries
+    """
+    stream = FeedStream(source)
+    entries = []
+    if max_entries is None or max_entries > 0:
+        for entry in stream:
+            if until is not None and until(entry):
+                break
+            entries.append(entry)
+            if max_entries is not None and len(entries) >= max_entries:
+                break
+    return feedparser.FeedParserDict(feed=stream.feed, entries=entries, bozo=0)
@@ -0,0 +1,401 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from utils.concurrency import HostLimiter
+from utils.link_cache import LinkCache, get_link_cache
+from utils.link_resolver import resolve_link
+from utils.metrics import INGEST_ERRORS, INGEST_JOBS, INGEST_SECONDS
+from utils.urls import url_hash
+
+load_dotenv()
+
+DEFAULT_QUEUE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".ingest_queue.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    link TEXT NOT NULL,
+    type TEXT,
+    category TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    title TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at);
+"""
+JOB_STATUSES = ("queued", "resolving", "done", "skipped", "failed")
+
+
+class Job(NamedTuple):
+    id: int
+    link: str
+    type: Optional[str]
+    category: Optional[str]
+    status: str
+    title: Optional[str]
+    error: Optional[str]
+    attempts: int
+    created_at: float
+    updated_at: float
+
+
+class IngestQueue:
+    """
+    Durable queue of the links to save, stored in a SQLite database so that queued
+    links survive a restart and can be added by another process (the CLI). Enqueuing
+    is a single insert in WAL mode, which takes well under a millisecond.
+
+    A job is claimed by a worker (status resolving) until it is done, skipped (the
+    link was already saved) or failed. Jobs
+    whose worker died (claimed more than lease seconds ago) are claimed again, and a
+    job that could not be saved max_attempts times is marked failed.
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, lease: float = 300, max_attempts: int = 5):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # durable across application crashes; only a power loss can drop the last jobs
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def enqueue(self, link: str, type: Optional[str] = None, category: Optional[str] = None) -> int:
+        """
+        Adds a link to the queue and returns the id of its job.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute("INSERT INTO jobs (link, type, category, created_at, updated_at) "
+                                      "VALUES (?, ?, ?, ?, ?)", (link, type, category, now, now))
+        INGEST_JOBS.inc(status="queued")
+        return cursor.lastrowid
+
+    def claim(self, limit: int) -> List[Job]:
+        """
+        Marks up to limit queued jobs (the oldest first) as resolving and returns them.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [row[0] for row in self._db.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' OR (status = 'resolving' AND updated_at < ?) "
+                    "ORDER BY id LIMIT ?", (now - self.lease, limit))]
+                if ids:
+                    marks = ", ".join("?" * len(ids))
+                    self._db.execute(f"UPDATE jobs SET status = 'resolving', attempts = attempts + 1, updated_at = ? "
+                                     f"WHERE id IN ({marks})", (now, *ids))
+                    jobs = [Job(*row) for row in self._db.execute(f"SELECT * FROM jobs WHERE id IN ({marks}) "
+                                                                   f"ORDER BY id", ids)]
+                else:
+                    jobs = []
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return jobs
+
+    def complete(self, results: List[Tuple[int, str]]):
+        """
+        Marks jobs as done, given their id and the title the link was saved with.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany("UPDATE jobs SET status = 'done', title = ?, error = NULL, updated_at = ? "
+                                     "WHERE id = ?", [(title, now, job_id) for job_id, title in results])
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        INGEST_JOBS.inc(len(results), status="done")
+
+    def skip(self, ids: List[int]):
+        """
+        Marks jobs as skipped, because their link was already saved.
+        """
+        marks = ", ".join("?" * len(ids))
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET status = 'skipped', error = NULL, updated_at = ? WHERE id IN ({marks})",
+                             (time.time(), *ids))
+        INGEST_JOBS.inc(len(ids), status="skipped")
+
+    def release(self, ids: List[int], error: str):
+        """
+        Puts jobs that could not be saved back in the queue, or marks them failed once
+        they were attempted max_attempts times.
+        """
+        marks = ", ".join("?" * len(ids))
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                failed = self._db.execute(f"SELECT COUNT(*) FROM jobs WHERE id IN ({marks}) AND attempts >= ?",
+                                          (*ids, self.max_attempts)).fetchone()[0]
+                self._db.execute(f"UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                                 f"error = ?, updated_at = ? WHERE id IN ({marks})",
+                                 (self.max_attempts, error, time.time(), *ids))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        INGEST_JOBS.inc(failed, status="failed")
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id, )).fetchone()
+        return None if row is None else Job(*row)
+
+    def prune(self, older_than: float):
+        """
+        Deletes the jobs that were done, skipped or failed more than older_than seconds ago.
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE status IN ('done', 'skipped', 'failed') AND updated_at < ?",
+                             (time.time() - older_than, ))
+
+    def stats(self) -> dict:
+        """
+        Returns the number of jobs in each status.
+        """
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in JOB_STATUSES}
+
+    def close(self):
+        self._db.close()
+
+
+class IngestWorker:
+    """
+    Saves the links of an IngestQueue in the background.
+
+    A dispatcher thread claims queued jobs as soon as a thread of the pool is free,
+    and their titles are resolved on up to max_workers threads (at most per_host at
+    the same time towards the same website), so a slow website only holds up its own
+    links. Resolved links are written by a single committer thread with group commits:
+    the links resolved within commit_interval seconds (up to commit_size) are inserted
+    in one transaction; the links that were already saved are skipped. Finished jobs
+    are deleted after retention seconds.
+
+    The threads outlive errors of the queue database (e.g. it stayed locked by another
+    process): they are counted in ingest_errors_total and the last one is kept in
+    last_error, and the jobs they left resolving are claimed again once their lease
+    expires.
+    """
+
+    def __init__(self, ingest_queue: IngestQueue, max_workers: int = 8, per_host: int = 2, timeout: float = 10,
+                 retries: int = 2, commit_size: int = 100, commit_interval: float = 0.2,
+                 retention: float = 7 * 24 * 3600, cache: Optional[LinkCache] = None):
+        self.queue = ingest_queue
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.commit_size = commit_size
+        self.commit_interval = commit_interval
+        self.retention = retention
+        self.cache = cache
+        self._limiter = HostLimiter(per_host)
+        self._slots = threading.Semaphore(max_workers)
+        self._resolved = queue.Queue()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        """
+        Starts the threads of the worker, if they are not running.
+        """
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest")
+            self._threads = [threading.Thread(target=self._dispatch, name="ingest-dispatcher", daemon=True),
+                             threading.Thread(target=self._commit_resolved, name="ingest-committer", daemon=True)]
+            for thread in self._threads:
+                thread.start()
+
+    def wake(self):
+        """
+        Tells the dispatcher that jobs were queued, instead of waiting for its next poll.
+        """
+        self._wake.set()
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stops claiming jobs, waits for the links being resolved and commits them. Jobs
+        that are still queued are left for the next start.
+        """
+        with self._lock:
+            threads, self._threads = self._threads, []
+            if not threads:
+                return
+            self._stopping.set()
+            self._wake.set()
+            threads[0].join(timeout)
+            self._executor.shutdown(wait=True)
+            self._resolved.put(None)
+            threads[1].join(timeout)
+
+    def _dispatch(self, poll_interval: float = 1.0):
+        last_prune = 0.0
+        while True:
+            self._slots.acquire()
+            if self._stopping.is_set():
+                # the slot is free again for the next start
+                self._slots.release()
+                break
+            free = 1
+            while free < self.max_workers and self._slots.acquire(blocking=False):
+                free += 1
+            try:
+                jobs = self.queue.claim(free)
+            except sqlite3.Error as error:
+                # e.g. the queue stayed locked by another process, try again later
+                self._record_error("claim", error)
+                jobs = []
+            for _ in range(free - len(jobs)):
+                self._slots.release()
+            for job in jobs:
+                self._executor.submit(self._resolve, job)
+            if not jobs:
+                if time.monotonic() - last_prune > 3600:
+                    try:
+                        self.queue.prune(self.retention)
+                    except sqlite3.Error as error:
+                        self._record_error("prune", error)
+                    last_prune = time.monotonic()
+                # jobs queued by other processes are picked up within poll_interval
+                self._wake.wait(poll_interval)
+                self._wake.clear()
+
+    def _resolve(self, job: Job):
+        try:
+            with self._limiter.limit(job.link):
+                # resolve_link falls back to the link as title, so it does not fail
+                date, title = resolve_link(job.link, self.timeout, self.retries, cache=self.cache)
+            self._resolved.put((job, date, title))
+        except Exception as error:
+            self._resolved.put((job, None, error))
+        finally:
+            self._slots.release()
+
+    def _record_error(self, operation: str, error: Exception):
+        self.last_error = f"{operation}: {error}"
+        INGEST_ERRORS.inc(operation=operation)
+
+    def _update_jobs(self, operation: str, *args) -> bool:
+        # the jobs of a failed update stay resolving until their lease expires
+        try:
+            getattr(self.queue, operation)(*args)
+            return True
+        except sqlite3.Error as error:
+            self._record_error(operation, error)
+            return False
+
+    def _commit_resolved(self):
+        from storage import get_repository
+        from utils.response_cache import get_response_cache
+
+        stopping = False
+        while not stopping:
+            item = self._resolved.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.commit_interval
+            while len(batch) < self.commit_size:
+                try:
+                    item = self._resolved.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            failed = [job.id for job, date, title in batch if date is None]
+            if failed:
+                self._update_jobs("release", failed, "could not resolve the title")
+            resolved = [(job, date, title) for job, date, title in batch if date is not None]
+            if not resolved:
+                continue
+            try:
+                # the links already saved, or twice in the batch, would be dropped by the
+                # insert without telling which: they are skipped
+                saved = get_repository().saved_links("links", [job.link for job, _, _ in resolved])
+                new, duplicates = [], []
+                for job, date, title in resolved:
+                    link_hash = url_hash(job.link)
+                    if link_hash in saved:
+                        duplicates.append(job.id)
+                    else:
+                        saved.add(link_hash)
+                        new.append((job, date, title))
+                inserted = get_repository().insert_many("links", [
+                    {"link": job.link, "title": title, "date": date, "type": job.type, "category": job.category}
+                    for job, date, title in new])
+            except Exception as error:
+                self._update_jobs("release", [job.id for job, _, _ in resolved], str(error))
+                continue
+            if inserted:
+                get_response_cache().invalidate("links")
+            # once claimed again, the links saved here are skipped
+            if duplicates:
+                self._update_jobs("skip", duplicates)
+            if new:
+                self._update_jobs("complete", [(job.id, title) for job, _, title in new])
+            now = time.time()
+            for job, _, _ in resolved:
+                INGEST_SECONDS.observe(now - job.created_at)
+
+
+_queue: Optional[IngestQueue] = None
+_worker: Optional[IngestWorker] = None
+_ingest_lock = threading.Lock()
+
+def get_ingest_queue() -> IngestQueue:
+    """
+    This function returns the process wide ingestion queue, creating it on first use
+    from the ingestQueuePath setting (.ingest_queue.sqlite3 in the project folder).
+    """
+    global _queue
+    with _ingest_lock:
+        if _queue is None:
+            _queue = IngestQueue(os.environ.get("ingestQueuePath", DEFAULT_QUEUE_PATH))
+        return _queue
+
+def get_ingest_worker() -> IngestWorker:
+    """
+    This function returns the process wide worker of the ingestion queue (not started),
+    creating it on first use from the settings in the environment (.env file):
+    ingestWorkers (8 titles resolved at the same time), ingestPerHost (2),
+    ingestCommitSize (100 links per transaction) and ingestCommitInterval (0.2 seconds).
+    """
+    global _worker
+    ingest_queue = get_ingest_queue()
+    with _ingest_lock:
+        if _worker is None:
+            _worker = IngestWorker(ingest_queue,
+                                   max_workers=int(os.environ.get("ingestWorkers", 8)),
+                                   per_host=int(os.environ.get("ingestPerHost", 2)),
+                                   commit_size=int(os.environ.get("ingestCommitSize", 100)),
+                                   commit_interval=float(os.environ.get("ingestCommitInterval", 0.2)),
+                                   cache=get_link_cache())
+        return _worker
@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+
+from utils.link_data import LinkMetadata, get_link_metadata
+from utils.urls import canonicalize_url
+
+load_dotenv()
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".link_cache.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS link_metadata (
+    url TEXT PRIMARY KEY,
+    final_url TEXT NOT NULL,
+    title TEXT,
+    og_title TEXT,
+    canonical_url TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS link_metadata_accessed_at ON link_metadata (accessed_at);
+"""
+
+
+class LinkCache:
+    """
+    On-disk cache of webpage metadata, keyed by canonical url and stored in a SQLite
+    database so that it can be shared by several processes (the CLI and the API).
+
+    Entries older than ttl seconds are stale: they are revalidated with a conditional
+    request before being used again. When more than max_entries are stored, the least
+    recently used ones are evicted.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = 30 * 24 * 3600,
+                 max_entries: int = 10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def get(self, url: str) -> Tuple[Optional[LinkMetadata], bool]:
+        """
+        Returns the cached metadata of the url (None if it is not cached) and whether
+        it is still fresh. Hits and misses are counted here.
+        """
+        key = canonicalize_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT final_url, title, og_title, canonical_url, etag, last_modified, fetched_at "
+                                   "FROM link_metadata WHERE url = ?", (key, )).fetchone()
+            if row is None:
+                self.misses += 1
+                return None, False
+            self._db.execute("UPDATE link_metadata SET accessed_at = ? WHERE url = ?", (now, key))
+            fresh = now - row[6] <= self.ttl
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return LinkMetadata(url, *row[:6]), fresh
+
+    def put(self, metadata: LinkMetadata):
+        """
+        Stores freshly fetched metadata, evicting the least recently used entries
+        if the cache is full.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO link_metadata VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             (canonicalize_url(metadata.url), metadata.final_url, metadata.title,
+                              metadata.og_title, metadata.canonical_url, metadata.etag,
+                              metadata.last_modified, now, now))
+            count = self._db.execute("SELECT COUNT(*) FROM link_metadata").fetchone()[0]
+            if count > self.max_entries:
+                self._db.execute("DELETE FROM link_metadata WHERE url IN (SELECT url FROM link_metadata "
+                                 "ORDER BY accessed_at LIMIT ?)", (count - self.max_entries, ))
+
+    def touch(self, url: str):
+        """
+        Marks the entry of the url as fresh again, after the server confirmed it has not changed.
+        """
+        with self._lock:
+            self.revalidated += 1
+            self._db.execute("UPDATE link_metadata SET fetched_at = ? WHERE url = ?",
+                             (time.time(), canonicalize_url(url)))
+
+    def stats(self) -> dict:
+        """
+        Returns the hit/miss counters of this process and the number of cached urls.
+        """
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM link_metadata").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "revalidated": self.revalidated,
+                "entries": entries, "max_entries": self.max_entries, "ttl": self.ttl}
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM link_metadata")
+
+
+_cache: Optional[LinkCache] = None
+_cache_lock = threading.Lock()
+
+def get_link_cache() -> LinkCache:
+    """
+    This function returns the process wide link cache, creating it on first use from
+    the settings in the environment (.env file): linkCachePath (.link_cache.sqlite3 in
+    the project folder), linkCacheTtl (30 days, in seconds) and linkCacheMaxEntries (10000).
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LinkCache(os.environ.get("linkCachePath", DEFAULT_CACHE_PATH),
+                               float(os.environ.get("linkCacheTtl", 30 * 24 * 3600)),
+                               int(os.environ.get("linkCacheMaxEntries", 10000)))
+        return _cache
+
+def get_cached_link_metadata(link: str, cache: LinkCache, timeout: Optional[float] = None) -> LinkMetadata:
+    """
+    This function returns the metadata of a webpage from the cache when it is fresh.
+    Stale entries are revalidated with a conditional request, and pages that are not
+    cached are fetched (see get_link_metadata) and stored.
+
+    Parameters
+    --------------
+        link: str
+            The link of the webpage whose metadata we want to retrieve
+        cache: LinkCache
+            The cache to use
+        timeout: Optional[float]
+            Number of seconds after which a blocking network operation is aborted
+    """
+    cached, fresh = cache.get(link)
+    if cached is not None and fresh:
+        return cached
+    metadata = get_link_metadata(link, timeout,
+                                 etag=cached.etag if cached else None,
+                                 last_modified=cached.last_modified if cached else None)
+    if metadata is None:
+        cache.touch(link)
+        return cached
+    cache.put(metadata)
+    return metadata
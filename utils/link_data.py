@@ -1,29 +1,193 @@
+import codecs
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from urllib.error import HTTPError
+from urllib.parse import urljoin
 from urllib.request import Request, urlopen
-from bs4 import BeautifulSoup
 
 from datetime import date
-from typing import Tuple 
+from typing import Optional, Tuple
 
-def get_link_data(link: str) -> Tuple[str, str]:
+# bytes read at a time, and at most, when looking for the <head> metadata of a page
+CHUNK_SIZE = 16 * 1024
+DEFAULT_MAX_BYTES = 512 * 1024
+# the HTML spec requires <meta charset> to be within the first 1024 bytes of the page
+META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_\-]+)""", re.IGNORECASE)
+
+
+@dataclass
+class LinkMetadata:
+    """
+    Metadata read from the <head> of a webpage.
+    """
+    url: str
+    final_url: str
+    title: Optional[str] = None
+    og_title: Optional[str] = None
+    canonical_url: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def best_title(self) -> Optional[str]:
+        return self.title or self.og_title
+
+
+class HeadParser(HTMLParser):
+    """
+    Incremental parser that only collects the <title>, og:title and canonical url of a
+    page. It sets done as soon as the <head> is over (or as soon as the title was found,
+    when only the title is needed), so the caller can stop reading the page.
+    """
+
+    def __init__(self, title_only: bool = False):
+        super().__init__(convert_charrefs=True)
+        self.title_only = title_only
+        self.title = None
+        self.og_title = None
+        self.canonical = None
+        self.done = False
+        self._in_title = False
+        self._title_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title" and self.title is None:
+            self._in_title = True
+        elif tag == "meta":
+            attrs = dict(attrs)
+            if (attrs.get("property") or attrs.get("name")) == "og:title" and attrs.get("content"):
+                self.og_title = self.og_title or attrs["content"].strip()
+        elif tag == "link":
+            attrs = dict(attrs)
+            if "canonical" in (attrs.get("rel") or "").lower().split() and attrs.get("href"):
+                self.canonical = self.canonical or attrs["href"].strip()
+        elif tag == "body":
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            self.title = " ".join("".join(self._title_parts).split()) or None
+            self.done = self.done or self.title_only
+        elif tag == "head":
+            self.done = True
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+
+
+def read_head_metadata(response, max_bytes: int = DEFAULT_MAX_BYTES, title_only: bool = False) -> HeadParser:
     """
-    This function retrieves the title of the webpage where the 
+    This function reads a page from an http response a chunk at a time and feeds it to
+    a HeadParser, stopping as soon as the parser has what it needs or max_bytes have
+    been read. The charset is taken from the Content-Type header, or from the page's
+    <meta charset>, and defaults to utf-8.
+
+    Parameters
+    --------------
+        response: http.client.HTTPResponse
+            The response whose body is the page
+        max_bytes: int
+            Maximum number of bytes read from the response
+        title_only: bool
+            If True reading stops as soon as the <title> has been parsed
+
+    Returns
+    --------------
+        (HeadParser) The parser holding the metadata that was found
+    """
+    parser = HeadParser(title_only)
+    first = response.read(min(CHUNK_SIZE, max_bytes))
+    charset = response.headers.get_content_charset()
+    if charset is None:
+        match = META_CHARSET.search(first[:1024])
+        charset = match.group(1).decode("ascii") if match else "utf-8"
+    try:
+        decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    read, chunk = len(first), first
+    while chunk:
+        parser.feed(decoder.decode(chunk))
+        if parser.done or read >= max_bytes:
+            break
+        chunk = response.read(min(CHUNK_SIZE, max_bytes - read))
+        read += len(chunk)
+    return parser
+
+def get_link_metadata(link: str, timeout: Optional[float] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                      title_only: bool = False, etag: Optional[str] = None,
+                      last_modified: Optional[str] = None) -> Optional[LinkMetadata]:
+    """
+    This function retrieves the title, og:title and canonical url of the webpage the
+    link points to, reading the page only until the end of its <head> (and never more
+    than max_bytes) instead of downloading and parsing all of it.
+    If the validators of a previous download are passed, a conditional request is sent
+    and None is returned when the server answers that the page has not changed.
+
+    Parameters
+    --------------
+        link: str
+            The link of the webpage whose metadata we want to retrieve
+        timeout: Optional[float]
+            Number of seconds after which a blocking network operation is aborted
+        max_bytes: int
+            Maximum number of bytes read from the page
+        title_only: bool
+            If True reading stops as soon as the <title> has been parsed
+        etag: Optional[str]
+            ETag returned the last time the page was downloaded
+        last_modified: Optional[str]
+            Last-Modified header returned the last time the page was downloaded
+
+    Returns
+    --------------
+        (LinkMetadata) The metadata of the page, or None if it has not changed
+    """
+    hdr = {'User-Agent': 'Mozilla/5.0'}
+    if etag:
+        hdr['If-None-Match'] = etag
+    if last_modified:
+        hdr['If-Modified-Since'] = last_modified
+    r = Request(link, headers=hdr)
+    try:
+        page = urlopen(r) if timeout is None else urlopen(r, timeout=timeout)
+    except HTTPError as error:
+        if error.code == 304 and (etag or last_modified):
+            return None
+        raise
+    with page:
+        parser = read_head_metadata(page, max_bytes, title_only)
+        final_url = page.geturl()
+        return LinkMetadata(url=link,
+                            final_url=final_url,
+                            title=parser.title,
+                            og_title=parser.og_title,
+                            canonical_url=urljoin(final_url, parser.canonical) if parser.canonical else None,
+                            etag=page.headers.get("ETag"),
+                            last_modified=page.headers.get("Last-Modified"))
+
+def get_link_data(link: str, timeout: Optional[float] = None) -> Tuple[str, str]:
+    """
+    This function retrieves the title of the webpage where the
     link passed as argument points to
 
     Parameters
     --------------
         link: str
             The link of the webpage whose title we want to retrieve
-    
+        timeout: Optional[float]
+            Number of seconds after which a blocking network operation is aborted
+
     Returns
     --------------
         today: str
             A string containing today's date
-        b.title.string: str
-            The webpage's title
+        title: str
+            The webpage's title (its og:title if it has no <title>)
     """
-    hdr = {'User-Agent': 'Mozilla/5.0'}
-    r = Request(link, headers=hdr)
-    page = urlopen(r)
-    b = BeautifulSoup(page, features="html.parser")
+    metadata = get_link_metadata(link, timeout)
     today = str(date.today())
-    return today, b.title.string
\ No newline at end of file
+    return today, metadata.best_title
@@ -0,0 +1,132 @@
+import re
+from email.message import Message
+from html.parser import HTMLParser
+from typing import Iterable, List, Optional, Set
+from urllib.parse import urlsplit
+
+from utils.urls import canonicalize_url
+
+# urls in plain text end at whitespace, quotes and brackets
+TEXT_URL = re.compile(r"""https?://[^\s<>"'()\[\]{}]+""", re.IGNORECASE)
+# punctuation that ends a sentence rather than the url before it
+TRAILING_PUNCTUATION = ".,;:!?*"
+LINK_TAGS = {"a", "area"}
+
+
+def normalize_link(url: str) -> Optional[str]:
+    """
+    This function returns the canonical form of a link found in an email (see
+    canonicalize_url), or None if it is not an http(s) url.
+
+    Parameters
+    --------------
+        url: str
+            The link as it was found in the email
+    """
+    url = url.strip().rstrip(TRAILING_PUNCTUATION)
+    if not url.lower().startswith(("http://", "https://")):
+        return None
+    try:
+        canonical = canonicalize_url(url)
+    except ValueError:
+        return None
+    return canonical if urlsplit(canonical).hostname else None
+
+
+class LinkCollector:
+    """
+    Collects normalized links in the order they are found, ignoring the ones
+    already collected.
+    """
+
+    def __init__(self):
+        self.links: List[str] = []
+        self._seen: Set[str] = set()
+
+    def add(self, url: str):
+        link = normalize_link(url)
+        if link is not None and link not in self._seen:
+            self._seen.add(link)
+            self.links.append(link)
+
+    def add_text(self, text: str):
+        for match in TEXT_URL.finditer(text):
+            self.add(match.group())
+
+
+class HrefParser(HTMLParser):
+    """
+    HTML tokenizer feeding a LinkCollector with the href of every <a> and <area> tag,
+    and with the urls written as plain text in the page.
+    """
+
+    def __init__(self, collector: LinkCollector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        if tag in LINK_TAGS:
+            for name, value in attrs:
+                if name == "href" and value:
+                    self.collector.add(value)
+
+    def handle_data(self, data):
+        self.collector.add_text(data)
+
+
+def _part_text(part: Message) -> Optional[str]:
+    payload = part.get_payload(decode=True)
+    if payload is None:
+        return None
+    charset = part.get_content_charset() or "utf-8"
+    try:
+        return payload.decode(charset, errors="replace")
+    except LookupError:
+        return payload.decode("utf-8", errors="replace")
+
+def _collect(message: Message, collector: LinkCollector):
+    for part in message.walk():
+        if part.is_multipart() or part.get_content_disposition() == "attachment":
+            continue
+        content_type = part.get_content_type()
+        if content_type not in ("text/plain", "text/html"):
+            continue
+        text = _part_text(part)
+        if not text:
+            continue
+        if content_type == "text/html":
+            parser = HrefParser(collector)
+            parser.feed(text)
+            parser.close()
+        else:
+            collector.add_text(text)
+
+def extract_links(message: Message) -> List[str]:
+    """
+    This function returns the links contained in an email, in the order they appear.
+    The MIME parts of the email are walked once: the href of the links in the HTML
+    parts are read with an HTML tokenizer, and the urls written in the plain text parts
+    are matched with a regular expression. Attachments are ignored.
+    The links are normalized (see normalize_link) and every link is returned once.
+
+    Parameters
+    --------------
+        message: Message
+            The email to read
+    """
+    return extract_links_from_messages([message])
+
+def extract_links_from_messages(messages: Iterable[Message]) -> List[str]:
+    """
+    This function returns the links contained in many emails (see extract_links),
+    every link being returned once even if it is found in several emails.
+
+    Parameters
+    --------------
+        messages: Iterable[Message]
+            The emails to read
+    """
+    collector = LinkCollector()
+    for message in messages:
+        _collect(message, collector)
+    return collector.links
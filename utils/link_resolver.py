@@ -0,0 +1,92 @@
+import random
+import socket
+import time
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+from urllib.error import HTTPError, URLError
+
+from utils.concurrency import bounded_map
+from utils.link_cache import LinkCache, get_cached_link_metadata
+from utils.link_data import get_link_metadata
+
+# HTTP status codes worth retrying: the server may answer differently a bit later
+RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, HTTPError):
+        return error.code in RETRY_STATUS
+    return isinstance(error, (URLError, socket.timeout, ConnectionError))
+
+def _fetch_title(link: str, timeout: float, cache: Optional[LinkCache]) -> Optional[str]:
+    if cache is None:
+        return get_link_metadata(link, timeout).best_title
+    return get_cached_link_metadata(link, cache, timeout).best_title
+
+def resolve_link(link: str, timeout: float = 10, retries: int = 2,
+                 backoff: float = 0.5, cache: Optional[LinkCache] = None) -> Tuple[str, str]:
+    """
+    This function retrieves the title of a webpage like get_link_data, retrying with
+    exponential backoff when the request fails for a reason that may be temporary
+    (timeouts, connection errors, 429 and 5xx answers). If the title still can't be
+    retrieved, the link itself is used as title so that the link can be saved anyway.
+
+    Parameters
+    --------------
+        link: str
+            The link of the webpage whose title we want to retrieve
+        timeout: float
+            Number of seconds after which a single attempt is aborted
+        retries: int
+            Number of attempts made after the first one fails
+        backoff: float
+            Seconds waited before the first retry, doubled at every retry
+        cache: Optional[LinkCache]
+            If passed, the title is read from (and stored in) this cache
+
+    Returns
+    --------------
+        (tuple) Today's date and the webpage's title (or the link)
+    """
+    for attempt in range(retries + 1):
+        try:
+            title = _fetch_title(link, timeout, cache)
+        except Exception as error:
+            if attempt == retries or not _retryable(error):
+                break
+            time.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+            continue
+        if title and title.strip():
+            return str(date.today()), title.strip()
+        break
+    return str(date.today()), link
+
+def resolve_links(links: Iterable[str], max_workers: int = 8, per_host: int = 2, timeout: float = 10,
+                  retries: int = 2, backoff: float = 0.5,
+                  cache: Optional[LinkCache] = None) -> List[Tuple[str, str, str]]:
+    """
+    This function resolves the titles of many links in parallel (see resolve_link),
+    fetching at most max_workers pages at the same time and at most per_host pages
+    at the same time from the same website.
+
+    Parameters
+    --------------
+        links: Iterable[str]
+            The links whose titles we want to retrieve
+        max_workers: int
+            Global limit on the number of pages fetched at the same time
+        per_host: int
+            Limit on the number of pages fetched at the same time from a single host
+        timeout, retries, backoff, cache:
+            See resolve_link
+
+    Returns
+    --------------
+        (list[tuple]) (link, date, title) for every link, in the order they were passed
+    """
+    links = list(links)
+    resolved = {}
+    for link, value, error, _ in bounded_map(lambda item: resolve_link(item, timeout, retries, backoff, cache),
+                                             links, lambda item: item, max_workers=max_workers, per_host=per_host):
+        resolved[link] = value if error is None else (str(date.today()), link)
+    return [(link, *resolved[link]) for link in links]
@@ -0,0 +1,182 @@
+import bisect
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# upper bounds, in seconds, of the buckets of the duration histograms
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_VERB = re.compile(r"^\s*(\w+)", re.IGNORECASE)
+QUERY_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE)\s+`?(\w+)", re.IGNORECASE)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    labels = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """
+    A metric with a fixed set of label names, holding one value per combination of
+    label values. Updates are thread safe.
+    """
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects the labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        with self._lock:
+            samples = self.samples()
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"] + samples)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes the number of seconds the block took, even if it raised.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        lines = []
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"), ), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                bucket = _format_labels(self.labels, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    The metrics of a process, rendered together in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time spent answering API requests, until the response headers are sent.",
+    ("method", "route", "status")))
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "Time spent executing database statements.", ("statement", "table")))
+DB_QUERY_ROWS = REGISTRY.register(Counter(
+    "db_query_rows_total", "Rows returned or affected by database statements.", ("statement", "table")))
+FEED_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "feed_stage_duration_seconds", "Time spent on each feed: fetch (until the response headers are received), "
+    "parse (reading and parsing the feed), hash (hashing its entries) and insert (storing the new entries).",
+    ("publisher", "stage")))
+FEED_ENTRIES = REGISTRY.register(Counter(
+    "feed_entries_inserted_total", "New entries inserted from each feed.", ("publisher", )))
+FEED_ERRORS = REGISTRY.register(Counter(
+    "feed_errors_total", "Feeds that could not be polled.", ("publisher", )))
+INGEST_JOBS = REGISTRY.register(Counter(
+    "ingest_jobs_total", "Links queued by POST /links, saved (done), already saved (skipped) and given up on (failed).", ("status", )))
+INGEST_ERRORS = REGISTRY.register(Counter(
+    "ingest_errors_total", "Ingestion queue statements that failed (e.g. the queue stayed locked) and were retried later.",
+    ("operation", )))
+INGEST_SECONDS = REGISTRY.register(Histogram(
+    "ingest_job_duration_seconds", "Time from queuing a link to saving it in the LINKS table."))
+
+
+@lru_cache(maxsize=512)
+def query_labels(statement: str) -> Dict[str, str]:
+    """
+    Returns the labels of a sql statement in the database metrics: its verb (SELECT,
+    INSERT, ...) and the first table it reads from or writes to.
+    """
+    verb = QUERY_VERB.match(statement)
+    table = QUERY_TABLE.search(statement)
+    return {"statement": verb.group(1).upper() if verb else "OTHER", "table": table.group(1) if table else ""}
+
+def render_metrics() -> str:
+    """
+    This function returns every metric of the process in the Prometheus text format.
+    """
+    return REGISTRY.render()
+
+def write_metrics(path: str):
+    """
+    This function writes the metrics of the process to a file in the Prometheus text
+    format (e.g. for the textfile collector of node_exporter), or to the standard
+    output if path is "-". The file is replaced atomically.
+    """
+    text = render_metrics()
+    if path == "-":
+        print(text, end="")
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+    with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(temporary, path)
@@ -0,0 +1,100 @@
+import os
+import re
+from typing import List, NamedTuple, Optional, Set
+
+from storage import get_repository
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql", "migrations")
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)(\.sqlite)?\.sql$")
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: str
+
+
+def discover_migrations(directory: str = MIGRATIONS_DIR, dialect: str = "mysql") -> List[Migration]:
+    """
+    This function lists the migrations of a database dialect in the directory, sorted
+    by version. A migration is a file named <version>_<name>.sql containing one or more
+    sql statements; its version for the SQLite storage backend is named
+    <version>_<name>.sqlite.sql. SQLite databases are created with the schema of
+    sql/sqlite_schema.sql, which already contains the migrations that have no SQLite
+    version.
+    """
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if match and bool(match.group(3)) == (dialect == "sqlite"):
+            migrations.append(Migration(int(match.group(1)), match.group(2),
+                                        os.path.join(directory, filename)))
+    migrations.sort()
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Two migrations in {directory} have the same version")
+    return migrations
+
+def split_statements(sql: str) -> List[str]:
+    """
+    This function splits the content of a migration file into its statements,
+    dropping the "--" comment lines.
+    """
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+def applied_versions() -> Set[int]:
+    """
+    This function returns the versions of the migrations already applied to the
+    database, creating the table that records them if it does not exist yet.
+    """
+    with get_repository().session(write=True) as cursor:
+        cursor.execute("CREATE TABLE IF NOT EXISTS schema_migrations ("
+                       "version int NOT NULL PRIMARY KEY, name varchar(200) NOT NULL, "
+                       "applied_at datetime NOT NULL DEFAULT CURRENT_TIMESTAMP)")
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cursor.fetchall()}
+
+def pending_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """
+    This function returns the migrations that have not been applied yet, in order.
+    """
+    applied = applied_versions()
+    return [migration for migration in discover_migrations(directory, get_repository().dialect)
+            if migration.version not in applied]
+
+def migrate(target: Optional[int] = None, directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """
+    This function applies the pending migrations in order, up to the target version
+    (all of them if target is None), and records each one in schema_migrations.
+    MySQL commits DDL statements implicitly, so a migration that fails half way has
+    to be fixed by hand; the migrations applied before it stay recorded. On SQLite
+    each migration is applied in a single transaction.
+
+    Parameters
+    --------------
+        target: Optional[int]
+            The last version to apply
+        directory: str
+            The directory containing the migration files
+
+    Returns
+    --------------
+        (list[Migration]) The migrations that were applied
+    """
+    applied = []
+    for migration in pending_migrations(directory):
+        if target is not None and migration.version > target:
+            break
+        with open(migration.path, encoding="utf-8") as file:
+            statements = split_statements(file.read())
+        with get_repository().session(write=True) as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                           (migration.version, migration.name))
+        applied.append(migration)
+    if applied:
+        # e.g. the SQLite triggers and indexes of the tables a migration rebuilt
+        get_repository().apply_schema()
+    return applied
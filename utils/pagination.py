@@ -0,0 +1,76 @@
+import base64
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a pagination cursor cannot be decoded.
+    """
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    This function encodes the key values of the last row of a page into an opaque,
+    url safe cursor that can be passed back as the "after" parameter.
+    """
+    payload = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    This function decodes a cursor produced by encode_cursor, checking that it contains
+    the expected number of key values.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as error:
+        raise InvalidCursor("Malformed pagination cursor") from error
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Malformed pagination cursor")
+    return values
+
+def keyset_query(select: str, conditions: List[Tuple[str, Any]], keys: Sequence[str],
+                 after: Optional[str] = None, limit: Optional[int] = None) -> Tuple[str, list]:
+    """
+    This function builds a keyset paginated query: the rows matching every condition
+    that come after the cursor in the order given by keys, which must be unique
+    together (the primary key) so that no row is skipped or repeated between pages.
+
+    Parameters
+    --------------
+        select: str
+            The "SELECT ... FROM ..." part of the query
+        conditions: list[tuple]
+            Pairs of (sql condition with a single %s placeholder, value). Pairs whose
+            value is None are ignored
+        keys: Sequence[str]
+            The columns the rows are ordered by
+        after: Optional[str]
+            Cursor returned with the previous page
+        limit: Optional[int]
+            Maximum number of rows returned
+
+    Returns
+    --------------
+        (tuple) The sql query and its parameters
+    """
+    clauses = [condition for condition, value in conditions if value is not None]
+    params = [value for _, value in conditions if value is not None]
+    if after is not None:
+        values = decode_cursor(after, len(keys))
+        # (k1, k2) > (v1, v2) expanded as k1 > v1 OR (k1 = v1 AND k2 > v2), which
+        # MySQL turns into a range scan on the index
+        alternatives = []
+        for i, key in enumerate(keys):
+            alternatives.append(" AND ".join([f"{previous} = %s" for previous in keys[:i]] + [f"{key} > %s"]))
+            params.extend(values[:i + 1])
+        clauses.append("(" + " OR ".join(f"({alternative})" for alternative in alternatives) + ")")
+    query = select
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY " + ", ".join(keys)
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+    return query, params
@@ -0,0 +1,117 @@
+from datetime import date
+from typing import Iterator, List, NamedTuple, Sequence, Tuple
+
+from database import session
+from storage import (ENTRY_FINGERPRINTS_QUERY, HASH_COLUMN, PUBLISHER_FEEDS_QUERY, TABLES, delete_query,
+                     filtered_update_query, list_query, select_query, update_query)
+from utils.pagination import encode_cursor
+from utils.search import search_query
+from utils.stats import dormant_query, stats_query
+from utils.urls import url_hash
+
+
+class EndpointQuery(NamedTuple):
+    name: str
+    sql: str
+    params: tuple
+    # the unfiltered list endpoints read the whole table on purpose
+    full_scan_expected: bool = False
+
+
+# sample values of the columns, keys and filters in the statements explained
+SAMPLE_VALUES = {"id": 1, "publisher": 1, "title": "title", "name": "name", "type": "podcast", "category": "news",
+                 "date_from": date(2023, 1, 1), "date_to": date(2023, 12, 31),
+                 HASH_COLUMN: url_hash("https://example.com/article")}
+# the publishers of a type or category are read from the whole (small) PUBLISHERS table
+SCANNED_FILTERS = {("entry", "type"), ("entry", "category")}
+
+
+def _query(query_and_params: Tuple[str, Sequence]) -> Tuple[str, tuple]:
+    query, params = query_and_params
+    return query, tuple(params)
+
+def _list_queries(name: str) -> Iterator[EndpointQuery]:
+    table = TABLES[name]
+    # the unfiltered list endpoints read the whole table on purpose
+    yield EndpointQuery(f"list {name}", *_query(list_query(table)), True)
+    after = encode_cursor([SAMPLE_VALUES[key] for key in table.keys])
+    yield EndpointQuery(f"list {name} (page)", *_query(list_query(table, {}, after, 100)))
+    filters = {}
+    for filter_name in table.filters:
+        filters[filter_name] = SAMPLE_VALUES[filter_name]
+        yield EndpointQuery(f"list {name} ({filter_name})",
+                            *_query(list_query(table, {filter_name: filters[filter_name]}, after, 100)),
+                            (name, filter_name) in SCANNED_FILTERS)
+    yield EndpointQuery(f"list {name} (page, every filter)", *_query(list_query(table, filters, after, 100)),
+                        any((name, filter_name) in SCANNED_FILTERS for filter_name in filters))
+
+def _update_queries(name: str, column: str) -> Iterator[EndpointQuery]:
+    table = TABLES[name]
+    fields = {"category": SAMPLE_VALUES["category"]}
+    value = SAMPLE_VALUES[column]
+    yield EndpointQuery(f"update {name} by {column}", *_query(update_query(table, fields, column, [value])))
+    yield EndpointQuery(f"update {name} by {column} (no fields)", *_query(select_query(table, (column, ), column, [value])))
+    yield EndpointQuery(f"bulk update {name} (items)", *_query(update_query(table, fields, column, [value, value])))
+    # there is no index on type, category and the dates of the links, filtered bulk
+    # updates read the whole table
+    for filter_name in table.filters:
+        yield EndpointQuery(f"bulk update {name} (where {filter_name})",
+                            *_query(filtered_update_query(table, fields, {filter_name: SAMPLE_VALUES[filter_name]})),
+                            True)
+
+def _link_queries(name: str) -> Iterator[EndpointQuery]:
+    table = TABLES[name]
+    link_hash = SAMPLE_VALUES[HASH_COLUMN]
+    yield EndpointQuery(f"insert {name} (link probe)", *_query(select_query(table, ("id", ), HASH_COLUMN, [link_hash])))
+    yield EndpointQuery(f"saved_links {name}",
+                        *_query(select_query(table, (HASH_COLUMN, ), HASH_COLUMN, [link_hash, link_hash])))
+
+def _endpoint_queries() -> Iterator[EndpointQuery]:
+    links, publishers, entry = TABLES["links"], TABLES["publishers"], TABLES["entry"]
+    yield from _list_queries("links")
+    yield EndpointQuery("get_links_by_title", *_query(select_query(links, links.columns, "title", ["title"])))
+    yield from _update_queries("links", "title")
+    yield EndpointQuery("delete_link", *_query(delete_query(links, "title", "title")))
+    yield from _link_queries("links")
+    yield from _list_queries("publishers")
+    yield from _update_queries("publishers", "id")
+    yield EndpointQuery("update_publisher", *_query(update_query(publishers, {"category": "news"}, "name", ["name"])))
+    yield EndpointQuery("delete_publisher", *_query(delete_query(publishers, "name", "name")))
+    yield EndpointQuery("get_hashes_from_db", PUBLISHER_FEEDS_QUERY, (), True)
+    yield EndpointQuery("update_publisher_hash",
+                        *_query(update_query(publishers, {"hash": "hash", "etag": None, "last_modified": None},
+                                             "id", [1])))
+    yield EndpointQuery("import entry (publishers probe)", *_query(select_query(publishers, ("id", ), "id", [1, 2])))
+    yield from _list_queries("entry")
+    yield from _link_queries("entry")
+    yield EndpointQuery("get_entry_fingerprints", ENTRY_FINGERPRINTS_QUERY, (1, ))
+    yield EndpointQuery("delete_entry", *_query(delete_query(entry, HASH_COLUMN, SAMPLE_VALUES[HASH_COLUMN])))
+    yield EndpointQuery("search", *_query(search_query("python databases")))
+    yield EndpointQuery("search (publisher, dates)", *_query(search_query("python", publisher=1,
+                                                                          date_from=date(2023, 1, 1))))
+    # the summary tables have a few rows per week, reading them whole is the point
+    yield EndpointQuery("link_stats (month)", *_query(stats_query("links", "month")), True)
+    yield EndpointQuery("link_stats (category, type)", *_query(stats_query("links", "category", type="podcast")), True)
+    yield EndpointQuery("entry_stats (publisher)", *_query(stats_query("entry", "publisher")), True)
+    yield EndpointQuery("entry_stats (week, publisher)", *_query(stats_query("entry", "week", publisher=1)))
+    yield EndpointQuery("entry_stats (category)", *_query(stats_query("entry", "category")), True)
+    # a probe of the (publisher, date) index of entry per publisher
+    yield EndpointQuery("dormant_publishers", *_query(dormant_query(date(2023, 1, 1))), True)
+
+# built with the statement builders of storage.py, so they are the statements the
+# repository runs, with every filter of TABLES
+ENDPOINT_QUERIES: List[EndpointQuery] = list(_endpoint_queries())
+
+
+def explain_queries(queries: List[EndpointQuery] = ENDPOINT_QUERIES) -> Iterator[Tuple[EndpointQuery, List[dict], bool]]:
+    """
+    This function runs EXPLAIN on every endpoint query and yields, for each of them,
+    the rows of the plan and whether the plan contains an unexpected full table scan
+    (access type ALL).
+    """
+    with session() as cursor:
+        for query in queries:
+            cursor.execute("EXPLAIN " + query.sql, query.params)
+            plan = [dict(zip(cursor.column_names, row)) for row in cursor.fetchall()]
+            full_scan = any(step.get("type") == "ALL" for step in plan)
+            yield query, plan, full_scan and not query.full_scan_expected
@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+@dataclass
+class CachedResponse:
+    """
+    The body of a GET response, with its ETag and the headers to send with it.
+    The body is shared by every request served from the cache, so it must not be modified.
+    """
+    body: Any
+    etag: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    created: float = field(default_factory=time.time)
+
+
+def compute_etag(body: Any) -> str:
+    """
+    Returns a strong ETag for a JSON serializable body.
+    """
+    payload = json.dumps(body, default=str, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return '"' + hashlib.sha1(payload).hexdigest() + '"'
+
+def cache_key(endpoint: str, params: dict) -> str:
+    """
+    Returns the key of the response of an endpoint to a set of query parameters.
+    """
+    return endpoint + "?" + json.dumps(params, default=str, sort_keys=True)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match request header matches the ETag (weak comparison, as
+    required for If-None-Match).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in tags or etag in [tag[2:] for tag in tags if tag.startswith("W/")]
+
+
+class ResponseCache:
+    """
+    Interface of the response cache backends. Responses are stored with tags (the
+    tables they were read from): invalidating a tag drops every response stored with it.
+
+    A response computed while one of its tags is invalidated must not be stored, or it
+    could be older than the write that invalidated the tag: callers take a snapshot of
+    the tags before reading the database, and pass it to set.
+    """
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        raise NotImplementedError
+
+    def snapshot(self, tags: Iterable[str]) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: CachedResponse, tags: Iterable[str], snapshot: Any):
+        raise NotImplementedError
+
+    def invalidate(self, *tags: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class NullCache(ResponseCache):
+    """
+    Backend that stores nothing, used when the response cache is disabled.
+    """
+
+    def get(self, key):
+        return None
+
+    def snapshot(self, tags):
+        return None
+
+    def set(self, key, value, tags, snapshot):
+        pass
+
+    def invalidate(self, *tags):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {"backend": "none"}
+
+
+class InMemoryCache(ResponseCache):
+    """
+    Response cache held in the memory of the API process. Entries expire after ttl
+    seconds, and the least recently used ones are evicted when more than max_entries
+    are stored.
+
+    With a shared store of generations (the repository, see
+    Repository.cache_generations), invalidations are also counted in the database:
+    the writes of other processes (the CLI, other API servers) drop the entries of
+    their tags the next time the generations are read, at most every sync_interval
+    seconds. Without one, other processes' writes are only seen once entries expire.
+    """
+
+    def __init__(self, ttl: float = 300, max_entries: int = 1000, shared: Optional[Any] = None,
+                 sync_interval: float = 1.0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.shared = shared
+        self.sync_interval = sync_interval
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._keys_by_tag: Dict[str, set] = {}
+        self._generations: Dict[str, int] = {}
+        self._shared_generations: Dict[str, int] = {}
+        self._synced = float("-inf")
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def _drop(self, key: str):
+        _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+
+    def _sync(self):
+        # a single thread reads the generations, the others keep serving meanwhile
+        if time.monotonic() - self._synced < self.sync_interval or not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            generations = self.shared.cache_generations()
+            with self._lock:
+                changed = [tag for tag, generation in generations.items()
+                           if self._shared_generations.get(tag) != generation]
+                self._shared_generations = generations
+                self._invalidate(changed)
+            self._synced = time.monotonic()
+        finally:
+            self._sync_lock.release()
+
+    def get(self, key):
+        if self.shared is not None:
+            self._sync()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0].created > self.ttl:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def snapshot(self, tags):
+        with self._lock:
+            return {tag: self._generations.get(tag, 0) for tag in tags}
+
+    def set(self, key, value, tags, snapshot):
+        tags = tuple(tags)
+        with self._lock:
+            if any(self._generations.get(tag, 0) != generation for tag, generation in snapshot.items()):
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, tags)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def _invalidate(self, tags: Iterable[str]):
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            for key in list(self._keys_by_tag.pop(tag, ())):
+                if key in self._entries:
+                    self._drop(key)
+            self.invalidations += 1
+
+    def invalidate(self, *tags):
+        with self._lock:
+            self._invalidate(tags)
+        if self.shared is not None:
+            self.shared.bump_cache_generations(tags)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "hits": self.hits, "misses": self.misses,
+                    "invalidations": self.invalidations, "entries": len(self._entries),
+                    "max_entries": self.max_entries, "ttl": self.ttl,
+                    "sync_interval": self.sync_interval if self.shared is not None else None}
+
+
+BACKENDS = {"memory": InMemoryCache, "none": NullCache}
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+def get_response_cache() -> ResponseCache:
+    """
+    This function returns the process wide response cache, creating it on first use
+    from the settings in the environment (.env file): responseCacheBackend (memory,
+    or none to disable it), responseCacheTtl (300 seconds), responseCacheMaxEntries
+    (1000) and responseCacheSyncInterval (1 second). Invalidations are shared through
+    the database (see InMemoryCache), so a response made stale by another process,
+    e.g. the CLI writing with a LocalClient, is served for at most
+    responseCacheSyncInterval seconds; with responseCacheSyncInterval = 0 they are
+    not shared, and it is served until it expires (responseCacheTtl).
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            backend = os.environ.get("responseCacheBackend", "memory")
+            if backend not in BACKENDS:
+                raise ValueError(f"Unknown response cache backend {backend!r}, expected one of {sorted(BACKENDS)}")
+            if backend == "memory":
+                sync_interval = float(os.environ.get("responseCacheSyncInterval", 1))
+                shared = None
+                if sync_interval > 0:
+                    from storage import get_repository
+                    shared = get_repository()
+                _cache = InMemoryCache(float(os.environ.get("responseCacheTtl", 300)),
+                                       int(os.environ.get("responseCacheMaxEntries", 1000)), shared, sync_interval)
+            else:
+                _cache = BACKENDS[backend]()
+        return _cache
+
+def set_response_cache(cache: ResponseCache):
+    """
+    This function replaces the process wide response cache, e.g. with a shared backend.
+    """
+    global _cache
+    with _cache_lock:
+        _cache = cache
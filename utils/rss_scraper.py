@@ -1,49 +1,187 @@
 import hashlib
+import time
 import feedparser
-from datetime import date, timedelta
-from typing import List, Tuple
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Set, Tuple, Union
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
 
+from utils.feed_stream import read_feed
 
-def get_rss_hash(rss: str) -> str:
+
+@dataclass
+class FeedResponse:
+    """
+    Result of fetching a RSS feed. When the server answered 304 Not Modified
+    the feed is None and the validators are the ones that were sent.
+    fetch_seconds is the time spent until the response headers were received,
+    parse_seconds the time spent reading and parsing the feed.
     """
-    This function returns a hexadecimal digest associated with a RSS feed
+    status: int
+    feed: Optional[feedparser.FeedParserDict]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    headers: dict = field(default_factory=dict)
+    fetch_seconds: float = 0.0
+    parse_seconds: float = 0.0
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+
+def fetch_feed(rss: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+               timeout: Optional[float] = None, max_entries: Optional[int] = None,
+               until: Optional[Callable[[dict], bool]] = None) -> FeedResponse:
+    """
+    This function downloads and parses a RSS feed once. If the validators obtained
+    from a previous download are passed, a conditional request is sent and, when the
+    feed has not changed, the server's 304 answer is returned without downloading
+    or parsing anything.
+    The feed is parsed while it is downloaded (see utils.feed_stream.read_feed), so
+    only the entries are kept in memory and, with max_entries or until, downloading
+    stops as soon as the entries that matter have been read. Feeds that are not
+    well-formed XML are downloaded again and parsed by feedparser, which is lenient.
 
     Parameters
     --------------
         rss: str
-            Link pointing to the RSS feed whose digest we want to calculate
+            Link pointing to the RSS feed
+        etag: Optional[str]
+            ETag header returned the last time the feed was downloaded
+        last_modified: Optional[str]
+            Last-Modified header returned the last time the feed was downloaded
+        timeout: Optional[float]
+            Number of seconds after which a blocking network operation is aborted
+        max_entries: Optional[int]
+            Maximum number of entries read from the feed (the first ones, usually the newest)
+        until: Optional[Callable[[dict], bool]]
+            Reading stops at the first entry for which it returns True
+
+    Returns
+    --------------
+        (FeedResponse) The parsed feed together with its new validators
     """
-    feed = feedparser.parse(rss)
-    return hashlib.sha256(str(feed.entries).encode()).hexdigest()
+    hdr = {'User-Agent': 'Mozilla/5.0'}
+    if etag:
+        hdr['If-None-Match'] = etag
+    if last_modified:
+        hdr['If-Modified-Since'] = last_modified
+    start = time.perf_counter()
+    try:
+        response = urlopen(Request(rss, headers=hdr), timeout=timeout)
+    except HTTPError as error:
+        if error.code != 304:
+            raise
+        return FeedResponse(status=304, feed=None, etag=etag, last_modified=last_modified,
+                            headers=dict(error.headers.items()), fetch_seconds=time.perf_counter() - start)
+    fetched = time.perf_counter()
+    with response:
+        status = response.status
+        headers = dict(response.headers.items())
+        try:
+            feed = read_feed(response, max_entries, until)
+        except ET.ParseError:
+            feed = None
+    if feed is None:
+        with urlopen(Request(rss, headers={'User-Agent': 'Mozilla/5.0'}), timeout=timeout) as fallback:
+            feed = feedparser.parse(fallback.read(), response_headers=headers)
+        if max_entries is not None:
+            feed["entries"] = feed.entries[:max_entries]
+    return FeedResponse(status=status,
+                        feed=feed,
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                        headers=headers,
+                        fetch_seconds=fetched - start,
+                        parse_seconds=time.perf_counter() - fetched)
+
+def _as_feed(rss: Union[str, feedparser.FeedParserDict], timeout: Optional[float],
+             until: Optional[Callable[[dict], bool]] = None) -> feedparser.FeedParserDict:
+    if isinstance(rss, str):
+        return fetch_feed(rss, timeout=timeout, until=until).feed
+    return rss
 
-def get_rss_entries(rss: str, publisher_id: int) -> List[Tuple]:
+def entry_fingerprint(entry: dict) -> str:
     """
-    This function returns the entries in an RSS feed that were published
-    in the last week.
+    This function returns the fingerprint of a feed entry: the MD5 hex digest of its
+    link (or of its GUID when the entry has no link). It is the same value MySQL's
+    MD5() function computes, so fingerprints of stored entries can be derived in SQL.
 
     Parameters
     --------------
-        rss: str
-            The link pointing to the RSS feed we want to parse
+        entry: dict
+            An entry of a feed parsed by feedparser
+    """
+    key = entry.get("link") or entry.get("id") or entry.get("title", "")
+    return hashlib.md5(key.encode()).hexdigest()
+
+def _entry_date(entry: dict) -> Optional[str]:
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    if parsed is None:
+        return None
+    return f"{parsed.tm_year:04d}-{parsed.tm_mon:02d}-{parsed.tm_mday:02d}"
+
+def get_rss_hash(rss: Union[str, feedparser.FeedParserDict], timeout: Optional[float] = None) -> str:
+    """
+    This function returns a hexadecimal digest associated with a RSS feed.
+    The digest only depends on the set of entries in the feed (see entry_fingerprint),
+    so edits to an entry's content or a reordering of the feed do not change it.
+
+    Parameters
+    --------------
+        rss: str | FeedParserDict
+            Link pointing to the RSS feed whose digest we want to calculate, or
+            the feed already returned by fetch_feed
+        timeout: Optional[float]
+            Number of seconds after which downloading the feed is aborted
+    """
+    feed = _as_feed(rss, timeout)
+    fingerprints = sorted({entry_fingerprint(entry) for entry in feed.entries})
+    return hashlib.sha256("".join(fingerprints).encode()).hexdigest()
+
+def get_rss_entries(rss: Union[str, feedparser.FeedParserDict], publisher_id: int,
+                    seen: Optional[Set[str]] = None, timeout: Optional[float] = None,
+                    stop_at_seen: bool = False) -> List[Tuple]:
+    """
+    This function returns the entries in an RSS feed that have not been seen before,
+    whatever their date or their position in the feed. With stop_at_seen, the feed is
+    assumed to list its newest entries first, and downloading it stops at the first
+    entry that was already seen.
+
+    Parameters
+    --------------
+        rss: str | FeedParserDict
+            The link pointing to the RSS feed we want to parse, or the feed
+            already returned by fetch_feed
         publisher_id: int
             The unique ID that is used to identify a publisher inside the PUBLISHERS
             table in the content_manager database
-    
+        seen: Optional[set[str]]
+            Fingerprints of the entries that were already processed (see entry_fingerprint)
+        timeout: Optional[float]
+            Number of seconds after which downloading the feed is aborted
+        stop_at_seen: bool
+            If True and rss is a link, only the entries before the first one already
+            seen are read
+
     Returns
     --------------
         articles: list[tuple]
-            List of tuple containing the entries published in the last week
+            List of tuples (title, link, publisher_id, date, fingerprint) of the new entries
     """
-    today = date.today()
-    last_week = today - timedelta(7)
-    feed = feedparser.parse(rss)
-    articles = [] # temporary measure
+    seen = set(seen or ())
+    until = (lambda entry: entry_fingerprint(entry) in seen) if stop_at_seen and seen else None
+    feed = _as_feed(rss, timeout, until)
+    articles = []
 
     for entry in feed.entries:
-        if entry.updated_parsed > last_week.timetuple():
-            parsed_date = f"{entry.updated_parsed.tm_year}-{entry.updated_parsed.tm_mon}-{entry.updated_parsed.tm_mday}"
-            schema_tuple = (entry.title, entry.link, publisher_id, parsed_date)
-            articles.append(schema_tuple)
-        else:
-            break
-    return articles
\ No newline at end of file
+        fingerprint = entry_fingerprint(entry)
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+        # feeds served through feedburner link to a redirect, the article is the original link
+        link = entry.get("feedburner_origlink") or entry.get("link") or entry.get("id")
+        articles.append((entry.get("title", ""), link, publisher_id, _entry_date(entry), fingerprint))
+    return articles
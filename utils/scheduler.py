@@ -0,0 +1,187 @@
+import calendar
+import heapq
+import random
+import re
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional
+
+import feedparser
+
+from utils.state import load_state, save_state
+
+MAX_AGE = re.compile(r"(?:^|,)\s*max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+
+@dataclass
+class FeedSchedule:
+    """
+    Polling state of a single publisher's feed.
+    """
+    publisher: int
+    next_poll: float
+    interval: float
+    failures: int = 0
+    last_polled: Optional[float] = None
+    last_new_entries: Optional[float] = None
+    publish_gap: Optional[float] = None
+
+
+def entry_timestamps(feed: feedparser.FeedParserDict) -> List[float]:
+    """
+    Returns the publication times of the entries of a feed (as epoch seconds, oldest first).
+    """
+    timestamps = []
+    for entry in feed.entries:
+        parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+        if parsed is not None:
+            timestamps.append(float(calendar.timegm(parsed)))
+    return sorted(timestamps)
+
+def publish_gap(feed: feedparser.FeedParserDict) -> Optional[float]:
+    """
+    Returns the median time between two consecutive entries of a feed, or None if the
+    feed has less than two dated entries.
+    """
+    timestamps = entry_timestamps(feed)
+    gaps = [later - earlier for earlier, later in zip(timestamps, timestamps[1:]) if later > earlier]
+    return statistics.median(gaps) if gaps else None
+
+def server_min_interval(feed: Optional[feedparser.FeedParserDict], headers: dict) -> float:
+    """
+    Returns the minimum number of seconds the publisher asks to wait before polling its
+    feed again: the RSS <ttl> (in minutes) and the max-age of the Cache-Control header.
+    """
+    seconds = 0.0
+    ttl = feed.feed.get("ttl") if feed is not None else None
+    if ttl is not None and str(ttl).strip().isdigit():
+        seconds = max(seconds, int(str(ttl).strip()) * 60.0)
+    cache_control = next((value for name, value in headers.items() if name.lower() == "cache-control"), "")
+    match = MAX_AGE.search(cache_control)
+    if match:
+        seconds = max(seconds, float(match.group(1)))
+    return seconds
+
+
+class FeedScheduler:
+    """
+    Priority queue of the next time each publisher's feed should be polled.
+
+    The interval between two polls of a feed adapts to how often the publisher
+    publishes: it becomes the median time between the entries of the feed when new
+    entries are found, and grows by growth every time a poll finds nothing new, so
+    dormant feeds are polled less and less. It is kept between min_interval and
+    max_interval, and never shorter than the feed's <ttl> or Cache-Control max-age.
+    Failing feeds are retried with an exponential backoff starting at min_interval.
+    Every delay is randomized by +/- jitter so that feeds do not end up being polled
+    all at the same time.
+
+    The state can be saved and loaded again, so that a restarted scheduler carries on
+    where it stopped.
+    """
+
+    def __init__(self, min_interval: float = 15 * 60, max_interval: float = 7 * 24 * 3600,
+                 growth: float = 1.5, jitter: float = 0.1):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.growth = growth
+        self.jitter = jitter
+        self.feeds: Dict[int, FeedSchedule] = {}
+        self._heap: List[tuple] = []
+
+    @classmethod
+    def load(cls, path: str, **settings) -> "FeedScheduler":
+        """
+        Returns a scheduler with the state saved in path (an empty one if there is none).
+        """
+        scheduler = cls(**settings)
+        for schedule in load_state(path, {}).get("feeds", {}).values():
+            scheduler._push(FeedSchedule(**schedule))
+        return scheduler
+
+    def save(self, path: str):
+        save_state(path, {"feeds": {str(publisher): asdict(schedule)
+                                    for publisher, schedule in self.feeds.items()}})
+
+    def _push(self, schedule: FeedSchedule):
+        self.feeds[schedule.publisher] = schedule
+        heapq.heappush(self._heap, (schedule.next_poll, schedule.publisher))
+
+    def _clamp(self, seconds: float) -> float:
+        return min(self.max_interval, max(self.min_interval, seconds))
+
+    def _jittered(self, seconds: float) -> float:
+        return seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def sync(self, publishers: Iterable[int], now: Optional[float] = None):
+        """
+        Schedules the publishers that are not scheduled yet (they are due immediately)
+        and forgets the ones that are no longer in the database.
+        """
+        now = time.time() if now is None else now
+        publishers = set(publishers)
+        for publisher in publishers - self.feeds.keys():
+            self._push(FeedSchedule(publisher=publisher, next_poll=now, interval=self.min_interval))
+        for publisher in self.feeds.keys() - publishers:
+            del self.feeds[publisher]
+
+    def pop_due(self, now: Optional[float] = None) -> List[int]:
+        """
+        Removes from the queue and returns the publishers whose feed is due.
+        """
+        now = time.time() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            next_poll, publisher = heapq.heappop(self._heap)
+            schedule = self.feeds.get(publisher)
+            # entries of forgotten or rescheduled publishers are left in the heap
+            if schedule is not None and schedule.next_poll == next_poll:
+                due.append(publisher)
+        return due
+
+    def seconds_until_next(self, now: Optional[float] = None) -> Optional[float]:
+        """
+        Returns the number of seconds until the next feed is due, None if there is none.
+        """
+        now = time.time() if now is None else now
+        while self._heap and self.feeds.get(self._heap[0][1]) is None:
+            heapq.heappop(self._heap)
+        return max(0.0, self._heap[0][0] - now) if self._heap else None
+
+    def record_success(self, publisher: int, feed: Optional[feedparser.FeedParserDict], headers: dict,
+                       new_entries: int, now: Optional[float] = None) -> FeedSchedule:
+        """
+        Reschedules a publisher whose feed was polled. feed is None when the server
+        answered 304 Not Modified.
+        """
+        now = time.time() if now is None else now
+        schedule = self.feeds[publisher]
+        schedule.failures = 0
+        schedule.last_polled = now
+        gap = publish_gap(feed) if feed is not None else None
+        if gap is not None:
+            schedule.publish_gap = gap
+        if new_entries:
+            schedule.last_new_entries = now
+            interval = schedule.publish_gap or schedule.interval
+        else:
+            interval = schedule.interval * self.growth
+        schedule.interval = max(self._clamp(interval), server_min_interval(feed, headers))
+        schedule.next_poll = now + self._jittered(schedule.interval)
+        self._push(schedule)
+        return schedule
+
+    def record_failure(self, publisher: int, now: Optional[float] = None) -> FeedSchedule:
+        """
+        Reschedules a publisher whose feed could not be polled, backing off exponentially.
+        The regular interval is kept for when the feed works again.
+        """
+        now = time.time() if now is None else now
+        schedule = self.feeds[publisher]
+        schedule.failures += 1
+        schedule.last_polled = now
+        backoff = min(self.max_interval, self.min_interval * 2 ** (schedule.failures - 1))
+        schedule.next_poll = now + self._jittered(backoff)
+        self._push(schedule)
+        return schedule
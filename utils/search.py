@@ -0,0 +1,61 @@
+import re
+from datetime import date
+from typing import Optional
+
+SEARCH_COLUMNS = ("kind", "title", "link", "date", "category", "publisher", "score")
+WORD = re.compile(r"\w+")
+
+def fts_query(q: str) -> str:
+    """
+    This function turns the words of a search into a SQLite FTS5 query matching the
+    rows that contain any of them, like the natural language mode of MySQL. If q
+    contains no words the query is an empty phrase, which matches nothing.
+    """
+    return " OR ".join(f'"{word}"' for word in WORD.findall(q)) or '""'
+
+def search_query(q: str, publisher: Optional[int] = None, category: Optional[str] = None,
+                 date_from: Optional[date] = None, date_to: Optional[date] = None,
+                 limit: int = 20, dialect: str = "mysql") -> tuple:
+    """
+    This function builds the full text search query run by the /search endpoint over
+    the titles of the LINKS and ENTRY tables, with the best matches first. Links are
+    left out when filtering by publisher, since they don't have one.
+
+    Parameters
+    --------------
+        dialect: str
+            mysql (FULLTEXT indexes) or sqlite (FTS5 tables, the score is the
+            opposite of the bm25 rank so that higher is better in both)
+
+    Returns
+    --------------
+        (tuple) The sql query and its parameters
+    """
+    if dialect == "sqlite":
+        sources = {table: f"{table}_fts JOIN {table} ON {table}.rowid = {table}_fts.rowid" for table in ("links", "entry")}
+        match, score, score_params = "{table}_fts MATCH %s", "-bm25({table}_fts)", []
+        q = fts_query(q)
+    else:
+        sources = {"links": "links", "entry": "entry"}
+        match = "MATCH({table}.title) AGAINST (%s IN NATURAL LANGUAGE MODE)"
+        score, score_params = match, [q]
+    parts, params = [], []
+    if publisher is None:
+        conditions = [(match.format(table="links"), q), ("links.category = %s", category),
+                      ("links.date >= %s", date_from), ("links.date <= %s", date_to)]
+        parts.append(f"SELECT 'link', links.title, links.link, links.date, links.category, NULL, "
+                     f"{score.format(table='links')} AS score FROM {sources['links']} WHERE "
+                     + " AND ".join(condition for condition, value in conditions if value is not None))
+        params += score_params + [value for _, value in conditions if value is not None]
+    conditions = [(match.format(table="entry"), q), ("entry.publisher = %s", publisher),
+                  ("publishers.category = %s", category),
+                  ("entry.date >= %s", date_from), ("entry.date <= %s", date_to)]
+    parts.append(f"SELECT 'entry', entry.title, entry.link, entry.date, publishers.category, entry.publisher, "
+                 f"{score.format(table='entry')} AS score FROM {sources['entry']} "
+                 f"LEFT JOIN publishers ON publishers.id = entry.publisher WHERE "
+                 + " AND ".join(condition for condition, value in conditions if value is not None))
+    params += score_params + [value for _, value in conditions if value is not None]
+    if dialect != "sqlite":
+        # SQLite does not accept parentheses around the members of a compound select
+        parts = [f"({part})" for part in parts]
+    return " UNION ALL ".join(parts) + " ORDER BY score DESC LIMIT %s", params + [limit]
@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+from typing import Any
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_state(path: str, default: Any = None) -> Any:
+    """
+    This function reads the JSON state a job saved with save_state, returning default
+    if the file does not exist yet.
+
+    Parameters
+    --------------
+        path: str
+            Path of the state file
+        default: Any
+            Value returned when there is no state file
+    """
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return default
+
+def save_state(path: str, state: Any):
+    """
+    This function atomically writes a job's state as JSON: the state is written to a
+    temporary file which then replaces the old one, so an interrupted write never
+    leaves a truncated state behind.
+
+    Parameters
+    --------------
+        path: str
+            Path of the state file
+        state: Any
+            JSON serializable state
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=".state-", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+            json.dump(state, file, indent=2, sort_keys=True)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
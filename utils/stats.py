@@ -0,0 +1,84 @@
+from datetime import date
+from typing import Dict, NamedTuple, Optional
+
+
+class Summary(NamedTuple):
+    # the summary table (see migration 0007) and the column holding its counts
+    table: str
+    count: str
+    joins: str
+    # group name -> sql expression of the value of a bucket
+    groups: Dict[str, str]
+    # filter name -> sql condition with a single %s placeholder
+    filters: Dict[str, str]
+
+
+PERIODS = ("week", "month")
+DORMANT_COLUMNS = ("id", "name", "category", "type", "entries", "last_entry")
+# the summary tables are kept up to date by triggers on links and entry, so the
+# statistics read a few rows per week instead of the tables they summarize
+SUMMARIES = {
+    "links": Summary("links_stats", "links", "",
+                     {"type": "NULLIF(links_stats.type, '')", "category": "NULLIF(links_stats.category, '')",
+                      "week": "links_stats.week", "month": "links_stats.month"},
+                     {"type": "links_stats.type = %s", "category": "links_stats.category = %s"}),
+    "entry": Summary("entry_stats", "entries", " LEFT JOIN publishers ON publishers.id = entry_stats.publisher",
+                     {"publisher": "NULLIF(entry_stats.publisher, 0)", "category": "publishers.category",
+                      "type": "publishers.type", "week": "entry_stats.week", "month": "entry_stats.month"},
+                     {"publisher": "entry_stats.publisher = %s", "category": "publishers.category = %s",
+                      "type": "publishers.type = %s"}),
+}
+
+
+def stats_query(table: str, group_by: str, **filters) -> tuple:
+    """
+    This function builds the query counting the rows of the LINKS or ENTRY table in
+    each bucket of group_by (publisher, category or type, or the week or month they
+    are dated: the monday of the week, YYYY-MM), from their summary table. Undated
+    rows are left out of the week and month histograms; missing publishers,
+    categories and types are counted in a None bucket.
+
+    Parameters
+    --------------
+        table: str
+            links or entry
+        group_by: str
+            One of the groups of the table in SUMMARIES
+        filters:
+            Only count the rows matching these filters (see SUMMARIES), None values
+            are ignored
+
+    Returns
+    --------------
+        (tuple) The sql query and its parameters
+    """
+    summary = SUMMARIES[table]
+    if group_by not in summary.groups:
+        raise ValueError(f"The rows of {table} can't be grouped by {group_by}")
+    unknown = [name for name in filters if name not in summary.filters]
+    if unknown:
+        raise ValueError(f"Unknown filters {unknown} for {table}")
+    conditions = [summary.filters[name] for name, value in filters.items() if value is not None]
+    if group_by in PERIODS:
+        conditions.append(f"{summary.groups[group_by]} <> ''")
+    count = f"SUM({summary.table}.{summary.count})"
+    query = (f"SELECT {summary.groups[group_by]} AS bucket, {count} FROM {summary.table}{summary.joins}"
+             + (" WHERE " + " AND ".join(conditions) if conditions else "")
+             + f" GROUP BY bucket HAVING {count} > 0 ORDER BY bucket")
+    return query, [value for value in filters.values() if value is not None]
+
+def dormant_query(before: date, category: Optional[str] = None) -> tuple:
+    """
+    This function builds the query returning the publishers (id, name, category, type,
+    number of entries and date of the last one) whose last entry is older than
+    before, or that have none, the longest silent first. The date of the last entry
+    of a publisher is a single probe of the (publisher, date) index of ENTRY.
+    """
+    query = (f"SELECT {', '.join(DORMANT_COLUMNS)} FROM ("
+             "SELECT publishers.id, publishers.name, publishers.category, publishers.type, "
+             "(SELECT COALESCE(SUM(entry_stats.entries), 0) FROM entry_stats "
+             "WHERE entry_stats.publisher = publishers.id) AS entries, "
+             "(SELECT MAX(entry.date) FROM entry WHERE entry.publisher = publishers.id) AS last_entry "
+             "FROM publishers" + (" WHERE publishers.category = %s" if category is not None else "") +
+             ") AS activity WHERE last_entry IS NULL OR last_entry < %s ORDER BY last_entry, id")
+    return query, ([category] if category is not None else []) + [before]
@@ -0,0 +1,330 @@
+import csv
+import io
+import json
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import IO, Callable, Iterable, Iterator, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+from storage import TABLES, Repository
+
+# tables that can be exported and imported, by the name used in the CLI and the API
+TRANSFER_TABLES = {"links": "links", "entries": "entry", "publishers": "publishers"}
+FORMATS = ("ndjson", "csv", "parquet")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8",
+               "parquet": "application/vnd.apache.parquet", "opml": "text/x-opml"}
+EXTENSIONS = {".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv", ".parquet": "parquet",
+              ".opml": "opml", ".xml": "opml"}
+INTEGER_COLUMNS = {"id", "publisher"}
+# columns without which an imported row is invalid
+REQUIRED_COLUMNS = {"links": ("link", "title"), "entry": ("title", "link"),
+                    "publishers": ("name", "website", "rss")}
+# columns read from an imported file: links and entries get a new id, as their link
+# (deduplicated on its hash) is what identifies them across databases
+IMPORTED_COLUMNS = {"links": ("link", "title", "date", "type", "category"),
+                    "entry": ("title", "link", "publisher", "date"),
+                    "publishers": TABLES["publishers"].columns}
+# column -> table whose id it references: imported rows referencing a missing row
+# are invalid (SQLite would reject the whole chunk, MySQL's INSERT IGNORE drop them)
+FOREIGN_KEYS = {"entry": {"publisher": "publishers"}}
+# rows inserted in a single transaction when importing
+IMPORT_CHUNK_SIZE = 10000
+
+
+class UnsupportedFormat(ValueError):
+    """
+    Raised when a format is unknown, or needs an optional dependency that is not installed.
+    """
+
+
+class MalformedFile(ValueError):
+    """
+    Raised when an imported file cannot be decoded.
+    """
+
+
+def _parquet():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise UnsupportedFormat("The parquet format needs pyarrow (pip install pyarrow)") from None
+    return pyarrow, pyarrow.parquet
+
+def check_format(format: str, table: Optional[str] = None, importing: bool = False):
+    """
+    This function raises UnsupportedFormat if the format cannot be used to export (or
+    import) the table: opml only imports publishers, and parquet needs pyarrow.
+    """
+    if format == "opml":
+        if not importing or table != "publishers":
+            raise UnsupportedFormat("The opml format can only be used to import publishers")
+        return
+    if format not in FORMATS:
+        raise UnsupportedFormat(f"Unknown format {format!r}, expected one of {', '.join(FORMATS)}"
+                                + (" or opml" if importing else ""))
+    if format == "parquet":
+        _parquet()
+
+def format_from_path(path: str) -> Optional[str]:
+    """
+    This function returns the format of a file from its extension, None if unknown.
+    """
+    for extension, format in EXTENSIONS.items():
+        if path.lower().endswith(extension):
+            return format
+    return None
+
+
+def _encode_ndjson(chunks: Iterable[Sequence[tuple]], columns: Sequence[str]) -> Iterator[bytes]:
+    for rows in chunks:
+        yield "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows).encode("utf-8")
+
+def _encode_csv(chunks: Iterable[Sequence[tuple]], columns: Sequence[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file keeping what was written since it was last drained, so that a
+    parquet file can be streamed one row group at a time.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def _encode_parquet(chunks: Iterable[Sequence[tuple]], columns: Sequence[str]) -> Iterator[bytes]:
+    pyarrow, parquet = _parquet()
+    schema = pyarrow.schema([(column, pyarrow.int64() if column in INTEGER_COLUMNS else pyarrow.string())
+                             for column in columns])
+    sink = _ChunkSink()
+    writer = parquet.ParquetWriter(sink, schema)
+    try:
+        for rows in chunks:
+            # each chunk is a row group, written (and sent) before the next one is read
+            values = {column: [row[i] if row[i] is None or column in INTEGER_COLUMNS else str(row[i]) for row in rows]
+                      for i, column in enumerate(columns)}
+            writer.write_table(pyarrow.Table.from_pydict(values, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def export_chunks(chunks: Iterable[Sequence[tuple]], columns: Sequence[str], format: str) -> Iterator[bytes]:
+    """
+    This function encodes chunks of rows (e.g. from Repository.stream_rows) in an
+    export format and yields the encoded bytes chunk by chunk, so that memory usage
+    does not depend on the number of rows.
+
+    Parameters
+    --------------
+        chunks: Iterable[Sequence[tuple]]
+            The rows, a chunk at a time
+        columns: Sequence[str]
+            The names of the columns of the rows
+        format: str
+            ndjson (a JSON object per line), csv (with a header line, null values are
+            empty) or parquet (a row group per chunk, needs pyarrow)
+    """
+    encoders = {"ndjson": _encode_ndjson, "csv": _encode_csv, "parquet": _encode_parquet}
+    check_format(format)
+    return encoders[format](chunks, columns)
+
+
+def _chunked(records: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _decode_ndjson(stream: IO[bytes]) -> Iterator[dict]:
+    for number, line in enumerate(stream, 1):
+        if line.strip():
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError(f"line {number} is not a JSON object")
+            yield record
+
+def _decode_csv(stream: IO[bytes]) -> Iterator[dict]:
+    reader = csv.reader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    header = next(reader, None)
+    for values in reader:
+        # empty values are nulls, see _row_reader
+        yield dict(zip(header, values))
+
+def _decode_parquet(stream: IO[bytes], chunk_size: int) -> Iterator[dict]:
+    _, parquet = _parquet()
+    for batch in parquet.ParquetFile(stream).iter_batches(batch_size=chunk_size):
+        yield from batch.to_pylist()
+
+def _decode_opml(stream: IO[bytes]) -> Iterator[dict]:
+    """
+    Yields a publisher for every feed outline of an OPML file (as exported by feed
+    readers). Feeds nested in a folder outline get its name as their category.
+    """
+    folders = []
+    for event, element in ET.iterparse(stream, events=("start", "end")):
+        if element.tag != "outline":
+            continue
+        rss = element.get("xmlUrl")
+        if event == "start":
+            if rss is None:
+                folders.append(element.get("text") or element.get("title"))
+                continue
+            parts = urlsplit(rss)
+            yield {"name": element.get("title") or element.get("text") or parts.netloc,
+                   "website": element.get("htmlUrl") or f"{parts.scheme}://{parts.netloc}/",
+                   "rss": rss, "category": next((folder for folder in reversed(folders) if folder), None)}
+        else:
+            if rss is None:
+                folders.pop()
+            element.clear()
+
+def read_records(stream: IO[bytes], format: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> Iterator[List[dict]]:
+    """
+    This function reads the records of a file in one of the export formats (or an
+    OPML list of feeds) and yields them chunk_size at a time. MalformedFile is raised
+    when the file cannot be decoded.
+    """
+    if format == "opml":
+        records = _decode_opml(stream)
+    elif format == "parquet":
+        records = _decode_parquet(stream, chunk_size)
+    elif format == "csv":
+        records = _decode_csv(stream)
+    elif format == "ndjson":
+        records = _decode_ndjson(stream)
+    else:
+        raise UnsupportedFormat(f"Unknown format {format!r}")
+    try:
+        yield from _chunked(records, chunk_size)
+    except (ValueError, csv.Error, ET.ParseError) as error:
+        raise MalformedFile(f"Malformed {format} file: {error}") from error
+
+
+@dataclass
+class ImportSummary:
+    """
+    Counts the rows of an import.
+    """
+    started: float = field(default_factory=time.perf_counter)
+    read: int = 0
+    inserted: int = 0
+    invalid: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def skipped(self) -> int:
+        return self.read - self.inserted - self.invalid
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return {"read": self.read, "inserted": self.inserted, "skipped": self.skipped, "invalid": self.invalid,
+                "seconds": round(self.elapsed, 3), "rows_per_second": round(self.rows_per_second, 1)}
+
+    def report(self) -> str:
+        return (f"Read {self.read} rows in {self.elapsed:.1f}s ({self.rows_per_second:.0f} rows/s): "
+                f"{self.inserted} inserted, {self.skipped} already present, {self.invalid} invalid")
+
+
+def _integer(value) -> int:
+    # int(True) is 1, a JSON boolean is not an id
+    if isinstance(value, bool):
+        raise TypeError("a boolean is not an integer")
+    return int(value)
+
+def _row_reader(columns: Sequence[str], required: Sequence[str]) -> Callable[[dict], Optional[tuple]]:
+    """
+    Returns a function giving the values of the columns of an imported record, None
+    if it is invalid. Empty strings are nulls.
+    """
+    converters = [(column, _integer if column in INTEGER_COLUMNS else str, column in required) for column in columns]
+
+    def read(record: dict) -> Optional[tuple]:
+        values = []
+        for column, convert, needed in converters:
+            value = record.get(column)
+            if value is None or value == "":
+                if needed:
+                    return None
+                value = None
+            elif type(value) is not str or convert is not str:
+                try:
+                    value = convert(value)
+                except (TypeError, ValueError):
+                    return None
+            values.append(value)
+        return tuple(values)
+    return read
+
+def import_records(repository: Repository, table: str, chunks: Iterable[List[dict]]) -> ImportSummary:
+    """
+    This function loads chunks of records (see read_records) in a table of the
+    repository, a transaction per chunk. Rows already in the table (or repeated in
+    the file) are skipped; rows missing a required column, or referencing a row that
+    does not exist (e.g. the publisher of an entry), are invalid; columns the table
+    does not have are ignored.
+
+    Parameters
+    --------------
+        repository: Repository
+            The storage the rows are inserted in
+        table: str
+            The name of the table (links, entry or publishers)
+        chunks: Iterable[List[dict]]
+            The records to import, a chunk at a time
+
+    Returns
+    --------------
+        (ImportSummary) The number of rows read, inserted, skipped and invalid, and
+        the time the import took
+    """
+    columns = IMPORTED_COLUMNS[table]
+    read = _row_reader(columns, REQUIRED_COLUMNS[table])
+    references = [(columns.index(column), referenced) for column, referenced in FOREIGN_KEYS.get(table, {}).items()]
+    summary = ImportSummary()
+    for chunk in chunks:
+        rows = [row for row in map(read, chunk) if row is not None]
+        for position, referenced in references:
+            existing = repository.existing_ids(referenced, {row[position] for row in rows if row[position] is not None})
+            rows = [row for row in rows if row[position] is None or row[position] in existing]
+        summary.read += len(chunk)
+        summary.invalid += len(chunk) - len(rows)
+        summary.inserted += repository.insert_values(table, columns, rows)
+        summary.elapsed = time.perf_counter() - summary.started
+    summary.elapsed = time.perf_counter() - summary.started
+    return summary
@@ -0,0 +1,58 @@
+import hashlib
+import re
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# the components of an url (RFC 3986, appendix B): a single match is several times
+# faster than urllib.parse.urlsplit, which matters when importing millions of links
+URL_PARTS = re.compile(r"^(?:([^:/?#]+):)?(?://([^/?#]*))?([^?#]*)(?:\?([^#]*))?")
+# query parameters added by newsletters, social networks and ad platforms to track
+# where a visit comes from: they don't change the page
+TRACKING_PARAMETER = re.compile(r"^(utm_\w+|fbclid|gclid|dclid|msclkid|mc_cid|mc_eid|_hsenc|_hsmi|mkt_tok|igshid)$",
+                                re.IGNORECASE)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    This function returns the canonical form of an url, so that urls pointing to the
+    same resource compare equal: the scheme and host are lowercased, the default port,
+    the fragment, the tracking parameters of the query (utm_*, fbclid ...) and the
+    trailing slash of the path are dropped, and an empty path becomes "/".
+
+    Parameters
+    --------------
+        url: str
+            The url to canonicalize
+    """
+    scheme, netloc, path, query = URL_PARTS.match(url.strip()).groups()
+    canonical = f"{scheme.lower()}:" if scheme else ""
+    if netloc is not None:
+        credentials, _, host = netloc.rpartition("@")
+        host = host.lower()
+        port = DEFAULT_PORTS.get(canonical[:-1])
+        if port and host.endswith(f":{port}"):
+            host = host[:-len(str(port)) - 1]
+        canonical += f"//{credentials}@{host}" if credentials else f"//{host}"
+        if host:
+            path = path.rstrip("/") or "/"
+    canonical += path
+    if query:
+        query = "&".join(parameter for parameter in query.split("&")
+                         if parameter and not TRACKING_PARAMETER.match(parameter.split("=", 1)[0]))
+        if query:
+            canonical += f"?{query}"
+    return canonical
+
+def url_hash(url: str, canonical: bool = False) -> str:
+    """
+    This function returns the MD5 hex digest of the canonical form of an url, the
+    fixed width key links and entries are deduplicated on. It is the value MySQL's
+    MD5() function computes from the canonical url.
+
+    Parameters
+    --------------
+        url: str
+            The url to hash
+        canonical: bool
+            True if the url is already in canonical form (see canonicalize_url)
+    """
+    return hashlib.md5((url if canonical else canonicalize_url(url)).encode()).hexdigest()